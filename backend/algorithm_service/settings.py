@@ -130,6 +130,27 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
+# ---- Запуск кода ----
+# Число потоков в процессе backend-а, разбирающих очередь фоновых запусков (ExecutionJob).
+# 0 — очередь разбирает только отдельный процесс `manage.py run_execution_worker`.
+ALGO_JOB_WORKERS = int(os.environ.get('ALGO_JOB_WORKERS', '2'))
+# Сколько секунд хранить в кэше Django результат запуска одобренного бесплатного алгоритма
+# с тем же stdin и лимитами. 0 — кэш выключен (программы со случайностью/временем недетерминированы).
+ALGO_RUN_CACHE_TTL_S = int(os.environ.get('ALGO_RUN_CACHE_TTL_S', '0'))
+# Собирать C++/Java в фоне при одобрении алгоритма (и при правке одобренного кода),
+# чтобы первый публичный запуск взял артефакт из кэша.
+ALGO_PREBUILD_ON_APPROVAL = os.environ.get('ALGO_PREBUILD_ON_APPROVAL', 'True') == 'True'
+# Замерять производительность версии алгоритма в фоне при одобрении и после правки одобренного кода
+# (история AlgorithmBenchmark): входы по ALGO_BENCHMARK_SIZES, ALGO_BENCHMARK_REPEAT повторов на вход.
+ALGO_BENCHMARK_ON_APPROVAL = os.environ.get('ALGO_BENCHMARK_ON_APPROVAL', 'True') == 'True'
+ALGO_BENCHMARK_SIZES = [
+    int(n) for n in os.environ.get('ALGO_BENCHMARK_SIZES', '1000,10000,100000').split(',') if n.strip()
+]
+ALGO_BENCHMARK_REPEAT = int(os.environ.get('ALGO_BENCHMARK_REPEAT', '5'))
+# Регрессия — новая версия медленнее эталона больше чем в THRESHOLD раз и не меньше чем на MIN_MS мс.
+ALGO_BENCHMARK_REGRESSION_THRESHOLD = float(os.environ.get('ALGO_BENCHMARK_REGRESSION_THRESHOLD', '1.5'))
+ALGO_BENCHMARK_REGRESSION_MIN_MS = float(os.environ.get('ALGO_BENCHMARK_REGRESSION_MIN_MS', '5'))
+
 # ---- JWT ----
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+import time
+from typing import Iterator
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # Windows
+    fcntl = None
+
+
+class AdmissionRejected(Exception):
+    """
+    Нет свободного слота и очередь ожидания заполнена (или ожидание истекло).
+    retry_after — рекомендуемая пауза перед повтором, секунды.
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Ограничение числа одновременных компиляций/запусков на весь хост.
+
+    Слоты — файлы `<root>/<lang>.slot.<i>`, занятые через flock: блокировку держит процесс,
+    а ядро снимает её при его падении, поэтому лимит общий для всех воркеров gunicorn/uwsgi
+    и фоновых исполнителей. Очередь ожидания устроена так же (`<lang>.wait.<i>`): кто не
+    смог занять место в очереди — сразу получает отказ, не дожидаясь таймаута.
+    Без fcntl (Windows) лимит действует только внутри процесса.
+    """
+
+    POLL_S = 0.02
+
+    def __init__(self, root: str, slots: dict[str, int], default_slots: int, queue_size: int, max_wait_s: float):
+        self.root = root
+        self.slots = slots
+        self.default_slots = default_slots
+        self.queue_size = queue_size
+        self.max_wait_s = max_wait_s
+        self._local_lock = threading.Lock()
+        self._local_used: set[str] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.default_slots > 0 or any(n > 0 for n in self.slots.values())
+
+    def slots_for(self, lang: str) -> int:
+        return self.slots.get(lang, self.default_slots)
+
+    def _try_lock(self, name: str):
+        """
+        Неблокирующий захват именованной блокировки; None — занята.
+        Занятые имена дополнительно учитываются в памяти процесса — это и быстрый отказ
+        без системного вызова, и единственный механизм там, где нет fcntl.
+        """
+        with self._local_lock:
+            if name in self._local_used:
+                return None
+            self._local_used.add(name)
+
+        if fcntl is None:
+            return name
+
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            fd = os.open(os.path.join(self.root, name), os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError:
+            self._forget(name)
+            return None
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            self._forget(name)
+            return None
+        return (name, fd)
+
+    def _forget(self, name: str) -> None:
+        with self._local_lock:
+            self._local_used.discard(name)
+
+    def _unlock(self, handle) -> None:
+        if isinstance(handle, tuple):
+            name, fd = handle
+            try:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+        else:
+            name = handle
+        self._forget(name)
+
+    def _acquire_any(self, prefix: str, count: int):
+        for i in range(count):
+            handle = self._try_lock(f"{prefix}.{i}")
+            if handle is not None:
+                return handle
+        return None
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, int(round(self.max_wait_s)))
+
+    @contextlib.contextmanager
+    def slot(self, lang: str):
+        """
+        Держит слот языка на время блока. Ждёт в очереди не дольше max_wait_s,
+        иначе (или если очередь полна) — AdmissionRejected.
+        """
+        count = self.slots_for(lang)
+        if count <= 0:
+            yield
+            return
+
+        handle = self._acquire_any(f"{lang}.slot", count)
+        if handle is None:
+            waiting = self._acquire_any(f"{lang}.wait", self.queue_size)
+            if waiting is None:
+                raise AdmissionRejected("Сервер перегружен: очередь на запуск заполнена.", self.retry_after)
+            try:
+                deadline = time.monotonic() + self.max_wait_s
+                while handle is None:
+                    if time.monotonic() >= deadline:
+                        raise AdmissionRejected(
+                            "Сервер перегружен: не дождались свободного слота для запуска.",
+                            self.retry_after,
+                        )
+                    time.sleep(self.POLL_S)
+                    handle = self._acquire_any(f"{lang}.slot", count)
+            finally:
+                self._unlock(waiting)
+
+        try:
+            yield
+        finally:
+            self._unlock(handle)
+
+    @contextlib.contextmanager
+    def extra_slots(self, lang: str, wanted: int) -> Iterator[int]:
+        """
+        Дополнительные слоты языка без ожидания — для параллельной работы внутри уже допущенного
+        запроса (slot() держится снаружи). Отдаёт число занятых, от 0 до wanted; без лимита — wanted.
+        """
+        count = self.slots_for(lang)
+        if count <= 0:
+            yield wanted
+            return
+        handles = []
+        try:
+            while len(handles) < wanted:
+                handle = self._acquire_any(f"{lang}.slot", count)
+                if handle is None:
+                    break
+                handles.append(handle)
+            yield len(handles)
+        finally:
+            for handle in handles:
+                self._unlock(handle)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "slots": dict(self.slots),
+            "default_slots": self.default_slots,
+            "queue_size": self.queue_size,
+            "max_wait_s": self.max_wait_s,
+        }
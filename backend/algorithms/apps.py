@@ -7,3 +7,10 @@ class AlgorithmsConfig(AppConfig):
 
     def ready(self):
         import algorithms.signals  # noqa: F401
+        from algorithms import compile_service
+
+        compile_service.warmup_toolchains()
+        if compile_service.PCH_WARMUP:
+            compile_service.warmup_pch()
+        if compile_service.JVM_CDS_WARMUP:
+            compile_service.warmup_jvm()
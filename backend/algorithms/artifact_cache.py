@@ -0,0 +1,400 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Iterator
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # Windows
+    fcntl = None
+
+
+def cache_key(*parts: str) -> str:
+    """
+    Стабильный ключ кэша по набору строк (исходник, путь/версия компилятора, флаги...).
+    Длина каждой части входит в хэш, чтобы ("ab", "c") и ("a", "bc") не совпадали.
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        data = (part or "").encode("utf-8")
+        h.update(str(len(data)).encode("ascii"))
+        h.update(b":")
+        h.update(data)
+    return h.hexdigest()
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class ArtifactCache:
+    """
+    Персистентный дисковый кэш артефактов сборки (бинарники, .class-файлы).
+
+    Каждая запись — каталог `<root>/<namespace>/<key[:2]>/<key>/` с файлами артефакта
+    и `meta.json` (вывод компилятора). Запись появляется атомарно (rename из staging),
+    поэтому кэш безопасно делить между несколькими процессами backend-а.
+    Вытеснение — LRU по mtime каталога записи с ограничением на суммарный размер;
+    записи, не использовавшиеся дольше max_age_s, удаляются независимо от размера.
+    Обход всего кэша put() запускает, только когда оценка размера (последний обход плюс
+    записанное с тех пор этим процессом) превышает лимит, и не чаще раза в EVICT_INTERVAL_S.
+
+    С secret каждая запись подписывается HMAC-SHA256 по именам и содержимому всех её файлов
+    (`digest`), и get() отдаёт запись только после проверки подписи: запись, подменённую
+    в общем каталоге (например, запущенной программой пользователя), get() удаляет, и артефакт
+    собирается заново. Подпись пересчитывается, только если у файлов записи изменились
+    inode/размер/mtime/ctime (ctime нельзя выставить вручную), иначе попадание стоит пары stat.
+    """
+
+    META_FILE = "meta.json"
+    DIGEST_FILE = "digest"
+    LOCK_DIR = ".locks"
+    LOCK_POLL_S = 0.02
+    # Файл блокировки, который столько не открывали, evict() удаляет (сборка идёт минуты, не часы).
+    LOCK_TTL_S = 3600
+    # Плановый обход для записей других процессов и max_age_s.
+    EVICT_INTERVAL_S = 60
+    MAX_VERIFIED = 4096
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int,
+        max_age_s: int = 0,
+        min_age_s: int = 60,
+        secret: bytes | None = None,
+    ):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self.max_age_s = int(max_age_s)
+        # Только что использованные записи не вытесняем: их бинарник может как раз запускаться.
+        self.min_age_s = min_age_s
+        self.secret = secret
+        # Каталог записи -> отпечаток stat её файлов на момент последней успешной проверки подписи.
+        self._verified: dict[str, tuple] = {}
+        self._verified_lock = threading.Lock()
+        # Оценка размера кэша для put(): None — обхода ещё не было.
+        self._estimated_bytes: int | None = None
+        self._last_evict = 0.0
+        self._evict_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _entry_path(self, namespace: str, key: str) -> str:
+        return os.path.join(self.root, namespace, key[:2], key)
+
+    def _files(self, path: str) -> list[str] | None:
+        # Все файлы записи (кроме подписи) в стабильном порядке; ссылки и прочие не-файлы — подмена.
+        names: list[str] = []
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            if any(os.path.islink(os.path.join(dirpath, d)) for d in dirnames):
+                return None
+            for name in sorted(filenames):
+                full = os.path.join(dirpath, name)
+                rel = os.path.relpath(full, path)
+                if rel == self.DIGEST_FILE:
+                    continue
+                if os.path.islink(full) or not os.path.isfile(full):
+                    return None
+                names.append(rel)
+        return names
+
+    def _sign(self, path: str, names: list[str]) -> str:
+        mac = hmac.new(self.secret or b"", digestmod=hashlib.sha256)
+        for rel in names:
+            data = rel.replace(os.sep, "/").encode("utf-8")
+            mac.update(str(len(data)).encode("ascii") + b":" + data)
+            full = os.path.join(path, rel)
+            mac.update(str(os.path.getsize(full)).encode("ascii") + b":")
+            with open(full, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    mac.update(chunk)
+        return mac.hexdigest()
+
+    @staticmethod
+    def _fingerprint(path: str, names: list[str]) -> tuple:
+        stats = []
+        for rel in [*names, ArtifactCache.DIGEST_FILE]:
+            st = os.lstat(os.path.join(path, rel))
+            stats.append((rel, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns))
+        return tuple(stats)
+
+    def _verify(self, path: str, remember: bool = True) -> bool:
+        """
+        Подпись записи совпадает с содержимым (без secret — проверки нет).
+        remember=False — не запоминать отпечаток (разовая проверка копии).
+        """
+        if self.secret is None:
+            return True
+        try:
+            names = self._files(path)
+            if names is None:
+                return False
+            fingerprint = self._fingerprint(path, names)
+            with self._verified_lock:
+                if self._verified.get(path) == fingerprint:
+                    return True
+            with open(os.path.join(path, self.DIGEST_FILE), "r", encoding="ascii") as f:
+                stored = f.read().strip()
+            ok = hmac.compare_digest(stored, self._sign(path, names))
+        except (OSError, ValueError):
+            return False
+        if ok and remember:
+            with self._verified_lock:
+                if len(self._verified) >= self.MAX_VERIFIED:
+                    self._verified.clear()
+                self._verified[path] = fingerprint
+        return ok
+
+    def intact(self, path: str) -> bool:
+        """
+        Файлы записи не менялись с последней успешной проверки подписи (сравнение отпечатков stat).
+        Для артефактов, которые читает долгий внешний процесс: проверка после него ловит подмену
+        во время работы. Без secret — всегда True.
+        """
+        if self.secret is None:
+            return True
+        try:
+            names = self._files(path)
+            fingerprint = self._fingerprint(path, names) if names is not None else None
+        except OSError:
+            return False
+        with self._verified_lock:
+            return fingerprint is not None and self._verified.get(path) == fingerprint
+
+    def _drop(self, path: str) -> None:
+        with self._verified_lock:
+            self._verified.pop(path, None)
+        shutil.rmtree(path, ignore_errors=True)
+
+    def get(self, namespace: str, key: str) -> tuple[str, dict] | None:
+        """
+        Возвращает (каталог записи, meta) или None. Попадание обновляет mtime (для LRU).
+        Запись с неверной подписью удаляется и считается промахом.
+        """
+        if not self.enabled:
+            return None
+        path = self._entry_path(namespace, key)
+        if not os.path.isdir(path):
+            return None
+        if not self._verify(path):
+            self._drop(path)
+            return None
+        try:
+            meta = self._read_meta(path)
+            os.utime(path, None)
+        except (OSError, ValueError):
+            return None
+        return path, meta
+
+    def _read_meta(self, path: str) -> dict:
+        with open(os.path.join(path, self.META_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def checkout(self, namespace: str, key: str, dest: str) -> dict | None:
+        """
+        Копирует файлы записи в частный каталог dest (пересоздаётся) и возвращает meta или None.
+        Подпись проверяется у копии, поэтому подмена записи после проверки копию уже не затронет —
+        для артефактов, которые читаются всё время запуска (классы JVM грузятся лениво).
+        """
+        if not self.enabled:
+            return None
+        path = self._entry_path(namespace, key)
+        if not os.path.isdir(path):
+            return None
+        shutil.rmtree(dest, ignore_errors=True)
+        try:
+            shutil.copytree(path, dest, symlinks=True)
+            meta = self._read_meta(dest) if self._verify(dest, remember=False) else None
+        except (OSError, ValueError):
+            meta = None
+        if meta is None:
+            shutil.rmtree(dest, ignore_errors=True)
+            if not self._verify(path):
+                self._drop(path)
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(path, None)
+        return meta
+
+    def put(self, namespace: str, key: str, files: dict[str, str], meta: dict) -> str | None:
+        """
+        Копирует файлы (имя в записи -> исходный путь) в кэш и возвращает каталог записи.
+        При гонке с другим процессом побеждает первая запись, вторая просто отбрасывается.
+        """
+        if not self.enabled:
+            return None
+        final = self._entry_path(namespace, key)
+        try:
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            staging = tempfile.mkdtemp(prefix=".staging_", dir=os.path.dirname(final))
+        except OSError:
+            return None
+
+        try:
+            for name, src in files.items():
+                dst = os.path.join(staging, name)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(src, dst)
+            with open(os.path.join(staging, self.META_FILE), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            if self.secret is not None:
+                names = self._files(staging) or []
+                with open(os.path.join(staging, self.DIGEST_FILE), "w", encoding="ascii") as f:
+                    f.write(self._sign(staging, names))
+            os.rename(staging, final)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            # Запись другого процесса берём только с верной подписью.
+            return final if os.path.isdir(final) and self._verify(final) else None
+
+        self._maybe_evict(_dir_size(final))
+        return final
+
+    def _maybe_evict(self, added_bytes: int) -> None:
+        now = time.monotonic()
+        with self._evict_lock:
+            if self._estimated_bytes is not None:
+                self._estimated_bytes += added_bytes
+                over = self._estimated_bytes > self.max_bytes
+                if not over and now - self._last_evict < self.EVICT_INTERVAL_S:
+                    return
+            self._last_evict = now
+        self.evict()
+
+    @contextlib.contextmanager
+    def build_lock(self, namespace: str, key: str, timeout_s: float) -> Iterator[bool]:
+        """
+        Межпроцессная блокировка сборки записи (flock): пока один процесс собирает артефакт,
+        остальные с тем же ключом ждут, а потом берут готовую запись через get().
+        Файл блокировки — свой на каждый ключ (`<root>/.locks/<namespace>_<key>.lock`), так что
+        сборки разного кода друг друга не ждут; давно не открывавшиеся файлы убирает evict().
+        Отдаёт True, если блокировка взята; False — без fcntl, при ошибке или по истечении
+        timeout_s (тогда сборка идёт без блокировки, как раньше).
+        """
+        if fcntl is None or not self.enabled:
+            yield False
+            return
+        lock_dir = os.path.join(self.root, self.LOCK_DIR)
+        try:
+            os.makedirs(lock_dir, exist_ok=True)
+            fd = os.open(os.path.join(lock_dir, f"{namespace}_{key}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError:
+            yield False
+            return
+        try:
+            try:
+                # mtime — время последнего открытия: по нему evict() не тронет используемый файл.
+                os.utime(fd)
+            except (OSError, NotImplementedError):
+                pass
+            deadline = time.monotonic() + timeout_s
+            locked = False
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    locked = True
+                    break
+                except OSError:
+                    if time.monotonic() >= deadline:
+                        break
+                    time.sleep(self.LOCK_POLL_S)
+            try:
+                yield locked
+            finally:
+                if locked:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries: list[tuple[float, int, str]] = []
+        if not os.path.isdir(self.root):
+            return entries
+        for namespace in os.listdir(self.root):
+            ns_path = os.path.join(self.root, namespace)
+            if namespace == self.LOCK_DIR or not os.path.isdir(ns_path):
+                continue
+            for prefix in os.listdir(ns_path):
+                prefix_path = os.path.join(ns_path, prefix)
+                if not os.path.isdir(prefix_path):
+                    continue
+                for name in os.listdir(prefix_path):
+                    if name.startswith(".staging_"):
+                        continue
+                    path = os.path.join(prefix_path, name)
+                    try:
+                        mtime = os.stat(path).st_mtime
+                    except OSError:
+                        continue
+                    entries.append((mtime, _dir_size(path), path))
+        return entries
+
+    def evict(self) -> int:
+        """
+        Удаляет устаревшие записи и самые давно использованные, пока размер кэша больше лимита.
+        Возвращает число удалённых записей.
+        """
+        if not self.enabled:
+            return 0
+        try:
+            entries = self._entries()
+        except OSError:
+            return 0
+        total = sum(size for _mtime, size, _path in entries)
+        removed = 0
+        now = time.time()
+        for mtime, size, path in sorted(entries):
+            expired = self.max_age_s > 0 and now - mtime > self.max_age_s
+            if total <= self.max_bytes and not expired:
+                break
+            if not expired and now - mtime < self.min_age_s:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        with self._evict_lock:
+            self._estimated_bytes = total
+        self._prune_locks(now)
+        return removed
+
+    def _prune_locks(self, now: float) -> None:
+        lock_dir = os.path.join(self.root, self.LOCK_DIR)
+        try:
+            names = os.listdir(lock_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(lock_dir, name)
+            try:
+                if now - os.stat(path).st_mtime > self.LOCK_TTL_S:
+                    os.unlink(path)
+            except OSError:
+                continue
+
+    def stats(self) -> dict:
+        entries = self._entries() if self.enabled else []
+        return {
+            "enabled": self.enabled,
+            "entries": len(entries),
+            "bytes": sum(size for _mtime, size, _path in entries),
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import math
+import random
+from typing import Callable
+
+# Модели сложности для подбора по замерам: время ≈ a + b·f(n). Порядок важен: при равной
+# ошибке выбирается более простая модель.
+COMPLEXITY_MODELS: dict[str, Callable[[float], float]] = {
+    "O(1)": lambda n: 0.0,
+    "O(log n)": lambda n: math.log2(n),
+    "O(n)": lambda n: n,
+    "O(n log n)": lambda n: n * math.log2(n),
+    "O(n^2)": lambda n: n * n,
+    "O(n^3)": lambda n: n * n * n,
+}
+# Столько разных размеров входа нужно, чтобы подбор сложности что-то значил.
+MIN_FIT_POINTS = 3
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Перцентиль q (0..100) с линейной интерполяцией между соседними значениями.
+    """
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    pos = (len(ordered) - 1) * q / 100
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def summarize(values: list[float | None]) -> dict | None:
+    """
+    min / median / p95 по замерам; None — ни одного замера (платформа без wait4 для CPU).
+    """
+    measured = [v for v in values if v is not None]
+    if not measured:
+        return None
+    return {
+        "min": round(min(measured), 3),
+        "median": round(percentile(measured, 50), 3),
+        "p95": round(percentile(measured, 95), 3),
+    }
+
+
+def _fit(xs: list[float], ys: list[float]) -> tuple[float, float]:
+    # Наименьшие квадраты для y = a + b·x; при нулевом разбросе x (модель O(1)) — среднее.
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    if var_x == 0:
+        return mean_y, 0.0
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+    return mean_y - slope * mean_x, slope
+
+
+def fit_complexity(points: list[tuple[int, float]]) -> dict | None:
+    """
+    Оценка асимптотики по парам (размер входа, время): для каждой модели из COMPLEXITY_MODELS
+    подбираются a и b (b ≥ 0 — время не убывает с ростом входа), выбирается модель
+    с наименьшей среднеквадратичной ошибкой относительно среднего времени.
+    None — меньше MIN_FIT_POINTS разных размеров.
+    Постоянная часть a поглощает запуск процесса, поэтому на маленьких входах результат
+    тяготеет к O(1) — размеры стоит брать такие, чтобы время заметно росло.
+    """
+    points = [(max(int(n), 1), float(t)) for n, t in points if n is not None and t is not None]
+    if len({n for n, _t in points}) < MIN_FIT_POINTS:
+        return None
+    ys = [t for _n, t in points]
+    mean_y = sum(ys) / len(ys)
+    best: dict | None = None
+    for name, f in COMPLEXITY_MODELS.items():
+        xs = [f(n) for n, _t in points]
+        a, b = _fit(xs, ys)
+        if b < 0:
+            a, b = mean_y, 0.0
+        rms = math.sqrt(sum((a + b * x - y) ** 2 for x, y in zip(xs, ys)) / len(ys))
+        error = rms / mean_y if mean_y > 0 else 0.0
+        if best is None or error < best["error"] - 1e-9:
+            best = {"complexity": name, "error": error, "intercept": a, "coefficient": b}
+    return {
+        "complexity": best["complexity"],
+        "error": round(best["error"], 4),
+        "intercept_ms": round(best["intercept"], 6),
+        "coefficient_ms": best["coefficient"],
+    }
+
+
+def generate_input(size: int, seed: int = 0) -> str:
+    """
+    Вход для замера по размеру: "n" и n случайных целых через пробел — формат большинства
+    задач на массивы. Детерминирован по (size, seed), чтобы замеры версий были сравнимы.
+    """
+    rng = random.Random(seed * 1_000_003 + size)
+    numbers = " ".join(str(rng.randint(0, 10**9)) for _ in range(size))
+    return f"{size}\n{numbers}\n"
+
+
+def _case_time(case: dict, metric: str) -> float | None:
+    return ((case.get(metric) or {}).get("median")) if case.get("status") == "ok" else None
+
+
+def compare_runs(
+    base_cases: list[dict],
+    head_cases: list[dict],
+    threshold: float,
+    min_delta_ms: float = 0.0,
+) -> dict:
+    """
+    Сравнение замеров двух версий по входам (сопоставляются по size, а без размеров — по порядку).
+    Регрессия на входе — медиана новой версии больше старой в threshold раз и не меньше чем
+    на min_delta_ms (иначе шум запуска процесса), либо новая версия упала на входе, где старая
+    отработала. Время — CPU, если он измерен у обеих версий, иначе по часам.
+    """
+    sized = all(case.get("size") is not None for case in base_cases + head_cases)
+    base_by = {(case.get("size") if sized else i): case for i, case in enumerate(base_cases)}
+    metric = (
+        "cpu_time_ms"
+        if all(case.get("cpu_time_ms") for case in base_cases + head_cases if case.get("status") == "ok")
+        else "wall_time_ms"
+    )
+    cases = []
+    max_ratio: float | None = None
+    for i, head in enumerate(head_cases):
+        base = base_by.get(head.get("size") if sized else i)
+        if base is None:
+            continue
+        base_ms, head_ms = _case_time(base, metric), _case_time(head, metric)
+        ratio = None
+        if base_ms is None:
+            verdict = "incomparable"
+        elif head_ms is None:
+            verdict = "failed"
+        else:
+            ratio = round(head_ms / base_ms, 3) if base_ms > 0 else None
+            slower = ratio is not None and ratio > threshold and head_ms - base_ms >= min_delta_ms
+            verdict = "regression" if slower else "ok"
+            if ratio is not None:
+                max_ratio = ratio if max_ratio is None else max(max_ratio, ratio)
+        cases.append(
+            {
+                "size": head.get("size"),
+                "base_ms": base_ms,
+                "head_ms": head_ms,
+                "ratio": ratio,
+                "status": verdict,
+            }
+        )
+    return {
+        "metric": metric,
+        "threshold": threshold,
+        "regression": any(case["status"] in ("regression", "failed") for case in cases),
+        "max_ratio": max_ratio,
+        "cases": cases,
+    }
+
+
+def complexity_grew(base: str | None, head: str | None) -> bool:
+    """
+    Оценка сложности новой версии хуже старой (по порядку COMPLEXITY_MODELS).
+    """
+    order = list(COMPLEXITY_MODELS)
+    if base not in order or head not in order:
+        return False
+    return order.index(head) > order.index(base)
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from .admission import AdmissionRejected
+from .benchmark import compare_runs, complexity_grew, generate_input
+from .compile_service import benchmark_code
+from .models import COMPILE_PROFILE_DEFAULT, Algorithm, AlgorithmBenchmark
+from .serializers import benchmark_result_data
+
+# Сколько всего фоновый замер ждёт слот контроля нагрузки; после этого замер пропускается.
+ADMISSION_MAX_WAIT_S = 600
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+# (алгоритм, хэш кода, повод) замеров, которые уже стоят в очереди: повторное сохранение
+# той же версии не ставит второй замер.
+_pending: set[tuple[int, str, str]] = set()
+
+
+def _enabled() -> bool:
+    return bool(getattr(settings, 'ALGO_BENCHMARK_ON_APPROVAL', True))
+
+
+def record(algorithm: Algorithm, data: dict, repeat: int, trigger: str, user=None, **build) -> AlgorithmBenchmark:
+    """
+    Сохраняет ответ бенчмарка (benchmark_result_data) в историю версии алгоритма.
+    build — language, compiler, compile_profile замера (по умолчанию — алгоритма).
+    """
+    complexity = data.get('complexity') or {}
+    return AlgorithmBenchmark.objects.create(
+        algorithm_id=algorithm.pk,
+        code_hash=algorithm.code_hash,
+        language=build.get('language') or algorithm.language or '',
+        compiler=build.get('compiler') or algorithm.compiler or '',
+        compile_profile=build.get('compile_profile') or algorithm.compile_profile or COMPILE_PROFILE_DEFAULT,
+        trigger=trigger,
+        repeat=repeat,
+        complexity=complexity.get('complexity', ''),
+        results={
+            'cases': data.get('cases', []),
+            'complexity': data.get('complexity'),
+            **({'error': data['error']} if data.get('error') else {}),
+        },
+        created_by=user,
+    )
+
+
+def measured(queryset):
+    """
+    Замеры без пропущенных (results.error — замер не выполнялся, см. run).
+    """
+    return queryset.exclude(results__has_key='error')
+
+
+def run(algorithm: Algorithm, trigger: str) -> AlgorithmBenchmark | None:
+    """
+    Синхронный замер алгоритма на стандартных размерах входа (ALGO_BENCHMARK_SIZES) и запись
+    в историю. None — код не собрался (ошибку компиляции видно и без замеров).
+    Слот контроля нагрузки не отклоняет фоновый замер, а ждётся — не дольше ADMISSION_MAX_WAIT_S,
+    после чего в историю пишется пропущенный замер (без входов, с results.error).
+    """
+    sizes = list(settings.ALGO_BENCHMARK_SIZES)
+    repeat = int(settings.ALGO_BENCHMARK_REPEAT)
+    cases = [{'stdin': generate_input(n), 'size': n} for n in sizes]
+    deadline = time.monotonic() + ADMISSION_MAX_WAIT_S
+    while True:
+        try:
+            compile_res, results = benchmark_code(
+                language=algorithm.language or '',
+                code=algorithm.code or '',
+                cases=cases,
+                repeat=repeat,
+                compiler=algorithm.compiler or None,
+                profile=algorithm.compile_profile or None,
+            )
+            break
+        except AdmissionRejected as e:
+            if time.monotonic() + e.retry_after > deadline:
+                logger.warning('Замер алгоритма %s пропущен: сервер перегружен', algorithm.pk)
+                skipped = {'cases': [], 'complexity': None, 'error': 'Замер пропущен: сервер перегружен.'}
+                return record(algorithm, skipped, repeat, trigger)
+            time.sleep(e.retry_after)
+    if not compile_res.compiled:
+        return None
+    return record(algorithm, benchmark_result_data(compile_res, results), repeat, trigger)
+
+
+def schedule(algorithm: Algorithm, trigger: str) -> None:
+    """
+    Ставит фоновый замер версии после коммита транзакции. Код берётся на момент вызова.
+    """
+    if not _enabled() or not (algorithm.code or '').strip():
+        return
+    snapshot = Algorithm(
+        pk=algorithm.pk,
+        language=algorithm.language,
+        code=algorithm.code,
+        compiler=algorithm.compiler,
+        compile_profile=algorithm.compile_profile,
+    )
+    key = (algorithm.pk, snapshot.code_hash, trigger)
+    transaction.on_commit(lambda: _submit(snapshot, trigger, key))
+
+
+def _submit(algorithm: Algorithm, trigger: str, key: tuple[int, str, str]) -> None:
+    global _executor
+    # Очередь отмечается только после коммита: откат транзакции не оставляет «вечный» замер в очереди.
+    with _lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+        if _executor is None:
+            # Замеры идут по одному: параллельные запуски исказили бы время друг друга.
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='algo-benchmark')
+    _executor.submit(_run_in_thread, algorithm, trigger, key)
+
+
+def _run_in_thread(algorithm: Algorithm, trigger: str, key: tuple[int, str, str]) -> None:
+    close_old_connections()
+    try:
+        run(algorithm, trigger)
+    except Exception:
+        logger.exception('Сбой замера алгоритма %s', algorithm.pk)
+    finally:
+        with _lock:
+            _pending.discard(key)
+        connection.close()
+
+
+def on_saved(algorithm: Algorithm) -> None:
+    """
+    Замер новой версии: при одобрении (эталон одобренной версии) и после правки кода
+    алгоритма, у которого уже есть эталон, — чтобы модератор видел сравнение до одобрения.
+    Версия, у которой замер с тем же поводом уже есть, повторно не замеряется (пропущенный
+    замер не считается — следующее сохранение попробует снова).
+    """
+    if not _enabled():
+        return
+    if algorithm.status == Algorithm.STATUS_APPROVED:
+        trigger = AlgorithmBenchmark.TRIGGER_APPROVAL
+    elif algorithm.status == Algorithm.STATUS_PENDING and algorithm.benchmarks.filter(
+        trigger=AlgorithmBenchmark.TRIGGER_APPROVAL
+    ).exists():
+        trigger = AlgorithmBenchmark.TRIGGER_EDIT
+    else:
+        return
+    if measured(algorithm.benchmarks.filter(code_hash=algorithm.code_hash, trigger=trigger)).exists():
+        return
+    schedule(algorithm, trigger)
+
+
+def baseline(algorithm: Algorithm, exclude_code_hash: str) -> AlgorithmBenchmark | None:
+    """
+    Эталон для сравнения: последний замер при одобрении версии с другим кодом.
+    """
+    return (
+        measured(algorithm.benchmarks.filter(trigger=AlgorithmBenchmark.TRIGGER_APPROVAL))
+        .exclude(code_hash=exclude_code_hash)
+        .first()
+    )
+
+
+def compare(base: AlgorithmBenchmark, head: AlgorithmBenchmark, threshold: float | None = None) -> dict:
+    """
+    Сравнение двух замеров: по входам (см. benchmark.compare_runs) и по оценке сложности.
+    """
+    if threshold is None:
+        threshold = float(settings.ALGO_BENCHMARK_REGRESSION_THRESHOLD)
+    result = compare_runs(
+        base.results.get('cases', []),
+        head.results.get('cases', []),
+        threshold=threshold,
+        min_delta_ms=float(settings.ALGO_BENCHMARK_REGRESSION_MIN_MS),
+    )
+    return {
+        **result,
+        'base_id': base.pk,
+        'head_id': head.pk,
+        'base_complexity': base.complexity or None,
+        'head_complexity': head.complexity or None,
+        'complexity_grew': complexity_grew(base.complexity, head.complexity),
+    }
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import contextlib
+import itertools
+import os
+import signal
+import threading
+import time
+from typing import Callable, Iterator
+
+CONTROLLERS = ("memory", "cpu", "pids")
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding="ascii") as f:
+        return f.read()
+
+
+def _write(path: str, value: str) -> None:
+    with open(path, "w", encoding="ascii") as f:
+        f.write(value)
+
+
+class Cgroup:
+    """
+    Одна cgroup на время компиляции или запуска: процесс входит в неё до exec (preexec),
+    потомки наследуют её автоматически.
+    """
+
+    # Сколько ждать, пока ядро уберёт убитые процессы из cgroup перед rmdir.
+    DRAIN_TIMEOUT_S = 1.0
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def preexec(self, inner: Callable[[], None] | None = None) -> Callable[[], None]:
+        procs = os.path.join(self.path, "cgroup.procs")
+
+        def _join():
+            fd = os.open(procs, os.O_WRONLY | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, str(os.getpid()).encode("ascii"))
+            finally:
+                os.close(fd)
+            if inner is not None:
+                inner()
+
+        return _join
+
+    def usage(self) -> dict:
+        """
+        CPU (user+sys всех процессов группы, мс) и пик памяти (КБ); None — ядро не отдаёт
+        (memory.peak появился в Linux 5.19).
+        """
+        cpu_ms = None
+        try:
+            for line in _read(os.path.join(self.path, "cpu.stat")).splitlines():
+                name, _sep, value = line.partition(" ")
+                if name == "usage_usec":
+                    cpu_ms = int(value) / 1000
+                    break
+        except (OSError, ValueError):
+            pass
+        try:
+            max_rss_kb = int(_read(os.path.join(self.path, "memory.peak")).strip()) // 1024
+        except (OSError, ValueError):
+            max_rss_kb = None
+        return {"cpu_ms": cpu_ms, "max_rss_kb": max_rss_kb}
+
+    def oom_killed(self) -> bool:
+        try:
+            for line in _read(os.path.join(self.path, "memory.events")).splitlines():
+                name, _sep, value = line.partition(" ")
+                if name == "oom_kill":
+                    return int(value) > 0
+        except (OSError, ValueError):
+            pass
+        return False
+
+    def _pids(self) -> list[int]:
+        try:
+            return [int(p) for p in _read(os.path.join(self.path, "cgroup.procs")).split()]
+        except (OSError, ValueError):
+            return []
+
+    def _populated(self) -> bool | None:
+        try:
+            for line in _read(os.path.join(self.path, "cgroup.events")).splitlines():
+                name, _sep, value = line.partition(" ")
+                if name == "populated":
+                    return value.strip() == "1"
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def destroy(self) -> None:
+        """
+        Убивает всё, что осталось в группе (в том числе потомков, сменивших группу процессов),
+        и удаляет её. Неудача не критична: пустую группу можно удалить позже.
+        """
+        kill_file = os.path.join(self.path, "cgroup.kill")
+        try:
+            if os.path.exists(kill_file):
+                _write(kill_file, "1")
+            else:
+                for pid in self._pids():
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        deadline = time.monotonic() + self.DRAIN_TIMEOUT_S
+        while self._populated() and time.monotonic() < deadline:
+            time.sleep(0.005)
+        try:
+            os.rmdir(self.path)
+        except OSError:
+            pass
+
+
+class CgroupLimiter:
+    """
+    Лимиты через cgroup v2 вместо RLIMIT_AS: memory.max считает реально занятую память всех
+    процессов группы (а не зарезервированное адресное пространство — JVM резервирует гигабайты
+    и с RLIMIT_AS падает при старте), cpu.max ограничивает долю CPU, pids.max — число процессов.
+
+    root — каталог делегированной backend-у cgroup (например, созданный entrypoint-ом
+    /sys/fs/cgroup/algo), в которой доступны контроллеры memory, cpu и pids. Если root не задан
+    или не подходит, group() отдаёт None — вызывающий код ставит rlimit-ы как раньше.
+    """
+
+    CPU_PERIOD_US = 100000
+
+    def __init__(self, root: str, cpus: float, pids_max: int):
+        self.root = root
+        self.cpus = cpus
+        self.pids_max = pids_max
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._available: bool | None = None
+        self._error: str | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.root) and os.name != "nt"
+
+    def _probe(self) -> None:
+        try:
+            controllers = set(_read(os.path.join(self.root, "cgroup.controllers")).split())
+        except OSError as e:
+            self._error = f"нет cgroup v2 в {self.root}: {e}"
+            return
+        missing = [c for c in CONTROLLERS if c not in controllers]
+        if missing:
+            self._error = f"контроллеры не делегированы: {', '.join(missing)}"
+            return
+        subtree = os.path.join(self.root, "cgroup.subtree_control")
+        try:
+            enabled = set(_read(subtree).split())
+            if not all(c in enabled for c in CONTROLLERS):
+                _write(subtree, " ".join(f"+{c}" for c in CONTROLLERS))
+        except OSError as e:
+            self._error = f"не удалось включить контроллеры: {e}"
+            return
+        if not os.access(self.root, os.W_OK):
+            self._error = f"нет прав на запись в {self.root}"
+            return
+        self._available = True
+
+    @property
+    def available(self) -> bool:
+        if not self.enabled:
+            return False
+        with self._lock:
+            if self._available is None:
+                self._available = False
+                self._probe()
+            return self._available
+
+    @contextlib.contextmanager
+    def group(self, memory_mb: int) -> Iterator[Cgroup | None]:
+        """
+        Новая cgroup с лимитами на время блока или None — cgroups недоступны (тогда rlimit-ы).
+        """
+        if not self.available:
+            yield None
+            return
+        path = os.path.join(self.root, f"run_{os.getpid()}_{next(self._counter)}")
+        try:
+            os.mkdir(path)
+        except OSError:
+            yield None
+            return
+        cgroup = Cgroup(path)
+        try:
+            mem_bytes = int(memory_mb) * 1024 * 1024
+            _write(os.path.join(path, "memory.max"), str(mem_bytes))
+            if os.path.exists(os.path.join(path, "memory.swap.max")):
+                _write(os.path.join(path, "memory.swap.max"), "0")
+            quota = max(1000, int(self.cpus * self.CPU_PERIOD_US))
+            _write(os.path.join(path, "cpu.max"), f"{quota} {self.CPU_PERIOD_US}")
+            _write(os.path.join(path, "pids.max"), str(self.pids_max))
+        except OSError:
+            cgroup.destroy()
+            yield None
+            return
+        try:
+            yield cgroup
+        finally:
+            cgroup.destroy()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "available": self.available,
+            "root": self.root,
+            "cpus": self.cpus,
+            "pids_max": self.pids_max,
+            "error": self._error,
+        }
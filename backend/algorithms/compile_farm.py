@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import concurrent.futures
+import json
+import os
+import socket
+import socketserver
+from typing import Callable
+
+from .artifact_cache import cache_key
+from .singleflight import SingleFlight
+
+# Поля задания, которые определяют результат компиляции (они же — ключ склейки одинаковых заданий).
+JOB_FIELDS = ("language", "code", "compiler", "timeout_s", "memory_mb", "profile")
+
+
+def job_key(job: dict) -> str:
+    return cache_key(*(json.dumps(job.get(name)) for name in JOB_FIELDS))
+
+
+class CompileFarmClient:
+    """
+    Клиент фермы компиляции (`manage.py compile_worker`) на стороне backend-а.
+
+    Протокол — одна строка JSON в каждую сторону: задание {"language", "code", "compiler",
+    "timeout_s", "memory_mb", "profile"}, ответ {"kind": "result", "result": {...CompileResult},
+    "artifact": путь | null, "shared": bool} или {"kind": "error", "message"}. Артефакт ферма
+    кладёт в общий кэш артефактов, backend запускает его оттуда. OSError — ферма недоступна
+    или не ответила; вызывающий код тогда компилирует сам.
+    """
+
+    # Запас сверх лимита компиляции: задание может постоять в очереди фермы.
+    QUEUE_WAIT_S = 30.0
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.socket_path) and os.name != "nt"
+
+    def compile(self, job: dict) -> dict:
+        self.requests += 1
+        try:
+            return self._request(job)
+        except OSError:
+            self.failures += 1
+            raise
+
+    def _request(self, job: dict) -> dict:
+        request = {name: job.get(name) for name in JOB_FIELDS}
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(float(job.get("timeout_s") or 10) + self.QUEUE_WAIT_S)
+            sock.connect(self.socket_path)
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+        finally:
+            sock.close()
+        if not line:
+            raise OSError("ферма компиляции закрыла соединение без ответа")
+        try:
+            reply = json.loads(line)
+        except ValueError as e:
+            raise OSError(f"некорректный ответ фермы компиляции: {e}")
+        if reply.get("kind") != "result":
+            raise OSError(reply.get("message") or "ошибка фермы компиляции")
+        return reply
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "socket": self.socket_path,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class _FarmHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict) or job.get("language") not in self.server.languages:
+                raise ValueError(f"язык не поддерживается: {job.get('language') if isinstance(job, dict) else job}")
+            reply, shared = self.server.submit(job)
+        except (ValueError, TypeError) as e:
+            self._send({"kind": "error", "message": f"некорректное задание: {e}"})
+            return
+        except Exception as e:
+            self._send({"kind": "error", "message": f"сбой компиляции: {e}"})
+            return
+        self._send({"kind": "result", **reply, "shared": shared})
+
+    def _send(self, event: dict) -> None:
+        try:
+            self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+            self.wfile.flush()
+        except OSError:
+            # Клиент ушёл (например, по таймауту) — результат всё равно уже в кэше артефактов.
+            pass
+
+
+class CompileFarm(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Ферма компиляции: принимает задания через Unix-сокет, одинаковые задания, пришедшие
+    одновременно, склеивает (SingleFlight — компилятор запускается один раз, ответ получают все)
+    и выполняет не больше workers компиляций сразу. build(job) -> {"result": {...}, "artifact": ...}
+    вызывается в пуле; каждая компиляция — отдельный процесс компилятора, поэтому пулу
+    достаточно потоков. Сокет доступен только владельцу (0600).
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        build: Callable[[dict], dict],
+        workers: int,
+        languages: tuple[str, ...] = ("cpp", "java"),
+    ):
+        self.build = build
+        self.languages = languages
+        self.workers = max(1, int(workers))
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="algo-farm")
+        self.flight: SingleFlight[dict] = SingleFlight()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _FarmHandler)
+        os.chmod(socket_path, 0o600)
+
+    def submit(self, job: dict) -> tuple[dict, bool]:
+        return self.flight.do(job_key(job), lambda: self.pool.submit(self.build, job).result())
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, **self.flight.stats()}
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.shutdown(wait=False)
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
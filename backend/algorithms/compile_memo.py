@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class CompileMemo(Generic[T]):
+    """
+    Короткоживущий кэш результатов компиляции в памяти процесса.
+
+    Нужен для неудачных компиляций: успешные уже лежат в ArtifactCache, а ошибка компилятора
+    там не сохраняется, и повторное нажатие «Запустить» на том же сломанном коде снова
+    запускало бы компилятор ради того же сообщения. Записи живут ttl_s секунд (после обновления
+    тулчейна ключ и так меняется, TTL лишь ограничивает память), не больше max_entries — LRU.
+    """
+
+    def __init__(self, ttl_s: float, max_entries: int):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, T]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_s > 0 and self.max_entries > 0
+
+    def get(self, key: str) -> T | None:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] <= now:
+                del self._entries[key]
+                item = None
+            if item is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return item[1]
+
+    def put(self, key: str, value: T) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            self._stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ttl_s": self.ttl_s,
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "stores": self._stores,
+            }
@@ -1,11 +1,37 @@
 from __future__ import annotations
 
+import codecs
+import concurrent.futures
+import functools
+import hashlib
+import io
 import os
 import re
-import shutil
+import selectors
+import signal
 import subprocess
 import tempfile
-from dataclasses import dataclass
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, replace
+from typing import Callable, Iterator
+
+from .admission import AdmissionController, AdmissionRejected
+from .artifact_cache import ArtifactCache, cache_key
+from .cgroups import CgroupLimiter
+from .compile_farm import CompileFarmClient
+from .benchmark import summarize
+from .compile_memo import CompileMemo
+from .diagnostics import Diagnostic, from_python_error, parse_gcc, parse_javac
+from .executors import ProcessOutcome, make_executor
+from .jvm import JvmTuning
+from .pch import PchManager
+from .python_pool import WORKER_SCRIPT, PythonWorkerPool
+from .singleflight import SingleFlight
+from .toolchains import Toolchain, ToolchainRegistry
+from .workspace import WorkspacePool, default_root
 
 
 @dataclass(frozen=True)
@@ -15,6 +41,10 @@ class CompileResult:
     stderr: str
     exit_code: int | None
     command: list[str]
+    # Ресурсы процесса компиляции (None — не измерялось, например артефакт взят из кэша).
+    wall_time_ms: float | None = None
+    cpu_time_ms: float | None = None
+    max_rss_kb: int | None = None
 
 
 @dataclass(frozen=True)
@@ -24,12 +54,234 @@ class RunResult:
     stderr: str
     exit_code: int | None
     command: list[str]
+    # Время по часам, CPU (user+sys) и пиковый RSS запущенной программы.
+    wall_time_ms: float | None = None
+    cpu_time_ms: float | None = None
+    max_rss_kb: int | None = None
+    # Программа остановлена за превышение лимита вывода (MAX_OUTPUT_CHARS).
+    output_limit_exceeded: bool = False
+
+
+@dataclass(frozen=True)
+class CaseResult:
+    """
+    Результат одного теста пакетного запуска.
+    status: ok | wrong_answer | runtime_error | timeout | output_limit | error;
+    passed — None, если ожидаемый вывод не задан.
+    """
+    status: str
+    passed: bool | None
+    stdout: str
+    stderr: str
+    exit_code: int | None
+    wall_time_ms: float | None
+    cpu_time_ms: float | None
+    max_rss_kb: int | None
+
+
+@dataclass(frozen=True)
+class BenchmarkCase:
+    """
+    Замеры одного входа в режиме бенчмарка: repeat запусков подряд.
+    status: ok | runtime_error | timeout | output_limit | error (прогон останавливается на первом сбое);
+    wall_time_ms / cpu_time_ms — {"min", "median", "p95"} по успешным запускам, max_rss_kb — пик по ним.
+    """
+    size: int | None
+    status: str
+    runs: int
+    wall_time_ms: dict | None
+    cpu_time_ms: dict | None
+    max_rss_kb: int | None
+    stderr: str
 
 
 MAX_SOURCE_CHARS = int(os.environ.get("ALGO_MAX_SOURCE_CHARS", "50000"))
 MAX_STDIN_CHARS = int(os.environ.get("ALGO_MAX_STDIN_CHARS", "10000"))
 MAX_OUTPUT_CHARS = int(os.environ.get("ALGO_MAX_OUTPUT_CHARS", "20000"))
 
+# Кэш скомпилированных артефактов: 0 в ALGO_ARTIFACT_CACHE_MAX_MB выключает кэш.
+ARTIFACT_CACHE_DIR = os.environ.get(
+    "ALGO_ARTIFACT_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "algo_artifacts"),
+)
+ARTIFACT_CACHE_MAX_MB = int(os.environ.get("ALGO_ARTIFACT_CACHE_MAX_MB", "512"))
+ARTIFACT_CACHE_MAX_AGE_S = int(os.environ.get("ALGO_ARTIFACT_CACHE_MAX_AGE_S", str(7 * 24 * 3600)))
+# Ключ подписи записей кэша (см. ArtifactCache): общий для всех процессов backend-а и фермы.
+# Без ALGO_ARTIFACT_CACHE_SECRET берётся DJANGO_SECRET_KEY, без обоих — случайный ключ процесса
+# (записи других процессов тогда не проходят проверку и пересобираются).
+ARTIFACT_CACHE_SECRET = (
+    os.environ.get("ALGO_ARTIFACT_CACHE_SECRET") or os.environ.get("DJANGO_SECRET_KEY") or ""
+).encode("utf-8") or os.urandom(32)
+
+# Пул прогретых Python-воркеров: 0 в ALGO_PY_POOL_SIZE выключает пул.
+PY_POOL_SIZE = int(os.environ.get("ALGO_PY_POOL_SIZE", "2"))
+PY_POOL_MAX_JOBS = int(os.environ.get("ALGO_PY_POOL_MAX_JOBS", "100"))
+
+# Сколько результатов проверки синтаксиса (Python и /compile/ для C++/Java) держать в памяти (LRU по хэшу исходника).
+SYNTAX_CACHE_SIZE = int(os.environ.get("ALGO_SYNTAX_CACHE_SIZE", "1024"))
+# Проверка синтаксиса Python идёт в потоках backend-а, а compile() не прерывается: исходники
+# с очень длинными строками или глубокой вложенностью скобок отклоняются до compile(),
+# а проверок одновременно идёт не больше SYNTAX_WORKERS (зависшая занимает место до конца).
+SYNTAX_WORKERS = int(os.environ.get("ALGO_SYNTAX_WORKERS", "2"))
+PY_MAX_LINE_CHARS = int(os.environ.get("ALGO_PY_MAX_LINE_CHARS", "10000"))
+PY_MAX_NESTING = int(os.environ.get("ALGO_PY_MAX_NESTING", "100"))
+
+# Контроль нагрузки: сколько компиляций/запусков одного языка идёт одновременно на хосте,
+# сколько запросов может ждать слот и как долго. 0 слотов — без ограничения.
+ADMISSION_DIR = os.environ.get("ALGO_ADMISSION_DIR", os.path.join(tempfile.gettempdir(), "algo_admission"))
+ADMISSION_SLOTS = int(os.environ.get("ALGO_ADMISSION_SLOTS", str(os.cpu_count() or 2)))
+ADMISSION_QUEUE = int(os.environ.get("ALGO_ADMISSION_QUEUE", "32"))
+ADMISSION_WAIT_S = float(os.environ.get("ALGO_ADMISSION_WAIT_S", "10"))
+
+# Пул рабочих каталогов (по умолчанию на tmpfs): 0 в ALGO_WORKSPACE_POOL_SIZE — TemporaryDirectory на вызов.
+WORKSPACE_DIR = os.environ.get("ALGO_WORKSPACE_DIR") or default_root()
+WORKSPACE_POOL_SIZE = int(os.environ.get("ALGO_WORKSPACE_POOL_SIZE", str(2 * (os.cpu_count() or 2))))
+
+# Пакетный запуск: максимум тестов за запрос и сколько из них выполняется параллельно.
+MAX_BATCH_CASES = int(os.environ.get("ALGO_MAX_BATCH_CASES", "50"))
+BATCH_WORKERS = int(os.environ.get("ALGO_BATCH_WORKERS", str(os.cpu_count() or 2)))
+
+# Предкомпилированные заголовки C++: 0 в ALGO_PCH_MAX_MB выключает PCH.
+PCH_DIR = os.environ.get("ALGO_PCH_DIR", os.path.join(tempfile.gettempdir(), "algo_pch"))
+PCH_MAX_MB = int(os.environ.get("ALGO_PCH_MAX_MB", "1024"))
+PCH_MIN_USES = int(os.environ.get("ALGO_PCH_MIN_USES", "2"))
+PCH_BUILD_MEMORY_MB = int(os.environ.get("ALGO_PCH_BUILD_MEMORY_MB", "1024"))
+PCH_WARMUP = os.environ.get("ALGO_PCH_WARMUP", "").strip().lower() in {"1", "true", "yes", "on"}
+# Наборы заголовков, PCH для которых собирается при старте backend-а.
+PCH_WARM_SETS: list[tuple[str, ...]] = [
+    ("bits/stdc++.h",),
+    ("iostream",),
+    ("algorithm", "iostream", "vector"),
+]
+
+# Память неудачных компиляций: тот же сломанный исходник в течение TTL не компилируется повторно.
+COMPILE_MEMO_TTL_S = float(os.environ.get("ALGO_COMPILE_MEMO_TTL_S", "60"))
+COMPILE_MEMO_SIZE = int(os.environ.get("ALGO_COMPILE_MEMO_SIZE", "1024"))
+# Сколько сверх лимита компиляции ждать, пока тот же код собирает другой процесс, прежде чем собирать самим.
+COMPILE_LOCK_GRACE_S = float(os.environ.get("ALGO_COMPILE_LOCK_GRACE_S", "5"))
+
+# Как запускать собранные программы: local — дочерний процесс с rlimit-ами, namespace — через
+# unshare в отдельных пространствах имён, remote — в процессе `manage.py run_execution_daemon`
+# через Unix-сокет EXECUTOR_SOCKET.
+EXECUTOR_DRIVER = os.environ.get("ALGO_EXECUTOR", "local").strip().lower()
+EXECUTOR_SOCKET = os.environ.get("ALGO_EXECUTOR_SOCKET", os.path.join(tempfile.gettempdir(), "algo_executor.sock"))
+
+# cgroup v2 для лимитов компиляции и запуска: каталог делегированной backend-у cgroup с контроллерами
+# memory, cpu и pids. Пусто (по умолчанию) или cgroup недоступна — лимиты через rlimit-ы.
+CGROUP_ROOT = os.environ.get("ALGO_CGROUP_ROOT", "")
+CGROUP_CPUS = float(os.environ.get("ALGO_CGROUP_CPUS", "1"))
+CGROUP_PIDS_MAX = int(os.environ.get("ALGO_CGROUP_PIDS_MAX", "64"))
+
+# Ферма компиляции (`manage.py compile_worker`): если задан сокет, C++ и Java собираются в её процессе,
+# а backend берёт готовый артефакт из общего кэша. Ферма недоступна — компиляция на месте, как раньше.
+COMPILE_FARM_SOCKET = os.environ.get("ALGO_COMPILE_FARM_SOCKET", "")
+COMPILE_FARM_WORKERS = int(os.environ.get("ALGO_COMPILE_FARM_WORKERS", str(os.cpu_count() or 2)))
+
+# Java: флаги JVM для коротких запусков и CDS-архив классов JDK (строится в фоне, раз на версию JDK).
+# JVM_CDS_WARMUP — собрать архив сразу при старте backend-а, а не при первом запуске Java.
+JVM_CDS = os.environ.get("ALGO_JVM_CDS", "1").strip().lower() in {"1", "true", "yes", "on"}
+JVM_CDS_WARMUP = os.environ.get("ALGO_JVM_CDS_WARMUP", "").strip().lower() in {"1", "true", "yes", "on"}
+# Лимит памяти javac: memory.max в cgroup, а без cgroup — только куча (-J-Xmx), потому что
+# с RLIMIT_AS JVM не стартует (резервирует адресное пространство с большим запасом).
+JAVAC_MEMORY_MB = int(os.environ.get("ALGO_JAVAC_MEMORY_MB", "1024"))
+
+# Реестр тулчейнов: PATH и версии опрашиваются (в фоне) раз в TOOLCHAIN_REFRESH_S секунд (0 — только при старте
+# и по SIGHUP), а не на каждый запуск.
+TOOLCHAIN_REFRESH_S = float(os.environ.get("ALGO_TOOLCHAIN_REFRESH_S", "300"))
+
+SUPPORTED_LANGUAGES = ("cpp", "python", "java")
+# Языки, артефакты которых имеет смысл собирать заранее (у Python кэшируется только проверка синтаксиса в памяти процесса).
+PREBUILD_LANGUAGES = ("cpp", "java")
+# Сколько всего фоновая предсборка ждёт слот контроля нагрузки, прежде чем отказаться от сборки.
+PREBUILD_MAX_WAIT_S = int(os.environ.get("ALGO_PREBUILD_MAX_WAIT_S", "600"))
+
+CPP_FLAGS = ["-std=c++17", "-O2"]
+# Проверка без сборки (/compile/): только разбор и семантика, без генерации кода и линковки.
+# Флаги — как у default, чтобы подошёл тот же PCH.
+CPP_SYNTAX_FLAGS = [*CPP_FLAGS, "-fsyntax-only"]
+# javac без обработчиков аннотаций и без записи .class: остановка после анализа потоков
+# (скрытая опция; JDK, которые её не знают, просто пишут классы в рабочий каталог проверки).
+JAVAC_SYNTAX_FLAGS = ["-proc:none", "-implicit:none", "-XDshould-stop.ifNoError=FLOW"]
+
+# Режим бенчмарка: потолки числа повторов, запусков на запрос и размера одного входа
+# (входы могут генерироваться сервером, поэтому лимит отдельный от ALGO_MAX_STDIN_CHARS).
+BENCHMARK_MAX_REPEAT = int(os.environ.get("ALGO_BENCHMARK_MAX_REPEAT", "10"))
+BENCHMARK_MAX_RUNS = int(os.environ.get("ALGO_BENCHMARK_MAX_RUNS", "30"))
+BENCHMARK_MAX_INPUT_CHARS = int(os.environ.get("ALGO_BENCHMARK_MAX_INPUT_CHARS", str(2 * 1024 * 1024)))
+# Вывод в бенчмарке не возвращается, но программа на большом входе печатает много (например,
+# отсортированный массив) — лимит, после которого запуск всё же останавливается.
+BENCHMARK_MAX_OUTPUT_CHARS = int(os.environ.get("ALGO_BENCHMARK_MAX_OUTPUT_CHARS", str(8 * 1024 * 1024)))
+
+# Профили сборки C++ (выбираются для запроса или алгоритма только из этого списка): флаги компилятора.
+# Артефакты профиля лежат в своём пространстве кэша (у default — прежнее "cpp").
+DEFAULT_PROFILE = "default"
+CPP_PROFILES: dict[str, list[str]] = {
+    # Быстрая сборка для проверки в редакторе.
+    "fast-check": ["-std=c++17", "-O0"],
+    DEFAULT_PROFILE: CPP_FLAGS,
+    # Для замеров: код под CPU машины, на которой собран (кэш с другими машинами не делить).
+    "optimized": ["-std=c++17", "-O3", "-march=native"],
+    "sanitizer": [
+        "-std=c++17",
+        "-O1",
+        "-g",
+        "-fsanitize=address,undefined",
+        "-fno-sanitize-recover=undefined",
+        "-fno-omit-frame-pointer",
+    ],
+}
+# Профили с AddressSanitizer: программам нельзя ставить RLIMIT_AS (см. _iter_limited).
+SANITIZER_PROFILES = ("sanitizer",)
+
+_ARTIFACT_CACHE = ArtifactCache(
+    root=ARTIFACT_CACHE_DIR,
+    max_bytes=ARTIFACT_CACHE_MAX_MB * 1024 * 1024,
+    max_age_s=ARTIFACT_CACHE_MAX_AGE_S,
+    secret=ARTIFACT_CACHE_SECRET,
+)
+_PCH = PchManager(
+    cache=ArtifactCache(
+        root=PCH_DIR,
+        max_bytes=PCH_MAX_MB * 1024 * 1024,
+        max_age_s=ARTIFACT_CACHE_MAX_AGE_S,
+        secret=ARTIFACT_CACHE_SECRET,
+    ),
+    min_uses=PCH_MIN_USES,
+    build_timeout_s=60,
+    build_memory_mb=PCH_BUILD_MEMORY_MB,
+)
+_ADMISSION = AdmissionController(
+    root=ADMISSION_DIR,
+    slots={
+        lang: int(os.environ[f"ALGO_ADMISSION_SLOTS_{lang.upper()}"])
+        for lang in SUPPORTED_LANGUAGES
+        if os.environ.get(f"ALGO_ADMISSION_SLOTS_{lang.upper()}")
+    },
+    default_slots=ADMISSION_SLOTS,
+    queue_size=ADMISSION_QUEUE,
+    max_wait_s=ADMISSION_WAIT_S,
+)
+_PY_POOL = PythonWorkerPool(size=PY_POOL_SIZE, max_jobs=PY_POOL_MAX_JOBS)
+_WORKSPACES = WorkspacePool(root=WORKSPACE_DIR, size=WORKSPACE_POOL_SIZE)
+_COMPILE_MEMO: "CompileMemo[CompileResult]" = CompileMemo(ttl_s=COMPILE_MEMO_TTL_S, max_entries=COMPILE_MEMO_SIZE)
+_COMPILE_FLIGHT: "SingleFlight[tuple[CompileResult, str | None]]" = SingleFlight()
+_JVM = JvmTuning(cache=_ARTIFACT_CACHE, enabled=JVM_CDS)
+_CGROUPS = CgroupLimiter(root=CGROUP_ROOT, cpus=CGROUP_CPUS, pids_max=CGROUP_PIDS_MAX)
+_EXECUTOR = make_executor(
+    EXECUTOR_DRIVER,
+    iter_limited=lambda *args, **kwargs: _iter_limited(*args, **kwargs),
+    socket_path=EXECUTOR_SOCKET,
+    env_factory=lambda: _safe_env(),
+)
+_FARM = CompileFarmClient(socket_path=COMPILE_FARM_SOCKET)
+_TOOLCHAINS = ToolchainRegistry(refresh_s=TOOLCHAIN_REFRESH_S, env_factory=lambda: _safe_env())
+_SYNTAX_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=SYNTAX_WORKERS, thread_name_prefix="algo-syntax")
+# Занятые потоки проверки (включая те, чьего результата уже не ждут): новую проверку не ставим в очередь за ними.
+_SYNTAX_SLOTS = threading.BoundedSemaphore(SYNTAX_WORKERS)
+# Результаты проверок синтаксиса (Python, -fsyntax-only, javac без генерации классов) с диагностиками.
+_SYNTAX_CACHE: "OrderedDict[str, tuple[CompileResult, list[Diagnostic]]]" = OrderedDict()
+_SYNTAX_CACHE_LOCK = threading.Lock()
+
 _BLOCKED_PATTERNS: dict[str, list[str]] = {
     "python": [
         r"\bimport\s+subprocess\b",
@@ -101,7 +353,7 @@ def _validate_payload(language: str, code: str, stdin: str) -> str | None:
     return None
 
 
-def _limit_resources_unix(memory_mb: int, cpu_s: int):
+def _limit_resources_unix(memory_mb: int, cpu_s: int, file_mb: int = 10, address_space: bool = True):
     # Best-effort: работает только на Unix. На Windows ограничиваем только timeout-ом.
     try:
         import resource  # type: ignore
@@ -111,93 +363,751 @@ def _limit_resources_unix(memory_mb: int, cpu_s: int):
     def _preexec():
         # CPU time
         resource.setrlimit(resource.RLIMIT_CPU, (cpu_s, cpu_s))
-        # Address space (virtual memory)
-        mem_bytes = int(memory_mb) * 1024 * 1024
-        resource.setrlimit(resource.RLIMIT_AS, (mem_bytes, mem_bytes))
+        # Address space (virtual memory); не нужен, когда память считает cgroup (memory.max).
+        if address_space:
+            mem_bytes = int(memory_mb) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (mem_bytes, mem_bytes))
         # file size
-        resource.setrlimit(resource.RLIMIT_FSIZE, (10 * 1024 * 1024, 10 * 1024 * 1024))
+        file_bytes = int(file_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_FSIZE, (file_bytes, file_bytes))
 
     return _preexec
 
 
-def compile_cpp(
+def _decode_output(data: bytes) -> str:
+    # Как subprocess.run(text=True): UTF-8 и универсальные переводы строк,
+    # но без исключения на невалидных байтах в выводе программы.
+    return data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
+class _CappedDecoder:
+    """
+    Инкрементальное декодирование одного потока вывода с обрезкой на лету до limit символов —
+    результат тот же, что `_truncate(_decode_output(всё), limit)`, но без хранения всего вывода.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.emitted = 0
+        self.truncated = False
+        self._decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder("utf-8")(errors="replace"),
+            translate=True,
+        )
+
+    def feed(self, data: bytes, final: bool = False) -> str:
+        if self.truncated:
+            return ""
+        text = self._decoder.decode(data, final=final)
+        room = self.limit - self.emitted
+        if len(text) <= room:
+            self.emitted += len(text)
+            return text
+        self.emitted = self.limit
+        self.truncated = True
+        return text[:room] + "\n...<truncated>..."
+
+
+def _iter_process(
+    cmd: list[str],
+    stdin: str,
+    timeout_s: float,
+    cwd: str,
+    preexec_fn=None,
+    max_chars: int | None = None,
+    kill_on_overflow: bool = False,
+    env: dict[str, str] | None = None,
+) -> Iterator[tuple[str, object]]:
+    """
+    Запускает процесс и по мере поступления отдаёт ("stdout" | "stderr", текст); последним —
+    ("exit", ProcessOutcome) с пустым выводом. Вывод обрезается на лету до max_chars символов
+    (по умолчанию MAX_OUTPUT_CHARS) на поток (остаток дочитывается и выбрасывается), так что память на запуск ограничена
+    размером чанка. С kill_on_overflow процесс убивается сразу, как только вывод превысил лимит
+    (а не дописывает в pipe до таймаута). Процесс забирается через wait4 — отсюда время
+    (wall/CPU) и пиковый RSS. Если потребитель закрывает генератор раньше времени, процесс убивается.
+    OSError при старте процесса пробрасывается вызывающему.
+    """
+    if max_chars is None:
+        max_chars = MAX_OUTPUT_CHARS
+    if os.name == "nt":
+        outcome = _run_process_simple(cmd, stdin, timeout_s, cwd)
+        for kind, text in (("stdout", outcome.stdout), ("stderr", outcome.stderr)):
+            if text:
+                yield kind, _truncate(text, max_chars)
+        # Досрочно остановить процесс здесь нельзя — только отметить превышение.
+        overflow = kill_on_overflow and max(len(outcome.stdout), len(outcome.stderr)) > max_chars
+        yield "exit", replace(outcome, stdout="", stderr="", output_limit_exceeded=overflow)
+        return
+
+    started = time.monotonic()
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        env=env if env is not None else _safe_env(),
+        preexec_fn=preexec_fn,
+        # Своя группа процессов: после завершения убиваем и всех потомков программы,
+        # чтобы они не пережили запуск (рабочий каталог переиспользуется).
+        start_new_session=True,
+    )
+    out_fd, err_fd, in_fd = proc.stdout.fileno(), proc.stderr.fileno(), proc.stdin.fileno()
+    streams = {out_fd: "stdout", err_fd: "stderr"}
+    decoders = {out_fd: _CappedDecoder(max_chars), err_fd: _CappedDecoder(max_chars)}
+    data = (stdin or "").encode("utf-8")
+    offset = 0
+
+    sel = selectors.DefaultSelector()
+    for fd in streams:
+        sel.register(fd, selectors.EVENT_READ)
+    if data:
+        os.set_blocking(in_fd, False)
+        sel.register(in_fd, selectors.EVENT_WRITE)
+    else:
+        proc.stdin.close()
+
+    deadline = started + timeout_s
+    timed_out = False
+    overflow = False
+    reaped = False
+    try:
+        while sel.get_map() and not overflow:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            for key, _events in sel.select(timeout=remaining):
+                if key.fd in streams:
+                    chunk = os.read(key.fd, 65536)
+                    if not chunk:
+                        sel.unregister(key.fd)
+                    decoder = decoders[key.fd]
+                    text = decoder.feed(chunk, final=not chunk)
+                    if text:
+                        yield streams[key.fd], text
+                    if decoder.truncated and kill_on_overflow:
+                        overflow = True
+                        break
+                    continue
+                try:
+                    offset += os.write(in_fd, data[offset:offset + 65536])
+                except BlockingIOError:
+                    continue
+                except BrokenPipeError:
+                    # Программа закрыла stdin, не дочитав, — это не ошибка запуска.
+                    offset = len(data)
+                if offset >= len(data):
+                    sel.unregister(in_fd)
+                    proc.stdin.close()
+
+        if timed_out or overflow:
+            proc.kill()
+        _pid, wait_status, usage = os.wait4(proc.pid, 0)
+        reaped = True
+    finally:
+        sel.close()
+        if not reaped:
+            # Потребитель ушёл (или ошибка) — процесс больше никому не нужен.
+            proc.kill()
+            os.wait4(proc.pid, 0)
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        for stream in (proc.stdin, proc.stdout, proc.stderr):
+            stream.close()
+
+    proc.returncode = os.waitstatus_to_exitcode(wait_status)
+    yield "exit", ProcessOutcome(
+        stdout="",
+        stderr="",
+        returncode=None if timed_out or overflow else proc.returncode,
+        timed_out=timed_out,
+        wall_ms=(time.monotonic() - started) * 1000,
+        cpu_ms=(usage.ru_utime + usage.ru_stime) * 1000,
+        max_rss_kb=int(usage.ru_maxrss),
+        output_limit_exceeded=overflow,
+    )
+
+
+def _iter_limited(
+    cmd: list[str],
+    stdin: str,
+    timeout_s: float,
+    cwd: str,
+    memory_mb: int | None = None,
+    max_chars: int | None = None,
+    kill_on_overflow: bool = False,
+    sanitizer: bool = False,
+    address_space: bool = True,
+) -> Iterator[tuple[str, object]]:
+    """
+    _iter_process с лимитами ресурсов (memory_mb=None — без лимитов). Если доступна cgroup v2
+    (CGROUP_ROOT), процесс со всеми потомками помещается в свою cgroup (memory.max, cpu.max,
+    pids.max), а CPU и пик памяти берутся из неё; иначе — rlimit-ы, включая RLIMIT_AS.
+    Лимит CPU-времени и размера файлов — rlimit-ы в обоих случаях.
+    sanitizer=True — программа собрана с AddressSanitizer: он резервирует терабайты адресного
+    пространства под теневую память, поэтому RLIMIT_AS не ставится, а без cgroup память
+    ограничивает сам ASan (hard_rss_limit_mb в ASAN_OPTIONS).
+    address_space=False — RLIMIT_AS не ставится и без cgroup (JVM: память ограничивает -Xmx).
+    """
+    env = _sanitizer_env(memory_mb) if sanitizer else None
+    if memory_mb is None or os.name == "nt":
+        yield from _iter_process(cmd, stdin, timeout_s, cwd, max_chars=max_chars, kill_on_overflow=kill_on_overflow, env=env)
+        return
+    with _CGROUPS.group(memory_mb) as cgroup:
+        preexec_fn = _limit_resources_unix(
+            memory_mb=memory_mb,
+            cpu_s=int(timeout_s),
+            address_space=address_space and cgroup is None and not sanitizer,
+        )
+        if cgroup is not None:
+            preexec_fn = cgroup.preexec(preexec_fn)
+        events = _iter_process(
+            cmd,
+            stdin,
+            timeout_s,
+            cwd,
+            preexec_fn=preexec_fn,
+            max_chars=max_chars,
+            kill_on_overflow=kill_on_overflow,
+            env=env,
+        )
+        try:
+            for kind, payload in events:
+                if kind == "exit" and cgroup is not None:
+                    usage = cgroup.usage()
+                    if cgroup.oom_killed():
+                        yield "stderr", f"\nПрограмма остановлена: превышен лимит памяти ({memory_mb} МБ)."
+                    payload = replace(
+                        payload,
+                        cpu_ms=usage["cpu_ms"] if usage["cpu_ms"] is not None else payload.cpu_ms,
+                        max_rss_kb=usage["max_rss_kb"] if usage["max_rss_kb"] is not None else payload.max_rss_kb,
+                    )
+                yield kind, payload
+        finally:
+            # Потребитель ушёл раньше времени — процесс убивается до удаления его cgroup.
+            events.close()
+
+
+def _sanitizer_env(memory_mb: int | None) -> dict[str, str]:
+    env = _safe_env()
+    # Утечки не ищем: LeakSanitizer требует ptrace, которого в контейнере обычно нет.
+    asan = ["detect_leaks=0", "abort_on_error=0"]
+    if memory_mb:
+        asan.append(f"hard_rss_limit_mb={int(memory_mb)}")
+    env["ASAN_OPTIONS"] = ":".join(asan)
+    env["UBSAN_OPTIONS"] = "print_stacktrace=1"
+    return env
+
+
+def _run_process(
+    cmd: list[str],
+    stdin: str,
+    timeout_s: float,
+    cwd: str,
+    memory_mb: int | None = None,
+    max_chars: int | None = None,
+    kill_on_overflow: bool = False,
+    address_space: bool = True,
+) -> ProcessOutcome:
+    """
+    Запуск с ожиданием завершения: вывод (уже обрезанный до max_chars), время и пиковый RSS.
+    С memory_mb — под лимитами ресурсов (см. _iter_limited).
+    """
+    chunks: dict[str, list[str]] = {"stdout": [], "stderr": []}
+    outcome = None
+    events = _iter_limited(
+        cmd,
+        stdin,
+        timeout_s,
+        cwd,
+        memory_mb=memory_mb,
+        max_chars=max_chars,
+        kill_on_overflow=kill_on_overflow,
+        address_space=address_space,
+    )
+    for kind, payload in events:
+        if kind == "exit":
+            outcome = payload
+        else:
+            chunks[kind].append(payload)
+    return replace(outcome, stdout="".join(chunks["stdout"]), stderr="".join(chunks["stderr"]))
+
+
+def _iter_program(
+    cmd: list[str],
+    stdin: str,
+    timeout_s: int,
+    cwd: str,
+    memory_mb: int,
+    max_chars: int | None = None,
+    sanitizer: bool = False,
+) -> Iterator[tuple[str, object]]:
+    """
+    События запуска собранной программы через драйвер исполнения (_EXECUTOR), см. _iter_process.
+    Программа останавливается сразу при превышении лимита вывода.
+    """
+    return _EXECUTOR.iter_run(
+        cmd, stdin, timeout_s, cwd, memory_mb, max_chars=max_chars, kill_on_overflow=True, sanitizer=sanitizer
+    )
+
+
+def _run_program(
+    cmd: list[str],
+    stdin: str,
+    timeout_s: int,
+    cwd: str,
+    memory_mb: int,
+    max_chars: int | None = None,
+    sanitizer: bool = False,
+) -> ProcessOutcome:
+    """
+    Запуск собранной программы с ожиданием завершения, см. _iter_program.
+    """
+    return _EXECUTOR.run(
+        cmd, stdin, timeout_s, cwd, memory_mb, max_chars=max_chars, kill_on_overflow=True, sanitizer=sanitizer
+    )
+
+
+def _run_process_simple(cmd: list[str], stdin: str, timeout_s: float, cwd: str) -> ProcessOutcome:
+    # Windows: без wait4 — только вывод и время по часам.
+    started = time.monotonic()
+    try:
+        proc = subprocess.run(
+            cmd,
+            input=(stdin or "").encode("utf-8"),
+            capture_output=True,
+            timeout=timeout_s,
+            cwd=cwd,
+            env=_safe_env(),
+        )
+    except subprocess.TimeoutExpired:
+        return ProcessOutcome("", "", None, True, (time.monotonic() - started) * 1000, None, None)
+    return ProcessOutcome(
+        stdout=_decode_output(proc.stdout or b""),
+        stderr=_decode_output(proc.stderr or b""),
+        returncode=proc.returncode,
+        timed_out=False,
+        wall_ms=(time.monotonic() - started) * 1000,
+        cpu_ms=None,
+        max_rss_kb=None,
+    )
+
+
+def _usage(outcome: ProcessOutcome) -> dict:
+    return {
+        "wall_time_ms": round(outcome.wall_ms, 3),
+        "cpu_time_ms": None if outcome.cpu_ms is None else round(outcome.cpu_ms, 3),
+        "max_rss_kb": outcome.max_rss_kb,
+    }
+
+
+def _compile_result(outcome: ProcessOutcome, cmd: list[str], timeout_s: int) -> CompileResult:
+    if outcome.timed_out:
+        return CompileResult(False, "", f"Компиляция превысила лимит времени ({timeout_s}с).", None, cmd, **_usage(outcome))
+    # ограничим размер вывода, чтобы не раздувать ответ API
+    return CompileResult(
+        compiled=(outcome.returncode == 0),
+        stdout=_truncate(outcome.stdout, MAX_OUTPUT_CHARS),
+        stderr=_truncate(outcome.stderr, MAX_OUTPUT_CHARS),
+        exit_code=outcome.returncode,
+        command=cmd,
+        **_usage(outcome),
+    )
+
+
+def _memo_key(artifact_key: str, memory_mb: int | None = None) -> str:
+    # Лимит памяти входит в ключ: компилятор, убитый по лимиту, с большим лимитом может и собрать код.
+    return cache_key(artifact_key, str(memory_mb))
+
+
+def _memo_failure(key: str, cr: CompileResult) -> None:
+    # Запоминаем только ответ самого компилятора (ненулевой код выхода). Таймаут, смерть по сигналу
+    # и сбой запуска зависят от нагрузки на сервер, а не от исходника.
+    if not cr.compiled and cr.exit_code is not None and cr.exit_code > 0:
+        _COMPILE_MEMO.put(key, replace(cr, wall_time_ms=None, cpu_time_ms=None, max_rss_kb=None))
+
+
+def _farm_build(
+    job: dict,
+    lookup: Callable[[], tuple[CompileResult, str] | None],
+) -> tuple[CompileResult, str | None] | None:
+    """
+    Компиляция на ферме. None — компилировать на месте: ферма не настроена или недоступна,
+    кэш артефактов выключен (ферме некуда положить артефакт) или артефакт уже вытеснен из кэша.
+    Успешная сборка берётся через lookup — из кэша с проверкой подписи, а не по пути из ответа фермы.
+    """
+    if not _FARM.enabled or not _ARTIFACT_CACHE.enabled:
+        return None
+    try:
+        reply = _FARM.compile(job)
+        cr = CompileResult(**reply["result"])
+    except (OSError, KeyError, TypeError):
+        return None
+    if not cr.compiled:
+        return cr, None
+    if not reply.get("artifact"):
+        return None
+    return lookup()
+
+
+def _single_flight(
+    namespace: str,
+    key: str,
+    flight_key: str,
+    timeout_s: int,
+    lookup: Callable[[], tuple[CompileResult, str] | None],
+    compile_fn: Callable[[], tuple[CompileResult, str | None]],
+) -> tuple[CompileResult, str | None]:
+    """
+    Одна компиляция на ключ вместо лавины одинаковых: одновременные запросы процесса ждут первый
+    (SingleFlight), а процессы между собой — блокировку записи кэша. Дождавшиеся получают его
+    результат; артефакт берут из кэша (рабочий каталог первого запроса вот-вот удалится).
+    Без кэша артефактов делиться нечем — каждый компилирует сам.
+    """
+    if not _ARTIFACT_CACHE.enabled:
+        return compile_fn()
+
+    def _leader() -> tuple[CompileResult, str | None]:
+        with _ARTIFACT_CACHE.build_lock(namespace, key, timeout_s=timeout_s + COMPILE_LOCK_GRACE_S):
+            # Пока ждали блокировку, код мог собрать другой процесс.
+            cached = lookup()
+            if cached is not None:
+                return cached
+            return compile_fn()
+
+    (cr, path), shared = _COMPILE_FLIGHT.do(flight_key, _leader)
+    if shared and cr.compiled:
+        # Артефакт первого запроса — в его рабочем каталоге: берём свою копию из кэша,
+        # а если записи нет (кэш её не принял) — собираем сами.
+        cached = lookup()
+        return cached if cached is not None else compile_fn()
+    return cr, path
+
+
+def _output_limit_message(limit: int) -> str:
+    return f"Превышен лимит вывода ({limit} символов): программа остановлена."
+
+
+def _cpu_limit_exit(returncode: int | None) -> bool:
+    # Процесс убит по RLIMIT_CPU (SIGXCPU): программа исчерпала лимит времени раньше дедлайна.
+    sigxcpu = getattr(signal, "SIGXCPU", None)
+    return sigxcpu is not None and returncode == -sigxcpu
+
+
+def _run_result(outcome: ProcessOutcome, cmd: list[str], timeout_s: int) -> RunResult:
+    if outcome.timed_out or _cpu_limit_exit(outcome.returncode):
+        return RunResult(False, "", f"Запуск превысил лимит времени ({timeout_s}с).", None, cmd, **_usage(outcome))
+    if outcome.output_limit_exceeded:
+        # Начало вывода оставляем — по нему видно, что именно программа печатала в цикле.
+        stderr = _truncate(outcome.stderr, MAX_OUTPUT_CHARS)
+        return RunResult(
+            ran=False,
+            stdout=_truncate(outcome.stdout, MAX_OUTPUT_CHARS),
+            stderr=(stderr + "\n" if stderr else "") + _output_limit_message(MAX_OUTPUT_CHARS),
+            exit_code=None,
+            command=cmd,
+            output_limit_exceeded=True,
+            **_usage(outcome),
+        )
+    return RunResult(
+        ran=True,
+        stdout=_truncate(outcome.stdout, MAX_OUTPUT_CHARS),
+        stderr=_truncate(outcome.stderr, MAX_OUTPUT_CHARS),
+        exit_code=outcome.returncode,
+        command=cmd,
+        **_usage(outcome),
+    )
+
+
+def _compiler_version(compiler_path: str) -> str:
+    """
+    Первая строка `<compiler> --version` (мемоизируется по пути и mtime бинарника).
+    Нужна для ключа кэша: после обновления тулчейна старые артефакты не используются.
+    """
+    try:
+        mtime = os.stat(compiler_path).st_mtime
+    except OSError:
+        mtime = 0.0
+    return _compiler_version_cached(compiler_path, mtime)
+
+
+@functools.lru_cache(maxsize=32)
+def _compiler_version_cached(compiler_path: str, mtime: float) -> str:
+    try:
+        proc = subprocess.run(
+            [compiler_path, "--version"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+            env=_safe_env(),
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        return ""
+    lines = (proc.stdout or proc.stderr or "").strip().splitlines()
+    return lines[0] if lines else ""
+
+
+def _pch_preexec(memory_mb: int, cpu_s: int):
+    # .gch бывает в сотни МБ, поэтому лимит на размер файла — как на память.
+    if os.name == "nt":
+        return None
+    return _limit_resources_unix(memory_mb=memory_mb, cpu_s=cpu_s, file_mb=memory_mb)
+
+
+def warmup_pch(compiler: str = "g++") -> None:
+    """
+    Ставит в фоновую сборку PCH для частых наборов заголовков (PCH_WARM_SETS).
+    Вызывается при старте приложения; без компилятора — ничего не делает.
+    """
+    tool = _TOOLCHAINS.get(compiler)
+    if tool is None or not tool.available or not _PCH.enabled:
+        return
+    compiler_path = tool.path
+    _PCH.warmup(
+        PCH_WARM_SETS,
+        compiler_path,
+        _compiler_version(compiler_path),
+        CPP_FLAGS,
+        env=_safe_env(),
+        preexec_factory=_pch_preexec,
+    )
+
+
+def _compile_with_pch(
+    command: Callable[[list[str]], list[str]],
+    pch_flags: list[str],
+    timeout_s: int,
+    cwd: str,
+    memory_mb: int,
+) -> tuple[list[str], ProcessOutcome]:
+    """
+    Компиляция с PCH (command строит команду по флагам PCH). Если PCH изменился, пока его читал
+    компилятор, результат выбрасывается и код компилируется заново без PCH.
+    """
+    cmd = command(pch_flags)
+    outcome = _run_process(cmd, stdin="", timeout_s=timeout_s, cwd=cwd, memory_mb=memory_mb)
+    if not _PCH.intact(pch_flags):
+        cmd = command([])
+        outcome = _run_process(cmd, stdin="", timeout_s=timeout_s, cwd=cwd, memory_mb=memory_mb)
+    return cmd, outcome
+
+
+def profile_error(profile: str | None) -> str | None:
+    """
+    Текст ошибки для профиля сборки не из списка CPP_PROFILES (None — профиль допустим или не задан).
+    """
+    if profile is None or (isinstance(profile, str) and profile in CPP_PROFILES):
+        return None
+    return f"Неизвестный профиль сборки: {profile}. Допустимо: {', '.join(CPP_PROFILES)}."
+
+
+def _cpp_namespace(profile: str) -> str:
+    return "cpp" if profile == DEFAULT_PROFILE else f"cpp-{profile}"
+
+
+def _cpp_key(code: str, compiler_path: str, profile: str) -> str:
+    return cache_key("cpp", code or "", compiler_path, _compiler_version(compiler_path), " ".join(CPP_PROFILES[profile]))
+
+
+def _cpp_cache_hit(namespace: str, key: str, exe_name: str, workdir: str) -> tuple[CompileResult, str] | None:
+    # Запускаем проверенную частную копию: файл в общей записи можно подменить между проверкой и exec.
+    bindir = os.path.join(workdir, "bin")
+    meta = _ARTIFACT_CACHE.checkout(namespace, key, bindir)
+    if meta is None:
+        return None
+    cr = CompileResult(
+        compiled=True,
+        stdout=meta.get("stdout", ""),
+        stderr=meta.get("stderr", ""),
+        exit_code=meta.get("exit_code", 0),
+        command=meta.get("command", []),
+    )
+    return cr, os.path.join(bindir, exe_name)
+
+
+def _build_cpp(
     code: str,
-    compiler: str = "g++",
-    timeout_s: int = 10,
-    memory_mb: int = 512,
-) -> CompileResult:
+    compiler: str,
+    timeout_s: int,
+    memory_mb: int,
+    workdir: str,
+    use_farm: bool = True,
+    profile: str = DEFAULT_PROFILE,
+) -> tuple[CompileResult, str | None]:
     """
-    Компиляция C++ кода без запуска.
-    Возвращает результат компиляции и вывод компилятора.
+    Сборка C++ с кэшем артефактов.
+    Возвращает результат компиляции и путь к исполняемому файлу внутри workdir: свежесобранный
+    или проверенная копия записи кэша (живёт, пока жив workdir вызывающего).
+    use_farm=False — не отдавать сборку ферме (так собирает сама ферма).
+    profile — профиль сборки из CPP_PROFILES (проверяется вызывающим, см. profile_error).
     """
-    compiler_path = shutil.which(compiler) or shutil.which(f"{compiler}.exe")
-    if not compiler_path:
-        return CompileResult(
+    compiler_path, err = _which_or_err(compiler, "Компилятор", language="cpp")
+    if err:
+        cr = CompileResult(
             compiled=False,
             stdout="",
-            stderr=f'Компилятор "{compiler}" не найден в PATH.',
+            stderr=err,
             exit_code=None,
             command=[compiler],
         )
+        return cr, None
+
+    exe_name = "main.exe" if os.name == "nt" else "main"
+    flags = CPP_PROFILES[profile]
+    namespace = _cpp_namespace(profile)
+    key = _cpp_key(code, compiler_path, profile)
+    cached = _cpp_cache_hit(namespace, key, exe_name, workdir)
+    if cached is not None:
+        return cached
+
+    memo_key = _memo_key(key, memory_mb)
+    failed = _COMPILE_MEMO.get(memo_key)
+    if failed is not None:
+        return failed, None
+
+    # Ферма сама склеивает одинаковые задания, поэтому отдаём ей сборку до блокировок: иначе
+    # backend держал бы блокировку записи, которую ждёт сборка на ферме.
+    if use_farm:
+        farmed = _farm_build(
+            {
+                "language": "cpp",
+                "code": code or "",
+                "compiler": compiler,
+                "timeout_s": timeout_s,
+                "memory_mb": memory_mb,
+                "profile": profile,
+            },
+            lambda: _cpp_cache_hit(namespace, key, exe_name, workdir),
+        )
+        if farmed is not None:
+            _memo_failure(memo_key, farmed[0])
+            return farmed
 
-    with tempfile.TemporaryDirectory(prefix="algo_compile_") as tmp:
-        src_path = os.path.join(tmp, "main.cpp")
-        out_path = os.path.join(tmp, "main.exe" if os.name == "nt" else "main")
+    def _compile() -> tuple[CompileResult, str | None]:
+        src_path = os.path.join(workdir, "main.cpp")
+        out_path = os.path.join(workdir, exe_name)
 
         with open(src_path, "w", encoding="utf-8", newline="\n") as f:
             f.write(code or "")
 
-        cmd = [
+        pch_flags = _PCH.flags_for(
+            code or "",
             compiler_path,
-            "-std=c++17",
-            "-O2",
-            src_path,
-            "-o",
-            out_path,
-        ]
-
-        preexec_fn = None
-        if os.name != "nt":
-            preexec_fn = _limit_resources_unix(memory_mb=memory_mb, cpu_s=timeout_s)
+            _compiler_version(compiler_path),
+            flags,
+            env=_safe_env(),
+            preexec_factory=_pch_preexec,
+        )
+        cmd = [compiler_path, *flags, *pch_flags, src_path, "-o", out_path]
 
         try:
-            proc = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout_s,
-                cwd=tmp,
-                env=_safe_env(),
-                preexec_fn=preexec_fn,
-            )
-        except subprocess.TimeoutExpired:
-            return CompileResult(
-                compiled=False,
-                stdout="",
-                stderr=f"Компиляция превысила лимит времени ({timeout_s}с).",
-                exit_code=None,
-                command=cmd,
+            cmd, outcome = _compile_with_pch(
+                lambda pch: [compiler_path, *flags, *pch, src_path, "-o", out_path],
+                pch_flags,
+                timeout_s=timeout_s,
+                cwd=workdir,
+                memory_mb=memory_mb,
             )
         except OSError as e:
-            return CompileResult(
+            cr = CompileResult(
                 compiled=False,
                 stdout="",
                 stderr=f"Не удалось запустить компилятор: {e}",
                 exit_code=None,
                 command=cmd,
             )
+            return cr, None
 
-        # ограничим размер вывода, чтобы не раздувать ответ API
-        stdout = _truncate(proc.stdout or "", MAX_OUTPUT_CHARS)
-        stderr = _truncate(proc.stderr or "", MAX_OUTPUT_CHARS)
-        compiled = proc.returncode == 0
-        return CompileResult(
-            compiled=compiled,
-            stdout=stdout,
-            stderr=stderr,
-            exit_code=proc.returncode,
-            command=cmd,
+        cr = _compile_result(outcome, cmd, timeout_s)
+        if not cr.compiled:
+            _memo_failure(memo_key, cr)
+            return cr, None
+
+        _ARTIFACT_CACHE.put(
+            namespace,
+            key,
+            files={exe_name: out_path},
+            meta={"stdout": cr.stdout, "stderr": cr.stderr, "exit_code": cr.exit_code, "command": cr.command},
+        )
+        return cr, out_path
+
+    return _single_flight(
+        namespace, key, memo_key, timeout_s, lambda: _cpp_cache_hit(namespace, key, exe_name, workdir), _compile
+    )
+
+
+def compile_cpp(
+    code: str,
+    compiler: str = "g++",
+    timeout_s: int = 10,
+    memory_mb: int = 512,
+    profile: str = DEFAULT_PROFILE,
+) -> CompileResult:
+    """
+    Компиляция C++ кода без запуска.
+    Возвращает результат компиляции и вывод компилятора.
+    Успешная сборка попадает в кэш артефактов, так что последующий запуск её переиспользует.
+    """
+    profile_err = profile_error(profile)
+    if profile_err:
+        return CompileResult(False, "", profile_err, None, [])
+    with _WORKSPACES.workspace(prefix="algo_compile_") as tmp:
+        cr, _exe_path = _build_cpp(
+            code=code, compiler=compiler, timeout_s=timeout_s, memory_mb=memory_mb, workdir=tmp, profile=profile
         )
+        return cr
+
+
+def check_cpp(
+    code: str,
+    compiler: str = "g++",
+    timeout_s: int = 10,
+    memory_mb: int = 512,
+) -> tuple[CompileResult, list[Diagnostic]]:
+    """
+    Проверка C++ без сборки (`-fsyntax-only`): ошибки и предупреждения компилятора
+    со строкой и колонкой. Бинарник не создаётся, результат кэшируется в памяти.
+    """
+    if len(code or "") > MAX_SOURCE_CHARS:
+        return CompileResult(False, "", f"Код слишком большой: максимум {MAX_SOURCE_CHARS} символов.", None, []), []
+    compiler_path, err = _which_or_err(compiler, "Компилятор", language="cpp")
+    if err:
+        return CompileResult(False, "", err, None, [compiler]), []
+
+    version = _compiler_version(compiler_path)
+    key = cache_key("cpp-syntax", code or "", compiler_path, version, " ".join(CPP_SYNTAX_FLAGS))
+    cached = _syntax_cache_get(key)
+    if cached is not None:
+        return cached
+
+    with _WORKSPACES.workspace(prefix="algo_check_") as tmp:
+        with open(os.path.join(tmp, "main.cpp"), "w", encoding="utf-8", newline="\n") as f:
+            f.write(code or "")
+        pch_flags = _PCH.flags_for(
+            code or "", compiler_path, version, CPP_FLAGS, env=_safe_env(), preexec_factory=_pch_preexec
+        )
+        # Относительное имя файла: в сообщениях не будет пути к рабочему каталогу.
+        cmd = [compiler_path, *CPP_SYNTAX_FLAGS, *pch_flags, "main.cpp"]
+        try:
+            cmd, outcome = _compile_with_pch(
+                lambda pch: [compiler_path, *CPP_SYNTAX_FLAGS, *pch, "main.cpp"],
+                pch_flags,
+                timeout_s=timeout_s,
+                cwd=tmp,
+                memory_mb=memory_mb,
+            )
+        except OSError as e:
+            return CompileResult(False, "", f"Не удалось запустить компилятор: {e}", None, cmd), []
+
+    cr = _compile_result(outcome, cmd, timeout_s)
+    if outcome.timed_out:
+        return cr, []
+    checked = cr, parse_gcc(outcome.stderr)
+    _syntax_cache_put(key, checked)
+    return checked
 
 
 def run_cpp(
@@ -207,6 +1117,7 @@ def run_cpp(
     compile_timeout_s: int = 10,
     run_timeout_s: int = 2,
     memory_mb: int = 256,
+    profile: str = DEFAULT_PROFILE,
 ) -> tuple[CompileResult, RunResult]:
     """
     Компилирует и запускает C++ код в “базово безопасном” режиме:
@@ -215,109 +1126,37 @@ def run_cpp(
     - урезанное окружение
     - ограничение вывода
     - на Unix: лимиты CPU/памяти/размера файла
+    Повторный запуск того же исходника берёт бинарник из кэша артефактов без компиляции.
+    profile — профиль сборки из CPP_PROFILES.
     """
-    payload_err = _validate_payload(language="cpp", code=code, stdin=stdin)
+    payload_err = _validate_payload(language="cpp", code=code, stdin=stdin) or profile_error(profile)
     if payload_err:
         cr = CompileResult(compiled=False, stdout="", stderr=payload_err, exit_code=None, command=[])
         rr = RunResult(ran=False, stdout="", stderr="", exit_code=None, command=[])
         return cr, rr
 
-    compiler_path = shutil.which(compiler) or shutil.which(f"{compiler}.exe")
-    if not compiler_path:
-        cr = CompileResult(
-            compiled=False,
-            stdout="",
-            stderr=f'Компилятор "{compiler}" не найден в PATH.',
-            exit_code=None,
-            command=[compiler],
-        )
-        rr = RunResult(ran=False, stdout="", stderr="", exit_code=None, command=[])
-        return cr, rr
-
-    with tempfile.TemporaryDirectory(prefix="algo_run_") as tmp:
-        src_path = os.path.join(tmp, "main.cpp")
-        out_path = os.path.join(tmp, "main.exe" if os.name == "nt" else "main")
-
-        with open(src_path, "w", encoding="utf-8", newline="\n") as f:
-            f.write(code or "")
-
-        compile_cmd = [
-            compiler_path,
-            "-std=c++17",
-            "-O2",
-            src_path,
-            "-o",
-            out_path,
-        ]
-
-        compile_preexec = None
-        if os.name != "nt":
-            compile_preexec = _limit_resources_unix(memory_mb=memory_mb, cpu_s=compile_timeout_s)
-
-        try:
-            compile_proc = subprocess.run(
-                compile_cmd,
-                capture_output=True,
-                text=True,
-                timeout=compile_timeout_s,
-                cwd=tmp,
-                env=_safe_env(),
-                preexec_fn=compile_preexec,
-            )
-        except subprocess.TimeoutExpired:
-            cr = CompileResult(
-                compiled=False,
-                stdout="",
-                stderr=f"Компиляция превысила лимит времени ({compile_timeout_s}с).",
-                exit_code=None,
-                command=compile_cmd,
-            )
-            return cr, RunResult(ran=False, stdout="", stderr="", exit_code=None, command=[])
-        except OSError as e:
-            cr = CompileResult(
-                compiled=False,
-                stdout="",
-                stderr=f"Не удалось запустить компилятор: {e}",
-                exit_code=None,
-                command=compile_cmd,
-            )
-            return cr, RunResult(ran=False, stdout="", stderr="", exit_code=None, command=[])
-
-        cr = CompileResult(
-            compiled=(compile_proc.returncode == 0),
-            stdout=_truncate(compile_proc.stdout or "", MAX_OUTPUT_CHARS),
-            stderr=_truncate(compile_proc.stderr or "", MAX_OUTPUT_CHARS),
-            exit_code=compile_proc.returncode,
-            command=compile_cmd,
+    with _WORKSPACES.workspace(prefix="algo_run_") as tmp:
+        cr, exe_path = _build_cpp(
+            code=code,
+            compiler=compiler,
+            timeout_s=compile_timeout_s,
+            memory_mb=memory_mb,
+            workdir=tmp,
+            profile=profile,
         )
-        if not cr.compiled:
+        if not cr.compiled or not exe_path:
             return cr, RunResult(ran=False, stdout="", stderr="", exit_code=None, command=[])
 
-        run_preexec = None
-        if os.name != "nt":
-            run_preexec = _limit_resources_unix(memory_mb=memory_mb, cpu_s=run_timeout_s)
-
-        run_cmd = [out_path]
+        run_cmd = [exe_path]
         try:
-            run_proc = subprocess.run(
+            outcome = _run_program(
                 run_cmd,
-                input=stdin or "",
-                capture_output=True,
-                text=True,
-                timeout=run_timeout_s,
+                stdin=stdin,
+                timeout_s=run_timeout_s,
                 cwd=tmp,
-                env=_safe_env(),
-                preexec_fn=run_preexec,
+                memory_mb=memory_mb,
+                sanitizer=profile in SANITIZER_PROFILES,
             )
-        except subprocess.TimeoutExpired:
-            rr = RunResult(
-                ran=False,
-                stdout="",
-                stderr=f"Запуск превысил лимит времени ({run_timeout_s}с).",
-                exit_code=None,
-                command=run_cmd,
-            )
-            return cr, rr
         except OSError as e:
             rr = RunResult(
                 ran=False,
@@ -328,14 +1167,7 @@ def run_cpp(
             )
             return cr, rr
 
-        rr = RunResult(
-            ran=True,
-            stdout=_truncate(run_proc.stdout or "", MAX_OUTPUT_CHARS),
-            stderr=_truncate(run_proc.stderr or "", MAX_OUTPUT_CHARS),
-            exit_code=run_proc.returncode,
-            command=run_cmd,
-        )
-        return cr, rr
+        return cr, _run_result(outcome, run_cmd, run_timeout_s)
 
 
 def _norm_lang(language: str) -> str:
@@ -360,45 +1192,231 @@ def _validate_java_class_name(code: str) -> str | None:
     return None
 
 
-def _which_or_err(bin_name: str, err_label: str) -> tuple[str | None, str | None]:
-    p = shutil.which(bin_name) or shutil.which(f"{bin_name}.exe")
-    if not p:
+def _which_or_err(bin_name: str, err_label: str, language: str | None = None) -> tuple[str | None, str | None]:
+    """
+    Путь к тулчейну из реестра. Имена вне реестра (и чужого языка) не ищутся в PATH вовсе.
+    """
+    tool = _TOOLCHAINS.get(bin_name)
+    if tool is None or (language is not None and tool.language != language):
+        return None, f'{err_label} "{bin_name}" не поддерживается.'
+    if not tool.available:
         return None, f'{err_label} "{bin_name}" не найден в PATH.'
-    return p, None
+    return tool.path, None
+
+
+def toolchains() -> list[Toolchain]:
+    """
+    Тулчейны из реестра (для /api/algorithms/toolchains/).
+    """
+    return _TOOLCHAINS.all()
+
+
+def execution_stats() -> dict:
+    """
+    Счётчики кэшей и пулов исполнения в этом процессе (для модераторов, /api/algorithms/execution-stats/).
+    """
+    with _SYNTAX_CACHE_LOCK:
+        syntax_entries = len(_SYNTAX_CACHE)
+    return {
+        "compile_memo": _COMPILE_MEMO.stats(),
+        "compile_farm": _FARM.stats(),
+        "compile_single_flight": _COMPILE_FLIGHT.stats(),
+        "artifact_cache": _ARTIFACT_CACHE.stats(),
+        "pch": _PCH.stats(),
+        "jvm": _JVM.stats(),
+        "syntax_cache": {"entries": syntax_entries, "size": SYNTAX_CACHE_SIZE},
+        "workspaces": _WORKSPACES.stats(),
+        "admission": _ADMISSION.stats(),
+        "toolchains": _TOOLCHAINS.stats(),
+        "executor": _EXECUTOR.stats(),
+        "cgroups": _CGROUPS.stats(),
+    }
+
+
+def warmup_toolchains() -> None:
+    """
+    Опрашивает тулчейны в фоне при старте приложения, чтобы первый запуск не ждал опроса.
+    Обновление по SIGHUP включается здесь же (если сигнал не занят сервером приложений).
+    """
+    _TOOLCHAINS.install_signal_handler()
+    threading.Thread(target=_TOOLCHAINS.all, name="algo-toolchains", daemon=True).start()
+
+
+# Строки и комментарии Python — скобки внутри них на вложенность не влияют.
+_PY_STRING_OR_COMMENT_RE = re.compile(
+    r'"""[\s\S]*?(?:"""|$)'
+    r"|'{3}[\s\S]*?(?:'{3}|$)"
+    r'|"(?:\\.|[^"\\\n])*"?'
+    r"|'(?:\\.|[^'\\\n])*'?"
+    r"|#[^\n]*"
+)
+
+
+def _python_source_limit_error(code: str) -> str | None:
+    """
+    Текст ошибки для исходника, разбор которого может занять поток надолго (очень длинная строка,
+    вложенность скобок глубже PY_MAX_NESTING), или None.
+    """
+    for lineno, line in enumerate((code or "").splitlines(), start=1):
+        if len(line) > PY_MAX_LINE_CHARS:
+            return f"Строка {lineno} слишком длинная: максимум {PY_MAX_LINE_CHARS} символов."
+    depth = 0
+    for ch in _PY_STRING_OR_COMMENT_RE.sub(" ", code or ""):
+        if ch in "([{":
+            depth += 1
+            if depth > PY_MAX_NESTING:
+                return f"Слишком глубокая вложенность скобок: максимум {PY_MAX_NESTING}."
+        elif ch in ")]}":
+            depth = max(depth - 1, 0)
+    return None
+
+
+def _python_syntax_error(code: str) -> BaseException | None:
+    try:
+        compile(code or "", "main.py", "exec", dont_inherit=True)
+    except (SyntaxError, ValueError, RecursionError, MemoryError) as e:
+        # ValueError — нулевые байты в исходнике, RecursionError/MemoryError — патологическая вложенность.
+        return e
+    return None
+
+
+def _syntax_cache_get(key: str) -> tuple[CompileResult, list[Diagnostic]] | None:
+    with _SYNTAX_CACHE_LOCK:
+        cached = _SYNTAX_CACHE.get(key)
+        if cached is not None:
+            _SYNTAX_CACHE.move_to_end(key)
+        return cached
+
+
+def _syntax_cache_put(key: str, checked: tuple[CompileResult, list[Diagnostic]]) -> None:
+    with _SYNTAX_CACHE_LOCK:
+        _SYNTAX_CACHE[key] = checked
+        while len(_SYNTAX_CACHE) > SYNTAX_CACHE_SIZE:
+            _SYNTAX_CACHE.popitem(last=False)
+
+
+def check_python(code: str, timeout_s: int = 5) -> tuple[CompileResult, list[Diagnostic]]:
+    """
+    Проверка синтаксиса Python прямо в процессе backend-а через compile(), без запуска
+    интерпретатора (как `python -m py_compile`, но без fork+exec). Синтаксис проверяется
+    версией Python backend-а — в Docker-образе это тот же интерпретатор, что запускает код.
+    Результат вместе с диагностикой кэшируется по хэшу исходника.
+    """
+    cmd = ["compile", "main.py"]
+    if len(code or "") > MAX_SOURCE_CHARS:
+        return CompileResult(False, "", f"Код слишком большой: максимум {MAX_SOURCE_CHARS} символов.", None, cmd), []
+
+    key = hashlib.sha256((code or "").encode("utf-8", errors="surrogatepass")).hexdigest()
+    cached = _syntax_cache_get(key)
+    if cached is not None:
+        return cached
+
+    limit_err = _python_source_limit_error(code)
+    if limit_err:
+        checked = CompileResult(False, "", limit_err, 1, cmd), [Diagnostic(severity="error", message=limit_err, file="main.py")]
+        _syntax_cache_put(key, checked)
+        return checked
+
+    # compile() нельзя прервать, поэтому лимит времени — ожидание результата из отдельного потока.
+    # Все потоки заняты (в том числе зависшими проверками) — отказ сразу, без очереди за ними.
+    if not _SYNTAX_SLOTS.acquire(blocking=False):
+        return CompileResult(False, "", "Сервер перегружен проверками синтаксиса, повторите позже.", None, cmd), []
+    started = time.monotonic()
+    try:
+        future = _SYNTAX_EXECUTOR.submit(_python_syntax_error, code)
+    except RuntimeError:
+        _SYNTAX_SLOTS.release()
+        raise
+    future.add_done_callback(lambda _f: _SYNTAX_SLOTS.release())
+    try:
+        error = future.result(timeout=timeout_s)
+    except concurrent.futures.TimeoutError:
+        return CompileResult(False, "", f"Проверка синтаксиса превысила лимит ({timeout_s}с).", None, cmd), []
+    # Проверка идёт в процессе backend-а: CPU и память отдельного процесса здесь не измерить.
+    wall_time_ms = round((time.monotonic() - started) * 1000, 3)
+
+    if error is None:
+        checked = CompileResult(True, "", "", 0, cmd, wall_time_ms=wall_time_ms), []
+    else:
+        if isinstance(error, (SyntaxError, ValueError)):
+            message = "".join(traceback.format_exception_only(type(error), error))
+        else:
+            message = "Код слишком сложен для разбора (слишком глубокая вложенность).\n"
+        cr = CompileResult(False, "", _truncate(message, MAX_OUTPUT_CHARS), 1, cmd, wall_time_ms=wall_time_ms)
+        checked = cr, [from_python_error(error)]
+
+    _syntax_cache_put(key, checked)
+    return checked
 
 
 def compile_python(code: str, timeout_s: int = 5) -> CompileResult:
-    with tempfile.TemporaryDirectory(prefix="algo_py_compile_") as tmp:
-        src = os.path.join(tmp, "main.py")
-        with open(src, "w", encoding="utf-8", newline="\n") as f:
-            f.write(code or "")
+    """
+    Проверка синтаксиса Python (см. check_python) без диагностики.
+    """
+    return check_python(code=code, timeout_s=timeout_s)[0]
 
-        py, err = _which_or_err("python", 'Интерпретатор')
-        if err:
-            return CompileResult(False, "", err, None, ["python"])
 
-        cmd = [py, "-m", "py_compile", src]
-        try:
-            proc = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout_s,
-                cwd=tmp,
-                env=_safe_env(),
-            )
-        except subprocess.TimeoutExpired:
-            return CompileResult(False, "", f"Проверка синтаксиса превысила лимит ({timeout_s}с).", None, cmd)
-        except OSError as e:
-            return CompileResult(False, "", f"Не удалось запустить python: {e}", None, cmd)
+def _run_python_pooled(code: str, stdin: str, run_timeout_s: int, memory_mb: int) -> tuple[CompileResult, RunResult] | None:
+    """
+    Проверка синтаксиса и запуск в прогретом воркере (без двух стартов интерпретатора).
+    None — пул выключен/занят, тогда run_python идёт обычным путём через subprocess.
+    """
+    # Воркеры пула запускают код сами, мимо драйвера исполнения, — только для локального драйвера.
+    # И только без cgroup: потомок воркера получил бы лишь rlimit-ы, без memory.max/pids.max/cpu.max.
+    if not _PY_POOL.enabled or not _EXECUTOR.supports_python_pool or _CGROUPS.available:
+        return None
+    py, err = _which_or_err("python", 'Интерпретатор')
+    if err:
+        return None
 
-        return CompileResult(
-            compiled=(proc.returncode == 0),
-            stdout=_truncate(proc.stdout or "", MAX_OUTPUT_CHARS),
-            stderr=_truncate(proc.stderr or "", MAX_OUTPUT_CHARS),
-            exit_code=proc.returncode,
-            command=cmd,
+    reply = _PY_POOL.run(
+        python=py,
+        env=_safe_env(),
+        code=code,
+        stdin=stdin,
+        timeout_s=run_timeout_s,
+        memory_mb=memory_mb,
+        # запас в байтах на UTF-8: обрезка до MAX_OUTPUT_CHARS символов делается здесь
+        max_bytes=MAX_OUTPUT_CHARS * 4 + 4,
+        max_chars=MAX_OUTPUT_CHARS,
+    )
+    if reply is None:
+        return None
+
+    # Как есть: синтаксис проверяет compile() в воркере, код запускает его fork-нутый потомок.
+    compile_cmd = ["compile", "main.py"]
+    if "compile_error" in reply:
+        cr = CompileResult(False, "", _truncate(reply["compile_error"], MAX_OUTPUT_CHARS), 1, compile_cmd)
+        return cr, RunResult(False, "", "", None, [])
+
+    cr = CompileResult(True, "", "", 0, compile_cmd)
+    cmd = [py, "-I", WORKER_SCRIPT]
+    usage = {
+        "wall_time_ms": reply.get("wall_ms"),
+        "cpu_time_ms": reply.get("cpu_ms"),
+        "max_rss_kb": reply.get("max_rss_kb"),
+    }
+    if reply.get("timed_out") or _cpu_limit_exit(reply.get("exit_code")):
+        return cr, RunResult(False, "", f"Запуск превысил лимит времени ({run_timeout_s}с).", None, cmd, **usage)
+    if reply.get("output_limit_exceeded"):
+        stderr = _truncate(reply.get("stderr") or "", MAX_OUTPUT_CHARS)
+        return cr, RunResult(
+            False,
+            _truncate(reply.get("stdout") or "", MAX_OUTPUT_CHARS),
+            (stderr + "\n" if stderr else "") + _output_limit_message(MAX_OUTPUT_CHARS),
+            None,
+            cmd,
+            output_limit_exceeded=True,
+            **usage,
         )
+    return cr, RunResult(
+        True,
+        _truncate(reply.get("stdout") or "", MAX_OUTPUT_CHARS),
+        _truncate(reply.get("stderr") or "", MAX_OUTPUT_CHARS),
+        reply.get("exit_code"),
+        cmd,
+        **usage,
+    )
 
 
 def run_python(code: str, stdin: str = "", run_timeout_s: int = 2, memory_mb: int = 256) -> tuple[CompileResult, RunResult]:
@@ -408,11 +1426,15 @@ def run_python(code: str, stdin: str = "", run_timeout_s: int = 2, memory_mb: in
         rr = RunResult(ran=False, stdout="", stderr="", exit_code=None, command=[])
         return cr, rr
 
+    pooled = _run_python_pooled(code=code, stdin=stdin, run_timeout_s=run_timeout_s, memory_mb=memory_mb)
+    if pooled is not None:
+        return pooled
+
     cr = compile_python(code=code, timeout_s=5)
     if not cr.compiled:
         return cr, RunResult(False, "", "", None, [])
 
-    with tempfile.TemporaryDirectory(prefix="algo_py_run_") as tmp:
+    with _WORKSPACES.workspace(prefix="algo_py_run_") as tmp:
         src = os.path.join(tmp, "main.py")
         with open(src, "w", encoding="utf-8", newline="\n") as f:
             f.write(code or "")
@@ -421,25 +1443,122 @@ def run_python(code: str, stdin: str = "", run_timeout_s: int = 2, memory_mb: in
         if err:
             return CompileResult(False, "", err, None, ["python"]), RunResult(False, "", "", None, [])
 
-        preexec = _limit_resources_unix(memory_mb=memory_mb, cpu_s=run_timeout_s) if os.name != "nt" else None
         cmd = [py, "-I", src]
         try:
-            proc = subprocess.run(
-                cmd,
-                input=stdin or "",
-                capture_output=True,
-                text=True,
-                timeout=run_timeout_s,
-                cwd=tmp,
-                env=_safe_env(),
-                preexec_fn=preexec,
-            )
-        except subprocess.TimeoutExpired:
-            return cr, RunResult(False, "", f"Запуск превысил лимит времени ({run_timeout_s}с).", None, cmd)
+            outcome = _run_program(cmd, stdin=stdin, timeout_s=run_timeout_s, cwd=tmp, memory_mb=memory_mb)
         except OSError as e:
             return cr, RunResult(False, "", f"Не удалось запустить python: {e}", None, cmd)
 
-        return cr, RunResult(True, _truncate(proc.stdout or "", MAX_OUTPUT_CHARS), _truncate(proc.stderr or "", MAX_OUTPUT_CHARS), proc.returncode, cmd)
+        return cr, _run_result(outcome, cmd, run_timeout_s)
+
+
+def _run_javac(cmd_args: list[str], javac: str, timeout_s: int, cwd: str) -> tuple[list[str], ProcessOutcome]:
+    # Куча и один поток GC: javac укладывается в JAVAC_MEMORY_MB и в pids.max cgroup.
+    cmd = [javac, f"-J-Xmx{JvmTuning.heap_mb(JAVAC_MEMORY_MB)}m", "-J-XX:+UseSerialGC", *cmd_args]
+    outcome = _run_process(cmd, stdin="", timeout_s=timeout_s, cwd=cwd, memory_mb=JAVAC_MEMORY_MB, address_space=False)
+    return cmd, outcome
+
+
+def _java_key(code: str, javac: str) -> str:
+    return cache_key("java", code or "", javac, _compiler_version(javac))
+
+
+def _java_cache_hit(key: str, workdir: str) -> tuple[CompileResult, str] | None:
+    # JVM читает классы весь запуск, поэтому запускаем частную копию из workdir, а не общую запись.
+    classpath = os.path.join(workdir, "classes")
+    meta = _ARTIFACT_CACHE.checkout("java", key, classpath)
+    if meta is None:
+        return None
+    cr = CompileResult(True, meta.get("stdout", ""), meta.get("stderr", ""), meta.get("exit_code", 0), meta.get("command", []))
+    return cr, classpath
+
+
+def _build_java(code: str, timeout_s: int, workdir: str, use_farm: bool = True) -> tuple[CompileResult, str | None]:
+    """
+    Компиляция Java с кэшем .class-файлов (ключ — исходник и версия JDK).
+    Возвращает результат компиляции и каталог для `-cp` внутри workdir: свежесобранные классы
+    или проверенная копия записи кэша (живёт, пока жив workdir вызывающего).
+    """
+    javac, err = _which_or_err("javac", 'Компилятор')
+    if err:
+        return CompileResult(False, "", err, None, ["javac"]), None
+
+    key = _java_key(code, javac)
+    cached = _java_cache_hit(key, workdir)
+    if cached is not None:
+        return cached
+
+    memo_key = _memo_key(key)
+    failed = _COMPILE_MEMO.get(memo_key)
+    if failed is not None:
+        return failed, None
+
+    if use_farm:
+        farmed = _farm_build(
+            {"language": "java", "code": code or "", "compiler": "javac", "timeout_s": timeout_s, "memory_mb": None},
+            lambda: _java_cache_hit(key, workdir),
+        )
+        if farmed is not None:
+            _memo_failure(memo_key, farmed[0])
+            return farmed
+
+    def _compile() -> tuple[CompileResult, str | None]:
+        src = os.path.join(workdir, "Main.java")
+        with open(src, "w", encoding="utf-8", newline="\n") as f:
+            f.write(code or "")
+
+        cmd = [javac, src]
+        try:
+            cmd, outcome = _run_javac([src], javac, timeout_s=timeout_s, cwd=workdir)
+        except OSError as e:
+            return CompileResult(False, "", f"Не удалось запустить javac: {e}", None, cmd), None
+
+        cr = _compile_result(outcome, cmd, timeout_s)
+        if not cr.compiled:
+            _memo_failure(memo_key, cr)
+            return cr, None
+
+        # javac кладёт все классы (включая вложенные Main$Inner.class) рядом с исходником
+        # или в подкаталоги пакетов — сохраняем их с относительными путями.
+        class_files: dict[str, str] = {}
+        for dirpath, _dirnames, filenames in os.walk(workdir):
+            for name in filenames:
+                if name.endswith(".class"):
+                    path = os.path.join(dirpath, name)
+                    class_files[os.path.relpath(path, workdir)] = path
+
+        _ARTIFACT_CACHE.put(
+            "java",
+            key,
+            files=class_files,
+            meta={"stdout": cr.stdout, "stderr": cr.stderr, "exit_code": cr.exit_code, "command": cr.command},
+        )
+        return cr, workdir
+
+    return _single_flight("java", key, memo_key, timeout_s, lambda: _java_cache_hit(key, workdir), _compile)
+
+
+def _java_command(java: str, classpath: str, memory_mb: int) -> list[str]:
+    javac = _TOOLCHAINS.get("javac")
+    flags = _JVM.flags(
+        java,
+        javac.path if javac is not None else None,
+        _compiler_version(java),
+        memory_mb,
+        env=_safe_env(),
+    )
+    return [java, *flags, "-cp", classpath, "Main"]
+
+
+def warmup_jvm() -> None:
+    """
+    Ставит в фоновую сборку CDS-архив для установленного JDK (нужны java и javac).
+    Вызывается при старте приложения, если включён JVM_CDS_WARMUP.
+    """
+    java, javac = _TOOLCHAINS.get("java"), _TOOLCHAINS.get("javac")
+    if java is None or javac is None or not java.available or not javac.available:
+        return
+    _JVM.warmup(java.path, javac.path, _compiler_version(java.path), env=_safe_env())
 
 
 def compile_java(code: str, timeout_s: int = 10) -> CompileResult:
@@ -447,37 +1566,50 @@ def compile_java(code: str, timeout_s: int = 10) -> CompileResult:
     if class_err:
         return CompileResult(False, "", class_err, None, ["javac"])
 
-    with tempfile.TemporaryDirectory(prefix="algo_java_compile_") as tmp:
-        src = os.path.join(tmp, "Main.java")
-        with open(src, "w", encoding="utf-8", newline="\n") as f:
-            f.write(code or "")
+    with _WORKSPACES.workspace(prefix="algo_java_compile_") as tmp:
+        cr, _classpath = _build_java(code=code, timeout_s=timeout_s, workdir=tmp)
+        return cr
 
-        javac, err = _which_or_err("javac", 'Компилятор')
-        if err:
-            return CompileResult(False, "", err, None, ["javac"])
 
-        cmd = [javac, src]
+def check_java(code: str, timeout_s: int = 10) -> tuple[CompileResult, list[Diagnostic]]:
+    """
+    Проверка Java без сборки: javac с JAVAC_SYNTAX_FLAGS в одноразовом рабочем каталоге,
+    ошибки и предупреждения со строкой и колонкой. Результат кэшируется в памяти.
+    """
+    if len(code or "") > MAX_SOURCE_CHARS:
+        return CompileResult(False, "", f"Код слишком большой: максимум {MAX_SOURCE_CHARS} символов.", None, []), []
+    class_err = _validate_java_class_name(code)
+    if class_err:
+        match = re.search(r"public\s+class\s+(\w+)", code or "")
+        line = (code or "").count("\n", 0, match.start()) + 1
+        return CompileResult(False, "", class_err, None, ["javac"]), [
+            Diagnostic(severity="error", message=class_err, line=line, file="Main.java")
+        ]
+    javac, err = _which_or_err("javac", "Компилятор")
+    if err:
+        return CompileResult(False, "", err, None, ["javac"]), []
+
+    key = cache_key("java-syntax", code or "", javac, _compiler_version(javac), " ".join(JAVAC_SYNTAX_FLAGS))
+    cached = _syntax_cache_get(key)
+    if cached is not None:
+        return cached
+
+    with _WORKSPACES.workspace(prefix="algo_check_") as tmp:
+        with open(os.path.join(tmp, "Main.java"), "w", encoding="utf-8", newline="\n") as f:
+            f.write(code or "")
+        os.mkdir(os.path.join(tmp, "classes"))
+        cmd = [javac, *JAVAC_SYNTAX_FLAGS, "-d", "classes", "Main.java"]
         try:
-            proc = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout_s,
-                cwd=tmp,
-                env=_safe_env(),
-            )
-        except subprocess.TimeoutExpired:
-            return CompileResult(False, "", f"Компиляция превысила лимит времени ({timeout_s}с).", None, cmd)
+            cmd, outcome = _run_javac(cmd[1:], javac, timeout_s=timeout_s, cwd=tmp)
         except OSError as e:
-            return CompileResult(False, "", f"Не удалось запустить javac: {e}", None, cmd)
+            return CompileResult(False, "", f"Не удалось запустить javac: {e}", None, cmd), []
 
-        return CompileResult(
-            compiled=(proc.returncode == 0),
-            stdout=_truncate(proc.stdout or "", MAX_OUTPUT_CHARS),
-            stderr=_truncate(proc.stderr or "", MAX_OUTPUT_CHARS),
-            exit_code=proc.returncode,
-            command=cmd,
-        )
+    cr = _compile_result(outcome, cmd, timeout_s)
+    if outcome.timed_out:
+        return cr, []
+    checked = cr, parse_javac(outcome.stderr)
+    _syntax_cache_put(key, checked)
+    return checked
 
 
 def run_java(code: str, stdin: str = "", compile_timeout_s: int = 10, run_timeout_s: int = 2, memory_mb: int = 256) -> tuple[CompileResult, RunResult]:
@@ -492,77 +1624,410 @@ def run_java(code: str, stdin: str = "", compile_timeout_s: int = 10, run_timeou
         cr = CompileResult(compiled=False, stdout="", stderr=class_err, exit_code=None, command=[])
         return cr, RunResult(False, "", "", None, [])
 
-    with tempfile.TemporaryDirectory(prefix="algo_java_run_") as tmp:
-        src = os.path.join(tmp, "Main.java")
-        with open(src, "w", encoding="utf-8", newline="\n") as f:
-            f.write(code or "")
-
-        javac, err = _which_or_err("javac", 'Компилятор')
-        if err:
-            cr = CompileResult(False, "", err, None, ["javac"])
+    with _WORKSPACES.workspace(prefix="algo_java_run_") as tmp:
+        cr, classpath = _build_java(code=code, timeout_s=compile_timeout_s, workdir=tmp)
+        if not cr.compiled or not classpath:
             return cr, RunResult(False, "", "", None, [])
 
-        compile_cmd = [javac, src]
+        java, err2 = _which_or_err("java", 'Среда выполнения')
+        if err2:
+            return cr, RunResult(False, "", err2, None, ["java"])
+
+        run_cmd = _java_command(java, classpath, memory_mb)
         try:
-            proc = subprocess.run(
-                compile_cmd,
-                capture_output=True,
-                text=True,
-                timeout=compile_timeout_s,
-                cwd=tmp,
-                env=_safe_env(),
-            )
-        except subprocess.TimeoutExpired:
-            cr = CompileResult(False, "", f"Компиляция превысила лимит времени ({compile_timeout_s}с).", None, compile_cmd)
-            return cr, RunResult(False, "", "", None, [])
+            outcome = _run_program(run_cmd, stdin=stdin, timeout_s=run_timeout_s, cwd=tmp, memory_mb=memory_mb)
         except OSError as e:
-            cr = CompileResult(False, "", f"Не удалось запустить javac: {e}", None, compile_cmd)
-            return cr, RunResult(False, "", "", None, [])
+            return cr, RunResult(False, "", f"Не удалось запустить java: {e}", None, run_cmd)
 
-        cr = CompileResult(
-            compiled=(proc.returncode == 0),
-            stdout=_truncate(proc.stdout or "", MAX_OUTPUT_CHARS),
-            stderr=_truncate(proc.stderr or "", MAX_OUTPUT_CHARS),
-            exit_code=proc.returncode,
-            command=compile_cmd,
+        return cr, _run_result(outcome, run_cmd, run_timeout_s)
+
+
+def _prepare_runnable(
+    lang: str,
+    code: str,
+    compiler: str | None,
+    compile_timeout_s: int,
+    memory_mb: int,
+    workdir: str,
+    profile: str = DEFAULT_PROFILE,
+) -> tuple[CompileResult, list[str] | None]:
+    """
+    Собирает код один раз и возвращает команду запуска (None — если собрать не удалось).
+    Артефакты берутся из кэша так же, как в run_cpp/run_java. Профиль сборки влияет только на C++.
+    """
+    if lang == "cpp":
+        cr, exe_path = _build_cpp(
+            code=code,
+            compiler=compiler or "g++",
+            timeout_s=compile_timeout_s,
+            memory_mb=memory_mb,
+            workdir=workdir,
+            profile=profile,
         )
+        return cr, [exe_path] if cr.compiled and exe_path else None
+
+    if lang == "python":
+        cr = compile_python(code=code, timeout_s=5)
         if not cr.compiled:
-            return cr, RunResult(False, "", "", None, [])
+            return cr, None
+        py, err = _which_or_err("python", 'Интерпретатор')
+        if err:
+            return CompileResult(False, "", err, None, ["python"]), None
+        src = os.path.join(workdir, "main.py")
+        with open(src, "w", encoding="utf-8", newline="\n") as f:
+            f.write(code or "")
+        return cr, [py, "-I", src]
 
-        java, err2 = _which_or_err("java", 'Среда выполнения')
-        if err2:
-            return cr, RunResult(False, "", err2, None, ["java"])
+    class_err = _validate_java_class_name(code)
+    if class_err:
+        return CompileResult(False, "", class_err, None, []), None
+    cr, classpath = _build_java(code=code, timeout_s=compile_timeout_s, workdir=workdir)
+    if not cr.compiled or not classpath:
+        return cr, None
+    java, err = _which_or_err("java", 'Среда выполнения')
+    if err:
+        return CompileResult(False, "", err, None, ["java"]), None
+    return cr, _java_command(java, classpath, memory_mb)
+
+
+def _outputs_match(actual: str, expected: str) -> bool:
+    # Сравнение без учёта хвостовых пробелов в строках и пустых строк в конце.
+    def _norm(text: str) -> list[str]:
+        return [line.rstrip() for line in (text or "").rstrip().splitlines()]
+
+    return _norm(actual) == _norm(expected)
 
-        preexec = _limit_resources_unix(memory_mb=memory_mb, cpu_s=run_timeout_s) if os.name != "nt" else None
-        run_cmd = [java, "-cp", tmp, "Main"]
+
+def _run_case(cmd: list[str], case: dict, run_timeout_s: int, memory_mb: int, cwd: str, sanitizer: bool = False) -> CaseResult:
+    expected = case.get("expected")
+    # Для сравнения с ожидаемым выводом храним его с запасом (хвостовые пробелы), но не весь вывод.
+    max_chars = max(MAX_OUTPUT_CHARS, 2 * len(expected or "") + 1024)
+    try:
+        outcome = _run_program(
+            cmd,
+            stdin=case.get("stdin") or "",
+            timeout_s=run_timeout_s,
+            cwd=cwd,
+            memory_mb=memory_mb,
+            max_chars=max_chars,
+            sanitizer=sanitizer,
+        )
+    except OSError as e:
+        return CaseResult("error", None if expected is None else False, "", f"Не удалось запустить программу: {e}", None, 0.0, None, None)
+
+    stdout = _truncate(outcome.stdout, MAX_OUTPUT_CHARS)
+    stderr = _truncate(outcome.stderr, MAX_OUTPUT_CHARS)
+    if outcome.timed_out or _cpu_limit_exit(outcome.returncode):
+        verdict = "timeout"
+        stderr = f"Запуск превысил лимит времени ({run_timeout_s}с)."
+    elif outcome.output_limit_exceeded:
+        verdict = "output_limit"
+        stderr = (stderr + "\n" if stderr else "") + _output_limit_message(max_chars)
+    elif outcome.returncode != 0:
+        verdict = "runtime_error"
+    elif expected is not None and not _outputs_match(outcome.stdout, expected):
+        verdict = "wrong_answer"
+    else:
+        verdict = "ok"
+    return CaseResult(
+        status=verdict,
+        passed=None if expected is None else verdict == "ok",
+        stdout=stdout,
+        stderr=stderr,
+        exit_code=outcome.returncode,
+        **_usage(outcome),
+    )
+
+
+def run_code_batch(
+    language: str,
+    code: str,
+    cases: list[dict],
+    compiler: str | None = None,
+    compile_timeout_s: int = 10,
+    run_timeout_s: int = 2,
+    memory_mb: int = 256,
+    profile: str | None = None,
+) -> tuple[CompileResult, list[CaseResult]]:
+    """
+    Пакетный запуск: одна компиляция и прогон на наборе тестов параллельно (до BATCH_WORKERS).
+    cases — список {"stdin": str, "expected": str | None}; каждый тест — в своём каталоге.
+    Каждый параллельно идущий тест занимает слот контроля нагрузки языка: пакет ждёт один слот,
+    а дополнительные берёт только свободные — параллельность не превышает общий лимит хоста.
+    """
+    lang = _norm_lang(language)
+    if lang not in SUPPORTED_LANGUAGES:
+        return CompileResult(False, "", f"Язык не поддерживается: {language}", None, []), []
+    profile_err = profile_error(profile)
+    if profile_err:
+        return CompileResult(False, "", profile_err, None, []), []
+    profile = profile or DEFAULT_PROFILE
+    sanitizer = lang == "cpp" and profile in SANITIZER_PROFILES
+    if len(cases) > MAX_BATCH_CASES:
+        return CompileResult(False, "", f"Слишком много тестов: максимум {MAX_BATCH_CASES}.", None, []), []
+    for case in cases or [{"stdin": ""}]:
+        payload_err = _validate_payload(language=lang, code=code, stdin=case.get("stdin") or "")
+        if payload_err:
+            return CompileResult(False, "", payload_err, None, []), []
+
+    with _ADMISSION.slot(lang):
+        with _WORKSPACES.workspace(prefix="algo_batch_") as tmp:
+            cr, cmd = _prepare_runnable(lang, code, compiler, compile_timeout_s, memory_mb, workdir=tmp, profile=profile)
+            if cmd is None or not cases:
+                return cr, []
+
+            case_dirs = []
+            for i in range(len(cases)):
+                case_dir = os.path.join(tmp, f"case_{i}")
+                os.mkdir(case_dir)
+                case_dirs.append(case_dir)
+
+            wanted = max(1, min(BATCH_WORKERS, len(cases)))
+            with _ADMISSION.extra_slots(lang, wanted - 1) as extra:
+                with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=1 + extra, thread_name_prefix="algo-batch"
+                ) as pool:
+                    results = list(
+                        pool.map(
+                            lambda item: _run_case(cmd, item[0], run_timeout_s, memory_mb, item[1], sanitizer),
+                            zip(cases, case_dirs),
+                        )
+                    )
+            return cr, results
+
+
+def _benchmark_case(
+    cmd: list[str], case: dict, repeat: int, run_timeout_s: int, memory_mb: int, cwd: str, sanitizer: bool
+) -> BenchmarkCase:
+    samples: list[ProcessOutcome] = []
+    status, stderr = "ok", ""
+    for _ in range(repeat):
         try:
-            run_proc = subprocess.run(
-                run_cmd,
-                input=stdin or "",
-                capture_output=True,
-                text=True,
-                timeout=run_timeout_s,
-                cwd=tmp,
-                env=_safe_env(),
-                preexec_fn=preexec,
+            outcome = _run_program(
+                cmd,
+                stdin=case.get("stdin") or "",
+                timeout_s=run_timeout_s,
+                cwd=cwd,
+                memory_mb=memory_mb,
+                max_chars=BENCHMARK_MAX_OUTPUT_CHARS,
+                sanitizer=sanitizer,
             )
-        except subprocess.TimeoutExpired:
-            return cr, RunResult(False, "", f"Запуск превысил лимит времени ({run_timeout_s}с).", None, run_cmd)
         except OSError as e:
-            return cr, RunResult(False, "", f"Не удалось запустить java: {e}", None, run_cmd)
+            status, stderr = "error", f"Не удалось запустить программу: {e}"
+            break
+        if outcome.timed_out or _cpu_limit_exit(outcome.returncode):
+            status, stderr = "timeout", f"Запуск превысил лимит времени ({run_timeout_s}с)."
+        elif outcome.output_limit_exceeded:
+            status, stderr = "output_limit", _output_limit_message(BENCHMARK_MAX_OUTPUT_CHARS)
+        elif outcome.returncode != 0:
+            status, stderr = "runtime_error", _truncate(outcome.stderr, MAX_OUTPUT_CHARS)
+        if status != "ok":
+            break
+        samples.append(outcome)
+    rss = [o.max_rss_kb for o in samples if o.max_rss_kb is not None]
+    return BenchmarkCase(
+        size=case.get("size"),
+        status=status,
+        runs=len(samples),
+        wall_time_ms=summarize([o.wall_ms for o in samples]),
+        cpu_time_ms=summarize([o.cpu_ms for o in samples]),
+        max_rss_kb=max(rss) if rss else None,
+        stderr=stderr,
+    )
+
+
+def benchmark_code(
+    language: str,
+    code: str,
+    cases: list[dict],
+    repeat: int = 5,
+    compiler: str | None = None,
+    compile_timeout_s: int = 10,
+    run_timeout_s: int = 2,
+    memory_mb: int = 256,
+    profile: str | None = None,
+) -> tuple[CompileResult, list[BenchmarkCase]]:
+    """
+    Бенчмарк: одна компиляция и repeat запусков на каждом входе. cases — список
+    {"stdin": str, "size": int | None}. В отличие от run_code_batch запуски идут строго
+    по очереди — параллельные запуски мешали бы друг другу и искажали время.
+    Весь бенчмарк занимает один слот контроля нагрузки языка.
+    """
+    lang = _norm_lang(language)
+    if lang not in SUPPORTED_LANGUAGES:
+        return CompileResult(False, "", f"Язык не поддерживается: {language}", None, []), []
+    profile_err = profile_error(profile)
+    if profile_err:
+        return CompileResult(False, "", profile_err, None, []), []
+    profile = profile or DEFAULT_PROFILE
+    repeat = max(1, int(repeat))
+    if repeat > BENCHMARK_MAX_REPEAT:
+        return CompileResult(False, "", f"Слишком много повторов: максимум {BENCHMARK_MAX_REPEAT}.", None, []), []
+    if not cases or repeat * len(cases) > BENCHMARK_MAX_RUNS:
+        return CompileResult(
+            False, "", f"Слишком много запусков: входов × повторов не больше {BENCHMARK_MAX_RUNS}.", None, []
+        ), []
+    payload_err = _validate_payload(language=lang, code=code, stdin="")
+    if not payload_err and any(len(case.get("stdin") or "") > BENCHMARK_MAX_INPUT_CHARS for case in cases):
+        payload_err = f"Вход бенчмарка слишком большой: максимум {BENCHMARK_MAX_INPUT_CHARS} символов."
+    if payload_err:
+        return CompileResult(False, "", payload_err, None, []), []
+
+    with _ADMISSION.slot(lang):
+        with _WORKSPACES.workspace(prefix="algo_bench_") as tmp:
+            cr, cmd = _prepare_runnable(lang, code, compiler, compile_timeout_s, memory_mb, workdir=tmp, profile=profile)
+            if cmd is None:
+                return cr, []
+            sanitizer = lang == "cpp" and profile in SANITIZER_PROFILES
+            return cr, [_benchmark_case(cmd, case, repeat, run_timeout_s, memory_mb, tmp, sanitizer) for case in cases]
 
-        return cr, RunResult(True, _truncate(run_proc.stdout or "", MAX_OUTPUT_CHARS), _truncate(run_proc.stderr or "", MAX_OUTPUT_CHARS), run_proc.returncode, run_cmd)
+
+def stream_code(
+    language: str,
+    code: str,
+    stdin: str = "",
+    compiler: str | None = None,
+    compile_timeout_s: int = 10,
+    run_timeout_s: int = 2,
+    memory_mb: int = 256,
+    profile: str | None = None,
+) -> Iterator[tuple[str, object]]:
+    """
+    Потоковый запуск — генератор событий:
+    ("start", None) → ("compile", CompileResult) → ("stdout" | "stderr", текст)... → ("exit", RunResult).
+    RunResult в конце — без вывода (он уже отдан чанками). Слот контроля нагрузки занимается
+    при первом next(): AdmissionRejected бросается до первого события, так что API ещё может
+    ответить 503. Закрытие генератора (клиент ушёл) убивает процесс и освобождает слот.
+    """
+    lang = _norm_lang(language)
+    if lang not in SUPPORTED_LANGUAGES:
+        yield "compile", CompileResult(False, "", f"Язык не поддерживается: {language}", None, [])
+        return
+    payload_err = _validate_payload(language=lang, code=code, stdin=stdin) or profile_error(profile)
+    if payload_err:
+        yield "compile", CompileResult(False, "", payload_err, None, [])
+        return
+    profile = profile or DEFAULT_PROFILE
+
+    with _ADMISSION.slot(lang):
+        yield "start", None
+        with _WORKSPACES.workspace(prefix="algo_stream_") as tmp:
+            cr, cmd = _prepare_runnable(lang, code, compiler, compile_timeout_s, memory_mb, workdir=tmp, profile=profile)
+            yield "compile", cr
+            if cmd is None:
+                return
+
+            try:
+                events = _iter_program(
+                    cmd,
+                    stdin,
+                    run_timeout_s,
+                    cwd=tmp,
+                    memory_mb=memory_mb,
+                    sanitizer=lang == "cpp" and profile in SANITIZER_PROFILES,
+                )
+                for kind, payload in events:
+                    if kind == "exit":
+                        yield "exit", _run_result(payload, cmd, run_timeout_s)
+                    else:
+                        yield kind, payload
+            except OSError as e:
+                yield "exit", RunResult(False, "", f"Не удалось запустить программу: {e}", None, cmd)
+
+
+def farm_compile(job: dict) -> dict:
+    """
+    Одно задание фермы компиляции (`manage.py compile_worker`): сборка на месте, без повторной
+    отправки на ферму. Возвращает CompileResult и путь к записи в кэше — None, если записи
+    в кэше нет (кэш выключен), тогда backend соберёт код сам.
+    """
+    lang = _norm_lang(job.get("language") or "")
+    code = job.get("code") or ""
+    timeout_s = int(job.get("timeout_s") or 10)
+    with _WORKSPACES.workspace(prefix="algo_farm_") as tmp:
+        # Сборка отдаёт частную копию в tmp — backend возьмёт запись из кэша, если она там есть.
+        if lang == "cpp":
+            compiler = job.get("compiler") or "g++"
+            profile = job.get("profile") or DEFAULT_PROFILE
+            cr, _path = _build_cpp(
+                code=code,
+                compiler=compiler,
+                timeout_s=timeout_s,
+                memory_mb=int(job.get("memory_mb") or 512),
+                workdir=tmp,
+                use_farm=False,
+                profile=profile,
+            )
+            compiler_path, _err = _which_or_err(compiler, "Компилятор", language="cpp")
+            hit = (
+                _ARTIFACT_CACHE.get(_cpp_namespace(profile), _cpp_key(code, compiler_path, profile))
+                if cr.compiled and compiler_path
+                else None
+            )
+        elif lang == "java":
+            cr, _path = _build_java(code=code, timeout_s=timeout_s, workdir=tmp, use_farm=False)
+            javac, _err = _which_or_err("javac", 'Компилятор')
+            hit = _ARTIFACT_CACHE.get("java", _java_key(code, javac)) if cr.compiled and javac else None
+        else:
+            raise ValueError(f"Язык не поддерживается: {job.get('language')}")
+    return {"result": asdict(cr), "artifact": hit[0] if hit else None}
 
 
-def compile_code(language: str, code: str, compiler: str | None = None) -> CompileResult:
+def compile_code(language: str, code: str, compiler: str | None = None, profile: str | None = None) -> CompileResult:
+    """
+    Только компиляция (проверка синтаксиса для Python).
+    Занимает слот контроля нагрузки языка; при перегрузке — AdmissionRejected.
+    """
     lang = _norm_lang(language)
-    if lang == "cpp":
-        return compile_cpp(code=code, compiler=compiler or "g++", timeout_s=10)
+    if lang not in SUPPORTED_LANGUAGES:
+        return CompileResult(False, "", f"Язык не поддерживается: {language}", None, [])
+    profile_err = profile_error(profile)
+    if profile_err:
+        return CompileResult(False, "", profile_err, None, [])
+    # Проверка синтаксиса Python идёт в процессе и почти бесплатна — её не ограничиваем.
     if lang == "python":
         return compile_python(code=code, timeout_s=5)
-    if lang == "java":
+    with _ADMISSION.slot(lang):
+        if lang == "cpp":
+            return compile_cpp(code=code, compiler=compiler or "g++", timeout_s=10, profile=profile or DEFAULT_PROFILE)
         return compile_java(code=code, timeout_s=10)
-    return CompileResult(False, "", f"Язык не поддерживается: {language}", None, [])
+
+
+def check_code(language: str, code: str, compiler: str | None = None) -> tuple[CompileResult, list[Diagnostic]]:
+    """
+    Проверка кода без сборки и запуска (для /api/algorithms/compile/, подсветка ошибок в редакторе):
+    результат и диагностики компилятора. C++ и Java занимают слот контроля нагрузки языка;
+    при перегрузке — AdmissionRejected.
+    """
+    lang = _norm_lang(language)
+    if lang not in SUPPORTED_LANGUAGES:
+        return CompileResult(False, "", f"Язык не поддерживается: {language}", None, []), []
+    if lang == "python":
+        return check_python(code=code, timeout_s=5)
+    with _ADMISSION.slot(lang):
+        if lang == "cpp":
+            return check_cpp(code=code, compiler=compiler or "g++", timeout_s=10)
+        return check_java(code=code, timeout_s=10)
+
+
+def prebuild(language: str, code: str, compiler: str | None = None, profile: str | None = None) -> CompileResult | None:
+    """
+    Сборка C++/Java заранее, чтобы первый запуск взял артефакт из кэша (одобрение алгоритма,
+    `manage.py rebuild_artifacts`). None — язык без компиляции. Для фоновой сборки слот
+    контроля нагрузки не отклоняет запрос, а ждётся — не дольше PREBUILD_MAX_WAIT_S, после
+    чего AdmissionRejected (код соберёт первый запуск или rebuild_artifacts).
+    """
+    lang = _norm_lang(language)
+    if lang not in PREBUILD_LANGUAGES:
+        return None
+    deadline = time.monotonic() + PREBUILD_MAX_WAIT_S
+    while True:
+        try:
+            return compile_code(lang, code, compiler, profile)
+        except AdmissionRejected as e:
+            if time.monotonic() + e.retry_after > deadline:
+                raise
+            time.sleep(e.retry_after)
 
 
 def run_code(
@@ -573,20 +2038,34 @@ def run_code(
     compile_timeout_s: int = 10,
     run_timeout_s: int = 2,
     memory_mb: int = 256,
+    profile: str | None = None,
 ) -> tuple[CompileResult, RunResult]:
+    """
+    Компиляция и запуск. Занимает слот контроля нагрузки языка на всё время работы;
+    при перегрузке — AdmissionRejected (API отвечает 503 с Retry-After).
+    profile — профиль сборки C++ из CPP_PROFILES (None — default); для Python и Java не влияет.
+    """
     lang = _norm_lang(language)
-    if lang == "cpp":
-        return run_cpp(
-            code=code,
-            stdin=stdin,
-            compiler=compiler or "g++",
-            compile_timeout_s=compile_timeout_s,
-            run_timeout_s=run_timeout_s,
-            memory_mb=memory_mb,
-        )
-    if lang == "python":
-        return run_python(code=code, stdin=stdin, run_timeout_s=run_timeout_s, memory_mb=memory_mb)
-    if lang == "java":
+    if lang not in SUPPORTED_LANGUAGES:
+        cr = CompileResult(False, "", f"Язык не поддерживается: {language}", None, [])
+        rr = RunResult(False, "", "", None, [])
+        return cr, rr
+    profile_err = profile_error(profile)
+    if profile_err:
+        return CompileResult(False, "", profile_err, None, []), RunResult(False, "", "", None, [])
+    with _ADMISSION.slot(lang):
+        if lang == "cpp":
+            return run_cpp(
+                code=code,
+                stdin=stdin,
+                compiler=compiler or "g++",
+                compile_timeout_s=compile_timeout_s,
+                run_timeout_s=run_timeout_s,
+                memory_mb=memory_mb,
+                profile=profile or DEFAULT_PROFILE,
+            )
+        if lang == "python":
+            return run_python(code=code, stdin=stdin, run_timeout_s=run_timeout_s, memory_mb=memory_mb)
         return run_java(
             code=code,
             stdin=stdin,
@@ -594,6 +2073,3 @@ def run_code(
             run_timeout_s=run_timeout_s,
             memory_mb=memory_mb,
         )
-    cr = CompileResult(False, "", f"Язык не поддерживается: {language}", None, [])
-    rr = RunResult(False, "", "", None, [])
-    return cr, rr
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+# g++/clang++: "main.cpp:3:5: error: ...", без колонки — "main.cpp:3: error: ...".
+_GCC_LINE = re.compile(
+    r"^(?P<file>[^:\n]+):(?P<line>\d+):(?:(?P<column>\d+):)? (?P<severity>fatal error|error|warning|note): (?P<message>.*)$"
+)
+# javac: "Main.java:3: error: ...", затем строка исходника и строка с "^" под позицией ошибки.
+_JAVAC_LINE = re.compile(r"^(?P<file>[^:\n]+\.java):(?P<line>\d+): (?P<severity>error|warning): (?P<message>.*)$")
+_JAVAC_GLOBAL = re.compile(r"^(?P<severity>error|warning): (?P<message>.*)$")
+_JAVAC_SUMMARY = re.compile(r"^\d+ (?:error|warning)s?$")
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    """
+    Одно сообщение компилятора. severity: error | warning | note;
+    line/column — с единицы, None — позиция неизвестна (сообщение о файле или запуске целиком).
+    """
+    severity: str
+    message: str
+    line: int | None = None
+    column: int | None = None
+    file: str = ""
+
+    def as_dict(self) -> dict:
+        return {
+            "severity": self.severity,
+            "message": self.message,
+            "line": self.line,
+            "column": self.column,
+            "file": self.file,
+        }
+
+
+def parse_gcc(text: str) -> list[Diagnostic]:
+    """
+    Сообщения g++/clang++ из stderr. Строки контекста ("In function ...", фрагменты кода
+    с подчёркиванием) пропускаются; "fatal error" считается ошибкой.
+    """
+    diagnostics: list[Diagnostic] = []
+    for raw in (text or "").splitlines():
+        match = _GCC_LINE.match(raw)
+        if not match:
+            continue
+        severity = match.group("severity")
+        diagnostics.append(
+            Diagnostic(
+                severity="error" if severity == "fatal error" else severity,
+                message=match.group("message").strip(),
+                line=int(match.group("line")),
+                column=int(match.group("column")) if match.group("column") else None,
+                file=match.group("file"),
+            )
+        )
+    return diagnostics
+
+
+def parse_javac(text: str) -> list[Diagnostic]:
+    """
+    Сообщения javac из stderr. Колонка берётся по позиции "^" под строкой исходника,
+    строки пояснений после неё ("symbol: ...", "location: ...") дописываются к сообщению.
+    """
+    diagnostics: list[Diagnostic] = []
+    current: dict | None = None
+
+    def flush() -> None:
+        if current is not None:
+            diagnostics.append(Diagnostic(**current))
+
+    for raw in (text or "").splitlines():
+        match = _JAVAC_LINE.match(raw)
+        global_match = None if match else _JAVAC_GLOBAL.match(raw)
+        if match or global_match:
+            flush()
+            m = match or global_match
+            current = {
+                "severity": m.group("severity"),
+                "message": m.group("message").strip(),
+                "line": int(match.group("line")) if match else None,
+                "column": None,
+                "file": match.group("file") if match else "",
+            }
+            continue
+        if current is None:
+            continue
+        if _JAVAC_SUMMARY.match(raw) or raw.startswith("Note: "):
+            flush()
+            current = None
+            continue
+        if current["line"] is not None and current["column"] is None and raw.strip() == "^":
+            current["column"] = raw.index("^") + 1
+        elif current["column"] is not None and raw.strip():
+            current["message"] += "\n" + raw.strip()
+    flush()
+    return diagnostics
+
+
+def from_python_error(error: BaseException) -> Diagnostic:
+    """
+    Диагностика по исключению compile(): у SyntaxError есть строка и колонка, у остальных
+    (нулевые байты, слишком глубокая вложенность) — только текст.
+    """
+    if isinstance(error, SyntaxError):
+        return Diagnostic(
+            severity="error",
+            message=f"{type(error).__name__}: {error.msg}",
+            line=error.lineno,
+            column=error.offset or None,
+            file="main.py",
+        )
+    if isinstance(error, ValueError):
+        return Diagnostic(severity="error", message=f"{type(error).__name__}: {error}", file="main.py")
+    return Diagnostic(
+        severity="error",
+        message="Код слишком сложен для разбора (слишком глубокая вложенность).",
+        file="main.py",
+    )
@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import socket
+import socketserver
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, replace
+from typing import Callable, Iterator
+
+
+@dataclass(frozen=True)
+class ProcessOutcome:
+    stdout: str
+    stderr: str
+    returncode: int | None
+    timed_out: bool
+    wall_ms: float
+    cpu_ms: float | None
+    max_rss_kb: int | None
+    # Вывод превысил лимит и процесс остановлен досрочно (см. _iter_process, kill_on_overflow).
+    output_limit_exceeded: bool = False
+
+
+# (cmd, stdin, timeout_s, cwd, memory_mb=..., max_chars=..., kill_on_overflow=..., sanitizer=...) -> события процесса
+# под лимитами ресурсов (compile_service._iter_limited).
+IterLimited = Callable[..., Iterator[tuple[str, object]]]
+
+
+class Executor(ABC):
+    """
+    Способ запустить пользовательскую программу (после компиляции).
+
+    iter_run отдаёт события так же, как compile_service._iter_process: ("stdout" | "stderr", текст)
+    по мере появления, последним — ("exit", ProcessOutcome) с пустым выводом. OSError — запуск
+    невозможен. Закрытие генератора должно останавливать программу. sanitizer=True — программа
+    собрана с AddressSanitizer, ей нельзя ограничивать адресное пространство (см. _iter_limited).
+    Компиляторы драйвер не запускает: они собирают код в рабочем каталоге backend-а.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def iter_run(
+        self,
+        cmd: list[str],
+        stdin: str,
+        timeout_s: float,
+        cwd: str,
+        memory_mb: int,
+        max_chars: int | None = None,
+        kill_on_overflow: bool = False,
+        sanitizer: bool = False,
+    ) -> Iterator[tuple[str, object]]:
+        ...
+
+    def run(
+        self,
+        cmd: list[str],
+        stdin: str,
+        timeout_s: float,
+        cwd: str,
+        memory_mb: int,
+        max_chars: int | None = None,
+        kill_on_overflow: bool = False,
+        sanitizer: bool = False,
+    ) -> ProcessOutcome:
+        """
+        Запуск с ожиданием завершения: весь (уже обрезанный) вывод в ProcessOutcome.
+        """
+        chunks: dict[str, list[str]] = {"stdout": [], "stderr": []}
+        outcome = None
+        for kind, payload in self.iter_run(cmd, stdin, timeout_s, cwd, memory_mb, max_chars, kill_on_overflow, sanitizer):
+            if kind == "exit":
+                outcome = payload
+            else:
+                chunks[kind].append(payload)
+        return replace(outcome, stdout="".join(chunks["stdout"]), stderr="".join(chunks["stderr"]))
+
+    @property
+    def supports_python_pool(self) -> bool:
+        # Программа запускается прямо процессом backend-а без дополнительной изоляции —
+        # только тогда можно подменять запуск прогретым пулом (PythonWorkerPool).
+        return False
+
+    def stats(self) -> dict:
+        return {"driver": self.name}
+
+
+class LocalExecutor(Executor):
+    """
+    Обычный дочерний процесс backend-а с лимитами ресурсов (cgroup v2 или rlimit-ы).
+    """
+
+    name = "local"
+
+    def __init__(self, iter_limited: IterLimited):
+        self.iter_limited = iter_limited
+
+    @property
+    def supports_python_pool(self) -> bool:
+        return True
+
+    def _command(self, cmd: list[str]) -> list[str]:
+        return cmd
+
+    def iter_run(self, cmd, stdin, timeout_s, cwd, memory_mb, max_chars=None, kill_on_overflow=False, sanitizer=False):
+        return self.iter_limited(
+            self._command(cmd),
+            stdin,
+            timeout_s,
+            cwd,
+            memory_mb=memory_mb,
+            max_chars=max_chars,
+            kill_on_overflow=kill_on_overflow,
+            sanitizer=sanitizer,
+        )
+
+
+class NamespaceExecutor(LocalExecutor):
+    """
+    Запуск в отдельных пространствах имён Linux через `unshare` без root (user namespace):
+    своя сеть (только выключенный loopback — сети нет), свои PID (программа не видит и не
+    может трогать процессы хоста, а с её завершением ядро убивает всех потомков), IPC, UTS
+    и mount с собственным /proc. Лимиты (cgroup или rlimit-ы) ставятся на unshare и наследуются программой.
+    Если ядро не разрешает непривилегированные user namespace, запуск не происходит (OSError) —
+    молча запускать без изоляции нельзя.
+    """
+
+    name = "namespace"
+    UNSHARE_FLAGS = [
+        "--user",
+        "--map-root-user",
+        "--net",
+        "--pid",
+        "--fork",
+        "--kill-child",
+        "--mount",
+        "--mount-proc",
+        "--ipc",
+        "--uts",
+    ]
+
+    def __init__(
+        self,
+        iter_limited: IterLimited,
+        env_factory: Callable[[], dict[str, str]] | None = None,
+    ):
+        super().__init__(iter_limited)
+        self.env_factory = env_factory
+        self._lock = threading.Lock()
+        self._unshare: str | None = None
+        self._error: str | None = None
+        self._probed = False
+
+    @property
+    def supports_python_pool(self) -> bool:
+        return False
+
+    def _probe(self) -> None:
+        unshare = shutil.which("unshare")
+        if unshare is None:
+            self._error = "unshare не найден в PATH"
+            return
+        true_bin = shutil.which("true") or "/bin/true"
+        try:
+            proc = subprocess.run(
+                [unshare, *self.UNSHARE_FLAGS, "--", true_bin],
+                capture_output=True,
+                text=True,
+                timeout=5,
+                env=self.env_factory() if self.env_factory else None,
+            )
+        except (subprocess.TimeoutExpired, OSError) as e:
+            self._error = f"unshare не запускается: {e}"
+            return
+        if proc.returncode != 0:
+            self._error = f"пространства имён недоступны: {(proc.stderr or '').strip()}"
+            return
+        self._unshare = unshare
+
+    def _command(self, cmd: list[str]) -> list[str]:
+        with self._lock:
+            if not self._probed:
+                self._probe()
+                self._probed = True
+        if self._unshare is None:
+            raise OSError(f"Изоляция недоступна: {self._error}")
+        return [self._unshare, *self.UNSHARE_FLAGS, "--", *cmd]
+
+    def stats(self) -> dict:
+        return {"driver": self.name, "available": self._unshare is not None if self._probed else None, "error": self._error}
+
+
+class RemoteExecutor(Executor):
+    """
+    Запуск в отдельном процессе-исполнителе (`manage.py run_execution_daemon`) через Unix-сокет.
+
+    Протокол — строки JSON: запрос {"cmd", "stdin", "timeout_s", "cwd", "memory_mb", "max_chars",
+    "kill_on_overflow", "sanitizer"}, ответ — события {"kind": "stdout" | "stderr", "data"}, в конце
+    {"kind": "exit", "outcome": {...}} или {"kind": "error", "message"}. Исполнитель должен видеть
+    те же пути, что backend (рабочие каталоги и кэш артефактов) — общий диск или volume.
+    Закрытие соединения останавливает программу на стороне исполнителя.
+    """
+
+    name = "remote"
+    # Запас сверх лимита времени программы на ответ исполнителя.
+    RESPONSE_GRACE_S = 5.0
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+
+    def iter_run(self, cmd, stdin, timeout_s, cwd, memory_mb, max_chars=None, kill_on_overflow=False, sanitizer=False):
+        request = {
+            "cmd": list(cmd),
+            "stdin": stdin or "",
+            "timeout_s": timeout_s,
+            "cwd": cwd,
+            "memory_mb": memory_mb,
+            "max_chars": max_chars,
+            "kill_on_overflow": kill_on_overflow,
+            "sanitizer": sanitizer,
+        }
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(timeout_s + self.RESPONSE_GRACE_S)
+            sock.connect(self.socket_path)
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            reader = sock.makefile("rb")
+            try:
+                for line in reader:
+                    event = json.loads(line)
+                    kind = event.get("kind")
+                    if kind == "exit":
+                        yield "exit", ProcessOutcome(**event["outcome"])
+                        return
+                    if kind == "error":
+                        raise OSError(event.get("message") or "ошибка исполнителя")
+                    yield kind, event.get("data") or ""
+            finally:
+                reader.close()
+            raise OSError("исполнитель закрыл соединение, не завершив запуск")
+        finally:
+            sock.close()
+
+    def stats(self) -> dict:
+        return {"driver": self.name, "socket": self.socket_path}
+
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            job = json.loads(line)
+            events = self.server.executor.iter_run(
+                job["cmd"],
+                job.get("stdin") or "",
+                float(job["timeout_s"]),
+                job["cwd"],
+                int(job["memory_mb"]),
+                job.get("max_chars"),
+                bool(job.get("kill_on_overflow")),
+                bool(job.get("sanitizer")),
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            self._send({"kind": "error", "message": f"некорректный запрос: {e}"})
+            return
+        except OSError as e:
+            self._send({"kind": "error", "message": str(e)})
+            return
+        try:
+            for kind, payload in events:
+                if kind == "exit":
+                    self._send({"kind": "exit", "outcome": asdict(payload)})
+                else:
+                    self._send({"kind": kind, "data": payload})
+        except OSError as e:
+            # BrokenPipe — клиент ушёл; закрытие генератора ниже остановит программу.
+            try:
+                self._send({"kind": "error", "message": str(e)})
+            except OSError:
+                pass
+        finally:
+            events.close()
+
+    def _send(self, event: dict) -> None:
+        self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class ExecutionDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Исполнитель для RemoteExecutor: каждое соединение — один запуск через переданный драйвер.
+    Сокет доступен только владельцу (0600).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, executor: Executor):
+        self.executor = executor
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _DaemonHandler)
+        os.chmod(socket_path, 0o600)
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+DRIVERS = ("local", "namespace", "remote")
+
+
+def make_executor(
+    driver: str,
+    iter_limited: IterLimited,
+    socket_path: str = "",
+    env_factory: Callable[[], dict[str, str]] | None = None,
+) -> Executor:
+    if driver == "local":
+        return LocalExecutor(iter_limited)
+    if driver == "namespace":
+        return NamespaceExecutor(iter_limited, env_factory=env_factory)
+    if driver == "remote":
+        if not socket_path:
+            raise ValueError("Для драйвера remote нужен путь к сокету исполнителя")
+        return RemoteExecutor(socket_path)
+    raise ValueError(f"Неизвестный драйвер исполнения: {driver} (допустимо: {', '.join(DRIVERS)})")
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .admission import AdmissionRejected
+from .compile_service import run_code
+from .models import ExecutionJob
+from .serializers import run_result_data
+
+# Задание в статусе running дольше этого запаса сверх своих лимитов считаем потерянным
+# (процесс-исполнитель упал) и возвращаем в очередь.
+STALE_GRACE_S = 60
+# Сколько всего задание ждёт слот контроля нагрузки, прежде чем завершиться ошибкой.
+ADMISSION_MAX_WAIT_S = 600
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+_drainers = 0
+_wakeup = False
+_lock = threading.Lock()
+
+
+def _workers() -> int:
+    return int(getattr(settings, 'ALGO_JOB_WORKERS', 2))
+
+
+def submit(**fields) -> ExecutionJob:
+    """
+    Ставит задание в очередь и будит локальных исполнителей после коммита транзакции.
+    """
+    job = ExecutionJob.objects.create(**fields)
+    transaction.on_commit(dispatch)
+    return job
+
+
+def dispatch() -> None:
+    """
+    Запускает недостающих исполнителей в пуле потоков процесса (не больше ALGO_JOB_WORKERS).
+    При ALGO_JOB_WORKERS=0 очередь разбирает только `manage.py run_execution_worker`.
+    """
+    global _executor, _drainers, _wakeup
+    workers = _workers()
+    if workers <= 0:
+        return
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='algo-job')
+        if _drainers >= workers:
+            # Все исполнители заняты — пусть один из них перепроверит очередь перед выходом.
+            _wakeup = True
+            return
+        _drainers += 1
+    _executor.submit(_drain_in_thread)
+
+
+def _drain_in_thread() -> None:
+    global _drainers, _wakeup
+    close_old_connections()
+    try:
+        # Исполнители в процессе не опрашивают очередь сами: задания, брошенные упавшим или
+        # перезапущенным процессом, подбираем при первом (и каждом) пробуждении.
+        try:
+            requeue_stale()
+        except Exception:
+            logger.exception('Сбой возврата зависших заданий в очередь')
+        while True:
+            try:
+                drain()
+            except Exception:
+                logger.exception('Сбой исполнителя очереди заданий')
+            with _lock:
+                if not _wakeup:
+                    _drainers -= 1
+                    return
+                _wakeup = False
+    finally:
+        connection.close()
+
+
+def claim_next() -> ExecutionJob | None:
+    """
+    Атомарно забирает самое старое задание из очереди.
+    Захват — условный UPDATE по статусу, поэтому безопасен для нескольких процессов и на SQLite.
+    """
+    while True:
+        job_id = (
+            ExecutionJob.objects.filter(status=ExecutionJob.STATUS_QUEUED)
+            .order_by('created_at')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        claimed = ExecutionJob.objects.filter(id=job_id, status=ExecutionJob.STATUS_QUEUED).update(
+            status=ExecutionJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+        )
+        if claimed:
+            return ExecutionJob.objects.get(id=job_id)
+
+
+def _heartbeat(job: ExecutionJob) -> None:
+    # Ожидание слота — не зависание: сдвигаем started_at, чтобы requeue_stale не вернул задание
+    # в очередь (его бы выполнили дважды).
+    job.started_at = timezone.now()
+    ExecutionJob.objects.filter(id=job.id, status=ExecutionJob.STATUS_RUNNING).update(started_at=job.started_at)
+
+
+def _run_admitted(job: ExecutionJob):
+    # Фоновое задание не отклоняем при перегрузке, а ждём слот: для этого очередь и нужна.
+    # Но не бесконечно — после ADMISSION_MAX_WAIT_S задание завершается ошибкой перегрузки.
+    deadline = time.monotonic() + ADMISSION_MAX_WAIT_S
+    while True:
+        try:
+            return run_code(
+                language=job.language,
+                code=job.code,
+                stdin=job.stdin,
+                compiler=job.compiler or None,
+                profile=job.compile_profile or None,
+                compile_timeout_s=job.compile_timeout_s,
+                run_timeout_s=job.run_timeout_s,
+                memory_mb=job.memory_mb,
+            )
+        except AdmissionRejected as e:
+            if time.monotonic() + e.retry_after > deadline:
+                raise
+            time.sleep(e.retry_after)
+            _heartbeat(job)
+
+
+def execute(job: ExecutionJob) -> ExecutionJob:
+    try:
+        compile_res, run_res = _run_admitted(job)
+    except Exception as e:
+        job.status = ExecutionJob.STATUS_FAILED
+        job.error = f'{type(e).__name__}: {e}'
+    else:
+        job.status = ExecutionJob.STATUS_DONE
+        job.result = run_result_data(compile_res, run_res)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return job
+
+
+def drain(limit: int | None = None) -> int:
+    """
+    Выполняет задания из очереди, пока она не опустеет (или не наберётся limit). Возвращает их число.
+    """
+    done = 0
+    while limit is None or done < limit:
+        job = claim_next()
+        if job is None:
+            break
+        execute(job)
+        done += 1
+    return done
+
+
+def requeue_stale() -> int:
+    """
+    Возвращает в очередь задания, «зависшие» в running из-за падения исполнителя.
+    """
+    requeued = 0
+    now = timezone.now()
+    for job in ExecutionJob.objects.filter(status=ExecutionJob.STATUS_RUNNING, started_at__isnull=False):
+        budget = timedelta(seconds=job.compile_timeout_s + job.run_timeout_s + STALE_GRACE_S)
+        if job.started_at + budget < now:
+            requeued += ExecutionJob.objects.filter(id=job.id, status=ExecutionJob.STATUS_RUNNING).update(
+                status=ExecutionJob.STATUS_QUEUED,
+                started_at=None,
+            )
+    return requeued
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from .artifact_cache import ArtifactCache, cache_key
+
+ARCHIVE_NAME = "classes.jsa"
+
+# Программа для прогрева: типичный для задач набор классов JDK (ввод, коллекции, строки, форматирование).
+# Классы, которые она загрузит, попадают в CDS-архив и дальше не разбираются при старте каждого запуска.
+WARMUP_CLASS = "AlgoCdsWarmup"
+WARMUP_SOURCE = """
+import java.io.*;
+import java.math.BigInteger;
+import java.util.*;
+import java.util.stream.*;
+
+public class AlgoCdsWarmup {
+    public static void main(String[] args) throws IOException {
+        BufferedReader br = new BufferedReader(new InputStreamReader(new ByteArrayInputStream("3 1 2\\n".getBytes())));
+        StringTokenizer st = new StringTokenizer(br.readLine());
+        Scanner sc = new Scanner("4 5\\nword 2.5\\n");
+        int[] a = new int[3];
+        for (int i = 0; i < a.length; i++) a[i] = Integer.parseInt(st.nextToken());
+        Arrays.sort(a);
+        List<Integer> list = new ArrayList<>();
+        while (sc.hasNextInt()) list.add(sc.nextInt());
+        sc.next();
+        double d = sc.nextDouble();
+        Collections.sort(list, Comparator.reverseOrder());
+        Map<String, Integer> map = new HashMap<>();
+        map.put("a", 1);
+        TreeMap<Integer, Long> tree = new TreeMap<>();
+        tree.put(1, 2L);
+        Deque<Integer> deque = new ArrayDeque<>(list);
+        PriorityQueue<long[]> pq = new PriorityQueue<>((x, y) -> Long.compare(x[0], y[0]));
+        pq.add(new long[] {1, 2});
+        Set<String> set = new HashSet<>(map.keySet());
+        LinkedList<Integer> linked = new LinkedList<>(deque);
+        String joined = list.stream().map(String::valueOf).collect(Collectors.joining(" "));
+        int sum = IntStream.of(a).sum();
+        StringBuilder sb = new StringBuilder();
+        sb.append(joined).append(' ').append(sum).append(String.format("%.3f", d));
+        sb.append(new BigInteger("12345678901234567890").multiply(BigInteger.TEN));
+        sb.append(Math.max(tree.firstKey(), pq.peek()[0])).append(set.size()).append(linked.size());
+        PrintWriter out = new PrintWriter(new BufferedWriter(new OutputStreamWriter(new ByteArrayOutputStream())));
+        out.println(sb);
+        out.printf("%d%n", sum);
+        out.flush();
+        System.out.print("");
+    }
+}
+"""
+
+
+def jdk_classlist(text: str) -> str:
+    """
+    Список классов для статического CDS-архива без классов самой программы прогрева:
+    в архиве остаются только классы JDK, поэтому он не привязан к -cp конкретного запуска.
+    """
+    return "".join(line for line in text.splitlines(keepends=True) if WARMUP_CLASS not in line)
+
+
+class JvmTuning:
+    """
+    Флаги JVM для коротких запусков и CDS-архив классов JDK.
+
+    Задачи работают доли секунды, поэтому: только C1 (TieredStopAtLevel=1), SerialGC, небольшой
+    heap, без hsperfdata. Архив (Class Data Sharing) строится один раз на JDK (путь и версия `java`
+    входят в ключ): прогревочная программа снимает список загруженных классов JDK, из него
+    `-Xshare:dump` собирает архив, и дальше JVM отображает эти классы в память вместо разбора
+    и проверки при каждом старте. Сборка идёт в фоне; пока архива нет (или он не подошёл JVM —
+    `-Xshare:auto`), запуск просто идёт без него.
+    """
+
+    NAMESPACE = "jvm-cds"
+    BASE_FLAGS = ["-XX:TieredStopAtLevel=1", "-XX:+UseSerialGC", "-XX:-UsePerfData", "-Xshare:auto"]
+    MIN_HEAP_MB = 32
+
+    def __init__(self, cache: ArtifactCache, enabled: bool, build_timeout_s: int = 120):
+        self.cache = cache
+        self._enabled = enabled
+        self.build_timeout_s = build_timeout_s
+        self._lock = threading.Lock()
+        self._pending: set[str] = set()
+        self._failed: set[str] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled and self.cache.enabled
+
+    @staticmethod
+    def key(java_path: str, version: str) -> str:
+        return cache_key("cds", java_path, version, " ".join(JvmTuning.BASE_FLAGS))
+
+    @classmethod
+    def heap_mb(cls, memory_mb: int) -> int:
+        # Половина лимита — куча, остальное — metaspace, стеки, code cache и сама JVM.
+        return max(cls.MIN_HEAP_MB, int(memory_mb) // 2)
+
+    def flags(
+        self,
+        java_path: str,
+        javac_path: str | None,
+        version: str,
+        memory_mb: int,
+        env: dict[str, str],
+    ) -> list[str]:
+        """
+        Флаги `java` для запуска; без готового архива — без SharedArchiveFile, а сборка архива
+        ставится в фон (нужен javac для прогревочной программы).
+        """
+        flags = [*self.BASE_FLAGS, f"-Xmx{self.heap_mb(memory_mb)}m"]
+        if not self.enabled:
+            return flags
+        key = self.key(java_path, version)
+        hit = self.cache.get(self.NAMESPACE, key)
+        if hit:
+            entry, _meta = hit
+            return [*flags, f"-XX:SharedArchiveFile={os.path.join(entry, ARCHIVE_NAME)}"]
+        if javac_path:
+            self._schedule(key, java_path, javac_path, env)
+        return flags
+
+    def warmup(self, java_path: str, javac_path: str, version: str, env: dict[str, str]) -> None:
+        if not self.enabled:
+            return
+        key = self.key(java_path, version)
+        if self.cache.get(self.NAMESPACE, key) is None:
+            self._schedule(key, java_path, javac_path, env)
+
+    def _schedule(self, key: str, java_path: str, javac_path: str, env: dict[str, str]) -> None:
+        with self._lock:
+            if key in self._pending or key in self._failed:
+                return
+            self._pending.add(key)
+        # Архив строится раз на JDK — отдельный поток-демон на сборку, без очереди.
+        threading.Thread(
+            target=self._build_in_thread,
+            args=(key, java_path, javac_path, env),
+            name="algo-jvm-cds",
+            daemon=True,
+        ).start()
+
+    def _build_in_thread(self, key: str, java_path: str, javac_path: str, env: dict[str, str]) -> None:
+        try:
+            ok = self.build(key, java_path, javac_path, env)
+        except Exception:
+            ok = False
+        with self._lock:
+            self._pending.discard(key)
+            if not ok:
+                self._failed.add(key)
+
+    def _run(self, cmd: list[str], cwd: str, env: dict[str, str]) -> bool:
+        try:
+            proc = subprocess.run(
+                cmd,
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                timeout=self.build_timeout_s,
+                cwd=cwd,
+                env=env,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        return proc.returncode == 0
+
+    def build(self, key: str, java_path: str, javac_path: str, env: dict[str, str]) -> bool:
+        """
+        Синхронная сборка архива и запись в кэш. False — JDK не умеет (старше 10) или сборка упала.
+        """
+        workdir = tempfile.mkdtemp(prefix="algo_cds_")
+        try:
+            src = os.path.join(workdir, f"{WARMUP_CLASS}.java")
+            with open(src, "w", encoding="utf-8", newline="\n") as f:
+                f.write(WARMUP_SOURCE)
+            if not self._run([javac_path, "-d", workdir, src], workdir, env):
+                return False
+
+            raw_list = os.path.join(workdir, "loaded.classlist")
+            if not self._run(
+                [java_path, "-Xshare:off", f"-XX:DumpLoadedClassList={raw_list}", "-cp", workdir, WARMUP_CLASS],
+                workdir,
+                env,
+            ):
+                return False
+            class_list = os.path.join(workdir, "jdk.classlist")
+            with open(raw_list, "r", encoding="utf-8", errors="replace") as f:
+                text = jdk_classlist(f.read())
+            with open(class_list, "w", encoding="utf-8") as f:
+                f.write(text)
+
+            # Без -cp classpath по умолчанию — текущий каталог; он должен быть пуст, иначе JDK
+            # откажется строить архив (или привяжет его к этому classpath).
+            dump_dir = os.path.join(workdir, "dump")
+            os.mkdir(dump_dir)
+            archive = os.path.join(workdir, ARCHIVE_NAME)
+            dump_cmd = [
+                java_path,
+                "-Xshare:dump",
+                "-XX:+UseSerialGC",
+                f"-XX:SharedClassListFile={class_list}",
+                f"-XX:SharedArchiveFile={archive}",
+            ]
+            if not self._run(dump_cmd, dump_dir, env) or not os.path.isfile(archive):
+                return False
+            meta = {"command": dump_cmd, "classes": text.count("\n")}
+            return self.cache.put(self.NAMESPACE, key, {ARCHIVE_NAME: archive}, meta) is not None
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending, failed = len(self._pending), len(self._failed)
+        return {"enabled": self.enabled, "pending": pending, "failed": failed}
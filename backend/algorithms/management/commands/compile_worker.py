@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from algorithms import compile_service
+from algorithms.compile_farm import CompileFarm
+
+
+class Command(BaseCommand):
+    help = 'Ферма компиляции для ALGO_COMPILE_FARM_SOCKET: собирает C++ и Java вместо backend-а'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            default=compile_service.COMPILE_FARM_SOCKET or os.path.join(tempfile.gettempdir(), 'algo_compile_farm.sock'),
+            help='Путь к Unix-сокету (по умолчанию ALGO_COMPILE_FARM_SOCKET)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=compile_service.COMPILE_FARM_WORKERS,
+            help='Сколько компиляций идёт одновременно (по умолчанию по числу ядер)',
+        )
+
+    def handle(self, *args, **options):
+        if not compile_service._ARTIFACT_CACHE.enabled:
+            raise CommandError('Кэш артефактов выключен (ALGO_ARTIFACT_CACHE_MAX_MB=0): ферме некуда класть артефакты')
+        compile_service.warmup_toolchains()
+        try:
+            server = CompileFarm(options['socket'], compile_service.farm_compile, workers=options['workers'])
+        except OSError as e:
+            raise CommandError(f'Не удалось открыть сокет {options["socket"]}: {e}')
+        self.stdout.write(f'Ферма компиляции ({server.workers} потоков) слушает {options["socket"]}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from algorithms import prebuild
+from algorithms.admission import AdmissionRejected
+from algorithms.models import Algorithm
+
+
+class Command(BaseCommand):
+    help = 'Собирает заново артефакты всех одобренных алгоритмов (например, после обновления компилятора)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', nargs='+', type=int, help='Только алгоритмы с этими id')
+
+    def handle(self, *args, **options):
+        algorithms = Algorithm.objects.filter(status=Algorithm.STATUS_APPROVED).order_by('id')
+        if options['ids']:
+            algorithms = algorithms.filter(id__in=options['ids'])
+        built = failed = skipped = deferred = 0
+        for algorithm in algorithms.iterator():
+            try:
+                cr = prebuild.build(algorithm)
+            except AdmissionRejected:
+                deferred += 1
+                self.stdout.write(self.style.WARNING(f'#{algorithm.id} {algorithm.name}: сервер перегружен, сборка отложена'))
+                continue
+            if cr is None:
+                skipped += 1
+            elif cr.compiled:
+                built += 1
+            else:
+                failed += 1
+                first_line = (cr.stderr or '').strip().splitlines()[:1]
+                self.stdout.write(self.style.WARNING(f'#{algorithm.id} {algorithm.name}: {first_line[0] if first_line else "ошибка сборки"}'))
+        self.stdout.write(f'Собрано: {built}, с ошибкой: {failed}, без компиляции: {skipped}, отложено: {deferred}')
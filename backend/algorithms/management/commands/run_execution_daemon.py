@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from algorithms import compile_service
+from algorithms.executors import ExecutionDaemon, make_executor
+
+
+class Command(BaseCommand):
+    help = 'Исполнитель программ для драйвера ALGO_EXECUTOR=remote: принимает запуски через Unix-сокет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            default=compile_service.EXECUTOR_SOCKET,
+            help='Путь к Unix-сокету (по умолчанию ALGO_EXECUTOR_SOCKET)',
+        )
+        parser.add_argument(
+            '--driver',
+            choices=['local', 'namespace'],
+            default='local',
+            help='Как исполнитель запускает программы',
+        )
+
+    def handle(self, *args, **options):
+        executor = make_executor(
+            options['driver'],
+            iter_limited=compile_service._iter_limited,
+            env_factory=compile_service._safe_env,
+        )
+        try:
+            server = ExecutionDaemon(options['socket'], executor)
+        except OSError as e:
+            raise CommandError(f'Не удалось открыть сокет {options["socket"]}: {e}')
+        self.stdout.write(f'Исполнитель ({options["driver"]}) слушает {options["socket"]}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
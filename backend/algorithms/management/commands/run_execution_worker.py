@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from algorithms import jobs
+
+
+class Command(BaseCommand):
+    help = 'Разбирает очередь фоновых запусков кода (ExecutionJob) в отдельном процессе'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Выполнить задания из очереди и выйти')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Пауза между проверками очереди, с')
+
+    def handle(self, *args, **options):
+        poll_interval = max(0.1, options['poll_interval'])
+        while True:
+            requeued = jobs.requeue_stale()
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'Возвращено в очередь зависших заданий: {requeued}'))
+            done = jobs.drain()
+            if done:
+                self.stdout.write(f'Выполнено заданий: {done}')
+            if options['once']:
+                break
+            if not done:
+                time.sleep(poll_interval)
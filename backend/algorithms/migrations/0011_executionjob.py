@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('algorithms', '0010_purchase_price_and_price_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecutionJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('language', models.CharField(max_length=50, verbose_name='Язык')),
+                ('compiler', models.CharField(blank=True, max_length=50, verbose_name='Компилятор')),
+                ('code', models.TextField(verbose_name='Код')),
+                ('stdin', models.TextField(blank=True, verbose_name='Входные данные')),
+                ('compile_timeout_s', models.PositiveIntegerField(default=10, verbose_name='Лимит компиляции, с')),
+                ('run_timeout_s', models.PositiveIntegerField(default=2, verbose_name='Лимит запуска, с')),
+                ('memory_mb', models.PositiveIntegerField(default=256, verbose_name='Лимит памяти, МБ')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='queued', max_length=20, verbose_name='Статус')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Результат')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начато')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+            ],
+            options={
+                'verbose_name': 'Задание на запуск',
+                'verbose_name_plural': 'Задания на запуск',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.RenameIndex(
+            model_name='algorithmpricepoint',
+            new_name='algorithms__algorit_b5f43f_idx',
+            old_name='algorithms__algorit_6a1b8c_idx',
+        ),
+        migrations.AddField(
+            model_name='executionjob',
+            name='algorithm',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='execution_jobs', to='algorithms.algorithm', verbose_name='Алгоритм'),
+        ),
+        migrations.AddField(
+            model_name='executionjob',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='execution_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddIndex(
+            model_name='executionjob',
+            index=models.Index(fields=['status', 'created_at'], name='algorithms__status_fa63a2_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('algorithms', '0011_executionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='algorithm',
+            name='compile_profile',
+            field=models.CharField(choices=[('fast-check', 'Быстрая проверка (-O0)'), ('default', 'По умолчанию (-O2)'), ('optimized', 'Оптимизированная (-O3 -march=native)'), ('sanitizer', 'С санитайзерами (ASan + UBSan)')], default='default', max_length=20, verbose_name='Профиль сборки'),
+        ),
+        migrations.AddField(
+            model_name='executionjob',
+            name='compile_profile',
+            field=models.CharField(choices=[('fast-check', 'Быстрая проверка (-O0)'), ('default', 'По умолчанию (-O2)'), ('optimized', 'Оптимизированная (-O3 -march=native)'), ('sanitizer', 'С санитайзерами (ASan + UBSan)')], default='default', max_length=20, verbose_name='Профиль сборки'),
+        ),
+    ]
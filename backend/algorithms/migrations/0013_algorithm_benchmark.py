@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('algorithms', '0012_compile_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlgorithmBenchmark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code_hash', models.CharField(max_length=64, verbose_name='Хэш кода')),
+                ('language', models.CharField(max_length=50, verbose_name='Язык')),
+                ('compiler', models.CharField(blank=True, max_length=50, verbose_name='Компилятор')),
+                ('compile_profile', models.CharField(choices=[('fast-check', 'Быстрая проверка (-O0)'), ('default', 'По умолчанию (-O2)'), ('optimized', 'Оптимизированная (-O3 -march=native)'), ('sanitizer', 'С санитайзерами (ASan + UBSan)')], default='default', max_length=20, verbose_name='Профиль сборки')),
+                ('repeat', models.PositiveIntegerField(verbose_name='Повторов на вход')),
+                ('complexity', models.CharField(blank=True, max_length=20, verbose_name='Оценка сложности')),
+                ('results', models.JSONField(verbose_name='Замеры')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата замера')),
+                ('algorithm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='benchmarks', to='algorithms.algorithm', verbose_name='Алгоритм')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='algorithm_benchmarks', to=settings.AUTH_USER_MODEL, verbose_name='Запустил')),
+            ],
+            options={
+                'verbose_name': 'Бенчмарк алгоритма',
+                'verbose_name_plural': 'Бенчмарки алгоритмов',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['algorithm', 'code_hash', 'created_at'], name='algorithms__algorit_5591ed_idx')],
+            },
+        ),
+    ]
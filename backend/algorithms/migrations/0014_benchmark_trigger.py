@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('algorithms', '0013_algorithm_benchmark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='algorithmbenchmark',
+            name='trigger',
+            field=models.CharField(choices=[('manual', 'Запуск автора или модератора'), ('approval', 'При одобрении'), ('edit', 'После правки одобренного кода')], default='manual', max_length=20, verbose_name='Повод замера'),
+        ),
+    ]
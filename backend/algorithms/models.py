@@ -1,9 +1,23 @@
+import hashlib
+import uuid
+
 from django.db import models
 from django.db.utils import OperationalError
 from django.contrib.auth import get_user_model
 
+from users.services.roles import is_moderator
+
 User = get_user_model()
 
+# Профили сборки C++ (флаги — compile_service.CPP_PROFILES).
+COMPILE_PROFILE_DEFAULT = 'default'
+COMPILE_PROFILE_CHOICES = [
+    ('fast-check', 'Быстрая проверка (-O0)'),
+    (COMPILE_PROFILE_DEFAULT, 'По умолчанию (-O2)'),
+    ('optimized', 'Оптимизированная (-O3 -march=native)'),
+    ('sanitizer', 'С санитайзерами (ASan + UBSan)'),
+]
+
 class Algorithm(models.Model):
     """
     Модель алгоритма.
@@ -40,6 +54,12 @@ class Algorithm(models.Model):
     price = models.PositiveIntegerField(default=0, verbose_name='Цена, ₽')
     language = models.CharField(max_length=50, default='C++', verbose_name='Язык')
     compiler = models.CharField(max_length=50, default='g++', verbose_name='Компилятор')
+    compile_profile = models.CharField(
+        max_length=20,
+        choices=COMPILE_PROFILE_CHOICES,
+        default=COMPILE_PROFILE_DEFAULT,
+        verbose_name='Профиль сборки',
+    )
 
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
@@ -116,6 +136,13 @@ class Algorithm(models.Model):
             self.moderated_at = None
 
     # ---- Утилиты/свойства ----
+    @property
+    def code_hash(self) -> str:
+        """
+        Версия кода для истории замеров: sha256 исходника.
+        """
+        return hashlib.sha256((self.code or '').encode('utf-8', errors='surrogatepass')).hexdigest()
+
     @property
     def is_pending(self) -> bool:
         return self.status == self.STATUS_PENDING
@@ -191,3 +218,147 @@ class AlgorithmPricePoint(models.Model):
 
     def __str__(self) -> str:
         return f'{self.algorithm_id}: {self.price} ₽ @ {self.recorded_at}'
+
+
+class ExecutionJob(models.Model):
+    """
+    Фоновое задание на компиляцию и запуск кода (очередь в БД, без внешнего брокера).
+    Клиент получает id сразу, а результат забирает через GET /api/algorithms/jobs/<id>/.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Готово'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='execution_jobs',
+        verbose_name='Пользователь',
+    )
+    algorithm = models.ForeignKey(
+        Algorithm,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='execution_jobs',
+        verbose_name='Алгоритм',
+    )
+    language = models.CharField(max_length=50, verbose_name='Язык')
+    compiler = models.CharField(max_length=50, blank=True, verbose_name='Компилятор')
+    compile_profile = models.CharField(
+        max_length=20,
+        choices=COMPILE_PROFILE_CHOICES,
+        default=COMPILE_PROFILE_DEFAULT,
+        verbose_name='Профиль сборки',
+    )
+    code = models.TextField(verbose_name='Код')
+    stdin = models.TextField(blank=True, verbose_name='Входные данные')
+    compile_timeout_s = models.PositiveIntegerField(default=10, verbose_name='Лимит компиляции, с')
+    run_timeout_s = models.PositiveIntegerField(default=2, verbose_name='Лимит запуска, с')
+    memory_mb = models.PositiveIntegerField(default=256, verbose_name='Лимит памяти, МБ')
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED, verbose_name='Статус')
+    result = models.JSONField(null=True, blank=True, verbose_name='Результат')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Начато')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершено')
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Задание на запуск'
+        verbose_name_plural = 'Задания на запуск'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.id} ({self.status})'
+
+    def can_view(self, user) -> bool:
+        """
+        Анонимное задание доступно по id; задание пользователя — только ему и модераторам.
+        """
+        if self.user_id is None:
+            return True
+        if not user or not user.is_authenticated:
+            return False
+        return user.pk == self.user_id or is_moderator(user)
+
+
+class AlgorithmBenchmark(models.Model):
+    """
+    Результат бенчмарка версии алгоритма (версия — хэш кода на момент замера):
+    по каждому входу min/median/p95 времени и пиковая память, оценка сложности.
+    Замеры при одобрении (trigger=approval) — эталон одобренной версии, с ним сравнивается
+    следующая версия кода (см. benchmark_history.compare).
+    """
+
+    TRIGGER_MANUAL = 'manual'
+    TRIGGER_APPROVAL = 'approval'
+    TRIGGER_EDIT = 'edit'
+
+    TRIGGER_CHOICES = [
+        (TRIGGER_MANUAL, 'Запуск автора или модератора'),
+        (TRIGGER_APPROVAL, 'При одобрении'),
+        (TRIGGER_EDIT, 'После правки одобренного кода'),
+    ]
+
+    algorithm = models.ForeignKey(
+        Algorithm,
+        on_delete=models.CASCADE,
+        related_name='benchmarks',
+        verbose_name='Алгоритм',
+    )
+    code_hash = models.CharField(max_length=64, verbose_name='Хэш кода')
+    language = models.CharField(max_length=50, verbose_name='Язык')
+    compiler = models.CharField(max_length=50, blank=True, verbose_name='Компилятор')
+    compile_profile = models.CharField(
+        max_length=20,
+        choices=COMPILE_PROFILE_CHOICES,
+        default=COMPILE_PROFILE_DEFAULT,
+        verbose_name='Профиль сборки',
+    )
+    trigger = models.CharField(
+        max_length=20,
+        choices=TRIGGER_CHOICES,
+        default=TRIGGER_MANUAL,
+        verbose_name='Повод замера',
+    )
+    repeat = models.PositiveIntegerField(verbose_name='Повторов на вход')
+    complexity = models.CharField(max_length=20, blank=True, verbose_name='Оценка сложности')
+    results = models.JSONField(verbose_name='Замеры')
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='algorithm_benchmarks',
+        verbose_name='Запустил',
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата замера')
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Бенчмарк алгоритма'
+        verbose_name_plural = 'Бенчмарки алгоритмов'
+        indexes = [
+            models.Index(fields=['algorithm', 'code_hash', 'created_at']),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.algorithm_id} @ {self.code_hash[:12]}: {self.complexity or "?"}'
+
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import os
+import queue
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+from .artifact_cache import ArtifactCache, cache_key
+
+_INCLUDE_RE = re.compile(r"^#\s*include\s*<([^<>]+)>$")
+_HEADER_NAME_RE = re.compile(r"^[A-Za-z0-9_+\-./]+$")
+_BLOCK_COMMENT_RE = re.compile(r"/\*.*?\*/")
+
+HEADER_NAME = "pch.h"
+
+
+def leading_headers(code: str) -> tuple[str, ...] | None:
+    """
+    Набор системных заголовков (`#include <...>`), с которых начинается исходник, — отсортированный.
+
+    Берём только строки до первой строки, отличной от `#include <...>` (комментарии и пустые
+    строки пропускаем): заголовки из этого блока обрабатываются раньше любого кода и макросов
+    пользователя, поэтому их можно заменить заранее скомпилированным заголовком без изменения
+    смысла. Если исходник начинается с чего-то другого (#define, #pragma, код) — None.
+    """
+    headers: set[str] = set()
+    in_comment = False
+    for raw in (code or "").splitlines():
+        line = raw
+        if in_comment:
+            end = line.find("*/")
+            if end < 0:
+                continue
+            line = line[end + 2:]
+            in_comment = False
+        line = _BLOCK_COMMENT_RE.sub(" ", line)
+        if "/*" in line:
+            line = line.split("/*", 1)[0]
+            in_comment = True
+        line = line.split("//", 1)[0].strip()
+        if not line:
+            continue
+        m = _INCLUDE_RE.match(line)
+        if m is None:
+            break
+        name = m.group(1).strip()
+        if not _HEADER_NAME_RE.match(name) or ".." in name or name.startswith("/"):
+            return None
+        headers.add(name)
+    return tuple(sorted(headers)) or None
+
+
+class PchManager:
+    """
+    Предкомпилированные заголовки (PCH) для C++.
+
+    PCH строится на каждый точный набор ведущих заголовков исходника (см. leading_headers)
+    и ключуется путём/версией компилятора и флагами: g++ применяет `.gch` только при совпадении
+    флагов, а при любом несовпадении молча разбирает заголовки как обычно — результат
+    компиляции от PCH не зависит, меняется только время.
+
+    Сборка идёт в фоне, в одном потоке: запрос, для которого PCH ещё нет, компилируется обычным
+    способом. Набор собирается после min_uses обращений (частые наборы — сразу через warmup()),
+    неудачные сборки запоминаются и не повторяются. Готовые PCH лежат в отдельном ArtifactCache:
+    они крупные (десятки-сотни МБ) и не должны вытеснять бинарники. Подпись записи проверяется
+    в flags_for, а после компиляции — intact(): PCH, изменённый, пока его читал компилятор,
+    означает, что результат компиляции надо выбросить.
+    """
+
+    NAMESPACE = "pch"
+    MAX_TRACKED = 4096
+
+    def __init__(self, cache: ArtifactCache, min_uses: int, build_timeout_s: int, build_memory_mb: int):
+        self.cache = cache
+        self.min_uses = max(1, int(min_uses))
+        self.build_timeout_s = build_timeout_s
+        self.build_memory_mb = build_memory_mb
+        self._lock = threading.Lock()
+        self._uses: OrderedDict[str, int] = OrderedDict()
+        self._pending: set[str] = set()
+        self._failed: OrderedDict[str, None] = OrderedDict()
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache.enabled
+
+    @staticmethod
+    def key(compiler_path: str, version: str, flags: list[str], headers: tuple[str, ...]) -> str:
+        return cache_key("pch", compiler_path, version, " ".join(flags), "\n".join(headers))
+
+    def flags_for(
+        self,
+        code: str,
+        compiler_path: str,
+        version: str,
+        flags: list[str],
+        env: dict[str, str],
+        preexec_factory: Callable[[int, int], Callable[[], None] | None],
+    ) -> list[str]:
+        """
+        Дополнительные аргументы компилятора (`-include <pch.h>`) или [] — если PCH для исходника
+        нет. Отсутствующий PCH ставится в фоновую сборку, когда набор встретился min_uses раз.
+        """
+        if not self.enabled:
+            return []
+        headers = leading_headers(code)
+        if headers is None:
+            return []
+        key = self.key(compiler_path, version, flags, headers)
+        hit = self.cache.get(self.NAMESPACE, key)
+        if hit:
+            entry, _meta = hit
+            return ["-include", os.path.join(entry, HEADER_NAME)]
+
+        with self._lock:
+            uses = self._uses.pop(key, 0) + 1
+            self._uses[key] = uses
+            while len(self._uses) > self.MAX_TRACKED:
+                self._uses.popitem(last=False)
+        if uses >= self.min_uses:
+            self._schedule(key, compiler_path, flags, headers, env, preexec_factory)
+        return []
+
+    def intact(self, pch_flags: list[str]) -> bool:
+        """
+        PCH из flags_for не менялся с проверки подписи: компилятор читал именно проверенный файл.
+        """
+        if not pch_flags:
+            return True
+        return self.cache.intact(os.path.dirname(pch_flags[-1]))
+
+    def warmup(
+        self,
+        header_sets: list[tuple[str, ...]],
+        compiler_path: str,
+        version: str,
+        flags: list[str],
+        env: dict[str, str],
+        preexec_factory: Callable[[int, int], Callable[[], None] | None],
+    ) -> None:
+        """
+        Ставит в фоновую сборку PCH для заданных наборов заголовков (уже собранные пропускаются).
+        """
+        if not self.enabled:
+            return
+        for headers in header_sets:
+            headers = tuple(sorted(headers))
+            key = self.key(compiler_path, version, flags, headers)
+            if self.cache.get(self.NAMESPACE, key) is None:
+                self._schedule(key, compiler_path, flags, headers, env, preexec_factory)
+
+    def _schedule(self, key, compiler_path, flags, headers, env, preexec_factory) -> None:
+        with self._lock:
+            if key in self._pending or key in self._failed:
+                return
+            self._pending.add(key)
+            if self._thread is None or not self._thread.is_alive():
+                # Поток-демон: сборка PCH не должна задерживать завершение процесса
+                # (manage.py-команды, перезапуск воркеров сервера).
+                self._thread = threading.Thread(target=self._worker, name="algo-pch", daemon=True)
+                self._thread.start()
+        self._queue.put((key, compiler_path, list(flags), headers, env, preexec_factory))
+
+    def _worker(self) -> None:
+        while True:
+            key, compiler_path, flags, headers, env, preexec_factory = self._queue.get()
+            try:
+                ok = self.build(key, compiler_path, flags, headers, env, preexec_factory)
+            except Exception:
+                ok = False
+            with self._lock:
+                self._pending.discard(key)
+                if not ok:
+                    self._failed[key] = None
+                    while len(self._failed) > self.MAX_TRACKED:
+                        self._failed.popitem(last=False)
+
+    def build(
+        self,
+        key: str,
+        compiler_path: str,
+        flags: list[str],
+        headers: tuple[str, ...],
+        env: dict[str, str],
+        preexec_factory: Callable[[int, int], Callable[[], None] | None],
+    ) -> bool:
+        """
+        Синхронная сборка одного PCH и запись в кэш. False — компилятор не смог собрать набор
+        (например, такого заголовка нет).
+        """
+        workdir = tempfile.mkdtemp(prefix="algo_pch_")
+        try:
+            header_path = os.path.join(workdir, HEADER_NAME)
+            gch_path = header_path + ".gch"
+            with open(header_path, "w", encoding="utf-8", newline="\n") as f:
+                for name in headers:
+                    f.write(f"#include <{name}>\n")
+            cmd = [compiler_path, *flags, "-x", "c++-header", header_path, "-o", gch_path]
+            try:
+                proc = subprocess.run(
+                    cmd,
+                    capture_output=True,
+                    timeout=self.build_timeout_s,
+                    cwd=workdir,
+                    env=env,
+                    preexec_fn=preexec_factory(self.build_memory_mb, self.build_timeout_s),
+                )
+            except (OSError, subprocess.TimeoutExpired):
+                return False
+            if proc.returncode != 0 or not os.path.isfile(gch_path):
+                return False
+            meta = {"headers": list(headers), "command": cmd}
+            entry = self.cache.put(
+                self.NAMESPACE,
+                key,
+                {HEADER_NAME: header_path, HEADER_NAME + ".gch": gch_path},
+                meta,
+            )
+            return entry is not None
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending, failed = len(self._pending), len(self._failed)
+        return {**self.cache.stats(), "pending": pending, "failed": failed}
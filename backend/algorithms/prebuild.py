@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+
+from .admission import AdmissionRejected
+from .compile_service import CompileResult, prebuild
+from .models import Algorithm
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def _enabled() -> bool:
+    return bool(getattr(settings, 'ALGO_PREBUILD_ON_APPROVAL', True))
+
+
+def build(algorithm: Algorithm) -> CompileResult | None:
+    """
+    Синхронная сборка кода алгоритма с его языком, компилятором и профилем (None — язык без компиляции).
+    """
+    return prebuild(
+        algorithm.language or '',
+        algorithm.code or '',
+        algorithm.compiler or None,
+        algorithm.compile_profile or None,
+    )
+
+
+def schedule(algorithm: Algorithm) -> None:
+    """
+    Ставит фоновую сборку алгоритма после коммита транзакции: к первому публичному запуску
+    артефакт уже лежит в общем кэше. Код берётся на момент вызова, поэтому более поздняя
+    правка не подменит собираемое.
+    """
+    if not _enabled() or not (algorithm.code or '').strip():
+        return
+    snapshot = Algorithm(
+        pk=algorithm.pk,
+        language=algorithm.language,
+        code=algorithm.code,
+        compiler=algorithm.compiler,
+        compile_profile=algorithm.compile_profile,
+    )
+    transaction.on_commit(lambda: _submit(snapshot))
+
+
+def _submit(algorithm: Algorithm) -> None:
+    global _executor
+    with _lock:
+        if _executor is None:
+            # Один поток: предсборка не должна отнимать у запросов больше одного слота компиляции.
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='algo-prebuild')
+    _executor.submit(_build_in_thread, algorithm)
+
+
+def _build_in_thread(algorithm: Algorithm) -> None:
+    try:
+        cr = build(algorithm)
+    except AdmissionRejected:
+        logger.warning('Предсборка алгоритма %s пропущена: сервер перегружен, код соберёт первый запуск', algorithm.pk)
+        return
+    except Exception:
+        logger.exception('Сбой предсборки алгоритма %s', algorithm.pk)
+        return
+    if cr is not None and not cr.compiled:
+        logger.warning('Алгоритм %s не собирается: %s', algorithm.pk, (cr.stderr or '')[:500])
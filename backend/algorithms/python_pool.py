@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import select
+import subprocess
+import threading
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_worker.py")
+
+
+class PythonWorker:
+    """
+    Один прогретый процесс `python -I python_worker.py` и JSON-канал к нему.
+    """
+
+    def __init__(self, python: str, env: dict[str, str]):
+        self.python = python
+        self.jobs = 0
+        self.proc = subprocess.Popen(
+            [python, "-I", WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+        )
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def request(self, job: dict, timeout_s: float) -> dict | None:
+        """
+        Отправляет задание и ждёт ответ не дольше timeout_s. None — воркер сломан/завис.
+        """
+        self.jobs += 1
+        try:
+            self.proc.stdin.write(json.dumps(job).encode("ascii") + b"\n")
+            self.proc.stdin.flush()
+            ready, _w, _x = select.select([self.proc.stdout], [], [], timeout_s)
+            if not ready:
+                return None
+            line = self.proc.stdout.readline()
+        except (OSError, ValueError):
+            return None
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None
+
+    def close(self) -> None:
+        try:
+            self.proc.kill()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+        for stream in (self.proc.stdin, self.proc.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class PythonWorkerPool:
+    """
+    Пул заранее запущенных Python-воркеров.
+
+    Воркер исполняет каждое задание в отдельном fork-нутом процессе с rlimit-ами, поэтому задания
+    изолированы друг от друга, а экономится запуск интерпретатора. Воркер пересоздаётся после
+    max_jobs заданий и после любого нарушения лимитов (таймаут, смерть по сигналу, сбой протокола).
+    Если свободных воркеров нет, run() сразу возвращает None — вызывающий код запускает
+    интерпретатор обычным способом.
+    """
+
+    # Запас на ответ воркера сверх лимита времени самого задания.
+    RESPONSE_GRACE_S = 2.0
+
+    def __init__(self, size: int, max_jobs: int):
+        self.size = size
+        self.max_jobs = max_jobs
+        self._idle: list[PythonWorker] = []
+        self._busy = 0
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0 and os.name != "nt"
+
+    def _spawn(self, python: str, env: dict[str, str]) -> PythonWorker | None:
+        try:
+            return PythonWorker(python, env)
+        except OSError:
+            return None
+
+    def _acquire(self, python: str, env: dict[str, str]) -> PythonWorker | None:
+        with self._lock:
+            if self._busy >= self.size:
+                return None
+            self._busy += 1
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.python == python and worker.alive():
+                    return worker
+                worker.close()
+            # Первое обращение (или после пересоздания): прогреваем весь пул сразу.
+            while len(self._idle) + self._busy < self.size:
+                spare = self._spawn(python, env)
+                if spare is None:
+                    break
+                self._idle.append(spare)
+        worker = self._spawn(python, env)
+        if worker is None:
+            with self._lock:
+                self._busy -= 1
+        return worker
+
+    def _release(self, worker: PythonWorker, recycle: bool, env: dict[str, str]) -> None:
+        if recycle or worker.jobs >= self.max_jobs or not worker.alive():
+            worker.close()
+            # Замену запускаем сразу, чтобы следующий запрос получил уже прогретый процесс.
+            worker = self._spawn(worker.python, env)
+        with self._lock:
+            self._busy -= 1
+            if worker is not None:
+                self._idle.append(worker)
+
+    def run(
+        self,
+        python: str,
+        env: dict[str, str],
+        code: str,
+        stdin: str,
+        timeout_s: int,
+        memory_mb: int,
+        max_bytes: int,
+        max_chars: int,
+    ) -> dict | None:
+        """
+        Ответ воркера: {"compile_error": str} или {"stdout", "stderr", "exit_code", "timed_out",
+        "output_limit_exceeded", "wall_ms", "cpu_ms", "max_rss_kb"}.
+        None — пул выключен, занят или воркер сломался.
+        """
+        if not self.enabled:
+            return None
+        worker = self._acquire(python, env)
+        if worker is None:
+            return None
+
+        job = {
+            "code": code or "",
+            "stdin": stdin or "",
+            "timeout_s": timeout_s,
+            "memory_mb": memory_mb,
+            "max_bytes": max_bytes,
+            "max_chars": max_chars,
+        }
+        reply = worker.request(job, timeout_s=timeout_s + self.RESPONSE_GRACE_S)
+        broken = reply is None or "error" in reply
+        breached = bool(reply) and (reply.get("timed_out") or (reply.get("exit_code") or 0) < 0)
+        self._release(worker, recycle=broken or breached, env=env)
+        return None if broken else reply
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.close()
@@ -0,0 +1,256 @@
+"""
+Тёплый воркер для запуска Python-кода (см. python_pool.py).
+
+Запускается как отдельный процесс `python -I python_worker.py` и использует только stdlib:
+Django и код backend-а сюда не импортируются. Протокол — JSON по строке на stdin/stdout:
+на каждое задание воркер проверяет синтаксис через compile(), затем делает fork, в дочернем
+процессе выставляет те же rlimit-ы, что и `_limit_resources_unix`, и исполняет код в новом
+модуле `__main__` (как runpy для `python main.py`). Интерпретатор уже прогрет, поэтому на запуск
+уходит только fork.
+"""
+import atexit
+import builtins
+import codecs
+import io
+import json
+import os
+import selectors
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+import types
+
+READ_CHUNK = 65536
+
+
+def _apply_limits(memory_mb, cpu_s):
+    try:
+        import resource
+    except Exception:
+        return
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_s, cpu_s))
+    mem_bytes = int(memory_mb) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (mem_bytes, mem_bytes))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (10 * 1024 * 1024, 10 * 1024 * 1024))
+
+
+def _exit_code_from_system_exit(exc):
+    code = exc.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    try:
+        print(code, file=sys.stderr)
+    except Exception:
+        pass
+    return 1
+
+
+def _child(compiled, workdir, stdin_path, out_w, err_w, job):
+    # Отдельная сессия: по таймауту убиваем всю группу, включая возможных потомков.
+    os.setsid()
+    os.chdir(workdir)
+    stdin_fd = os.open(stdin_path, os.O_RDONLY)
+    os.dup2(stdin_fd, 0)
+    os.dup2(out_w, 1)
+    os.dup2(err_w, 2)
+    # Управляющий канал воркера дочернему процессу недоступен.
+    os.closerange(3, 1 << 16)
+    # Лимит CPU с запасом в секунду: по таймауту процесс убивает _collect, а не SIGXCPU,
+    # который иначе приходит одновременно с дедлайном и выглядит как обычный выход с -24.
+    _apply_limits(job["memory_mb"], int(job["timeout_s"]) + 1)
+
+    sys.stdin = io.TextIOWrapper(io.FileIO(0, "r", closefd=False), encoding="utf-8")
+    sys.stdout = io.TextIOWrapper(io.FileIO(1, "w", closefd=False), encoding="utf-8", errors="backslashreplace")
+    sys.stderr = io.TextIOWrapper(
+        io.FileIO(2, "w", closefd=False), encoding="utf-8", errors="backslashreplace", line_buffering=True
+    )
+    sys.argv = ["main.py"]
+
+    # Код исполняется в настоящем модуле __main__, а не в словаре: pickle и multiprocessing
+    # находят пользовательские классы, typing.get_type_hints и dataclasses — глобалы модуля,
+    # `import __main__` отдаёт сам код, а не воркер.
+    main_module = types.ModuleType("__main__")
+    main_module.__file__ = os.path.join(workdir, "main.py")
+    main_module.__builtins__ = builtins
+    main_module.__loader__ = None
+    main_module.__package__ = None
+    main_module.__spec__ = None
+    sys.modules["__main__"] = main_module
+
+    exit_code = 0
+    try:
+        exec(compiled, main_module.__dict__)
+    except SystemExit as exc:
+        exit_code = _exit_code_from_system_exit(exc)
+    except BaseException as exc:  # noqa: B902 — как интерпретатор: печатаем traceback и код 1
+        tb = exc.__traceback__.tb_next if exc.__traceback__ else None
+        traceback.print_exception(type(exc), exc, tb)
+        exit_code = 1
+    try:
+        atexit._run_exitfuncs()
+    except BaseException:
+        pass
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except BaseException:
+            pass
+    os._exit(exit_code & 0xFF)
+
+
+def _char_counter():
+    # Считает символы так же, как их потом увидит backend: UTF-8 с заменой и \r\n -> \n.
+    return io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(errors="replace"), translate=True)
+
+
+def _collect(pid, out_r, err_r, timeout_s, max_bytes, max_chars):
+    """
+    Читает stdout/stderr ребёнка до EOF/таймаута. Сохраняем не больше max_bytes на поток.
+    Как только в потоке больше max_chars символов, группа процессов убивается — дальше
+    программа писала бы в pipe впустую до таймаута.
+    """
+    buffers = {out_r: bytearray(), err_r: bytearray()}
+    counters = {out_r: [_char_counter(), 0], err_r: [_char_counter(), 0]}
+    overflow = False
+    sel = selectors.DefaultSelector()
+    for fd in buffers:
+        sel.register(fd, selectors.EVENT_READ)
+
+    deadline = time.monotonic() + timeout_s
+    status = None
+    usage = None
+    timed_out = False
+    while (sel.get_map() or status is None) and not overflow:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+        if sel.get_map():
+            ready = sel.select(timeout=min(remaining, 0.05))
+        else:
+            # Потоки закрыты, но процесс ещё жив — просто ждём его завершения.
+            time.sleep(min(remaining, 0.01))
+            ready = []
+        for key, _events in ready:
+            chunk = os.read(key.fd, READ_CHUNK)
+            if not chunk:
+                sel.unregister(key.fd)
+                continue
+            buf = buffers[key.fd]
+            if len(buf) < max_bytes:
+                buf.extend(chunk[: max_bytes - len(buf)])
+            counter = counters[key.fd]
+            counter[1] += len(counter[0].decode(chunk))
+            if counter[1] > max_chars:
+                overflow = True
+                break
+        if status is None:
+            waited_pid, waited_status, waited_usage = os.wait4(pid, os.WNOHANG)
+            if waited_pid:
+                status, usage = waited_status, waited_usage
+                # Процесс завершился — потомки, держащие pipe, не должны тянуть ожидание до таймаута.
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+    sel.close()
+
+    if timed_out or overflow:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            pass
+    if status is None:
+        _pid, status, usage = os.wait4(pid, 0)
+
+    if os.WIFSIGNALED(status):
+        exit_code = -os.WTERMSIG(status)
+    else:
+        exit_code = os.WEXITSTATUS(status)
+    return bytes(buffers[out_r]), bytes(buffers[err_r]), exit_code, timed_out, overflow, usage
+
+
+def _scrub(path):
+    for name in os.listdir(path):
+        full = os.path.join(path, name)
+        if os.path.isdir(full) and not os.path.islink(full):
+            shutil.rmtree(full, ignore_errors=True)
+        else:
+            try:
+                os.unlink(full)
+            except OSError:
+                pass
+
+
+def handle(job, base):
+    try:
+        compiled = compile(job["code"], "main.py", "exec", dont_inherit=True)
+    except (SyntaxError, ValueError) as exc:
+        return {"compile_error": "".join(traceback.format_exception_only(type(exc), exc))}
+
+    workdir = os.path.join(base, "work")
+    stdin_path = os.path.join(base, "stdin")
+    _scrub(workdir)
+    # Исходник рядом с кодом, как у запуска через subprocess: его читают inspect, linecache и spawn.
+    with open(os.path.join(workdir, "main.py"), "w", encoding="utf-8", newline="\n") as f:
+        f.write(job["code"])
+    with open(stdin_path, "w", encoding="utf-8", newline="") as f:
+        f.write(job.get("stdin") or "")
+
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    started = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(out_r)
+            os.close(err_r)
+            _child(compiled, workdir, stdin_path, out_w, err_w, job)
+        finally:
+            os._exit(1)
+
+    os.close(out_w)
+    os.close(err_w)
+    try:
+        stdout, stderr, exit_code, timed_out, overflow, usage = _collect(
+            pid, out_r, err_r, job["timeout_s"], job["max_bytes"], job["max_chars"]
+        )
+    finally:
+        os.close(out_r)
+        os.close(err_r)
+    return {
+        "stdout": stdout.decode("utf-8", errors="replace"),
+        "stderr": stderr.decode("utf-8", errors="replace"),
+        "exit_code": exit_code,
+        "timed_out": timed_out,
+        "output_limit_exceeded": overflow,
+        "wall_ms": round((time.monotonic() - started) * 1000, 3),
+        "cpu_ms": round((usage.ru_utime + usage.ru_stime) * 1000, 3),
+        "max_rss_kb": int(usage.ru_maxrss),
+    }
+
+
+def main():
+    control_in = sys.stdin.buffer
+    control_out = sys.stdout.buffer
+    base = tempfile.mkdtemp(prefix="algo_py_worker_")
+    os.mkdir(os.path.join(base, "work"))
+    try:
+        for line in control_in:
+            try:
+                reply = handle(json.loads(line), base)
+            except Exception as exc:
+                reply = {"error": f"{type(exc).__name__}: {exc}"}
+            control_out.write(json.dumps(reply).encode("ascii") + b"\n")
+            control_out.flush()
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
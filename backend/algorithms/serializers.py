@@ -1,5 +1,8 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Algorithm, AlgorithmPurchase
+from . import prebuild
+from .benchmark import fit_complexity
+from .models import Algorithm, AlgorithmBenchmark, AlgorithmPurchase, ExecutionJob
 
 class AlgorithmSerializer(serializers.ModelSerializer):
     # В запросе может приходить из фронта (копия логина), источник истины при create — request.user
@@ -9,6 +12,7 @@ class AlgorithmSerializer(serializers.ModelSerializer):
     can_edit = serializers.SerializerMethodField()
     can_moderate = serializers.SerializerMethodField()
     code_visible = serializers.SerializerMethodField()
+    benchmark = serializers.SerializerMethodField()
 
     class Meta:
         model = Algorithm
@@ -17,12 +21,13 @@ class AlgorithmSerializer(serializers.ModelSerializer):
             'status', 'status_display', 'moderated_by', 'moderated_at',
             'rejection_reason', 'created_at', 'updated_at', 'tags_list',
             'can_edit', 'can_moderate', 'code_visible',
-            'is_paid', 'price', 'language', 'compiler',
+            'is_paid', 'price', 'language', 'compiler', 'compile_profile',
+            'benchmark',
         ]
         read_only_fields = [
             'id', 'moderated_by', 'moderated_at',
             'created_at', 'updated_at', 'status_display', 'tags_list',
-            'can_edit', 'can_moderate', 'code_visible',
+            'can_edit', 'can_moderate', 'code_visible', 'benchmark',
         ]
 
     def validate(self, attrs):
@@ -67,6 +72,20 @@ class AlgorithmSerializer(serializers.ModelSerializer):
         user = getattr(request, 'user', None) if request else None
         return obj.can_view_code(user)
 
+    def get_benchmark(self, obj):
+        """
+        Последний бенчмарк текущей версии кода (для цифр на карточке) или None.
+        Пропущенные фоновые замеры (results.error) не показываются.
+        """
+        prefetched = getattr(obj, 'prefetched_benchmarks', None)
+        if prefetched is not None:
+            # Список: замеры всех алгоритмов страницы пришли одним запросом (with_benchmarks).
+            code_hash = obj.code_hash
+            record = next((r for r in prefetched if r.code_hash == code_hash), None)
+        else:
+            record = obj.benchmarks.filter(code_hash=obj.code_hash).exclude(results__has_key='error').first()
+        return benchmark_record_data(record) if record is not None else None
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
         request = self.context.get('request')
@@ -93,11 +112,21 @@ class AlgorithmSerializer(serializers.ModelSerializer):
         """
         При обновлении — если алгоритм был одобрен/отклонён — сбрасываем модерацию.
         Автора через API менять нельзя.
+        Новый код одобренного алгоритма сразу ставится в фоновую сборку, чтобы к повторному
+        одобрению артефакт уже был в кэше.
         """
         validated_data.pop('author_name', None)
+        was_approved = instance.is_approved
+        build_changed = any(
+            name in validated_data and validated_data[name] != getattr(instance, name)
+            for name in ('code', 'language', 'compiler', 'compile_profile')
+        )
         if instance.status in [Algorithm.STATUS_APPROVED, Algorithm.STATUS_REJECTED]:
             instance.reset_moderation()
-        return super().update(instance, validated_data)
+        instance = super().update(instance, validated_data)
+        if was_approved and build_changed:
+            prebuild.schedule(instance)
+        return instance
 
 
 class AlgorithmPurchaseSerializer(serializers.ModelSerializer):
@@ -107,3 +136,169 @@ class AlgorithmPurchaseSerializer(serializers.ModelSerializer):
         model = AlgorithmPurchase
         fields = ['id', 'purchased_at', 'purchase_price', 'algorithm']
         read_only_fields = ['id', 'purchased_at', 'purchase_price', 'algorithm']
+
+
+def _usage_data(res) -> dict:
+    # Ресурсы процесса: wall/CPU в миллисекундах, пиковый RSS в КиБ (null — не измерялось).
+    return {
+        'wall_time_ms': getattr(res, 'wall_time_ms', None),
+        'cpu_time_ms': getattr(res, 'cpu_time_ms', None),
+        'max_rss_kb': getattr(res, 'max_rss_kb', None),
+    }
+
+
+def run_result_data(compile_res, run_res) -> dict:
+    """
+    Ответ API на запуск кода (общий для синхронного запуска и фоновых заданий).
+    """
+    compiled = bool(compile_res.compiled)
+    return {
+        'compiled': compiled,
+        'ran': bool(run_res.ran) if compiled else False,
+        'stdout': run_res.stdout if compiled else '',
+        'stderr': run_res.stderr if compiled else compile_res.stderr,
+        'compile_exit_code': compile_res.exit_code,
+        'run_exit_code': run_res.exit_code if compiled else None,
+        'output_limit_exceeded': bool(getattr(run_res, 'output_limit_exceeded', False)) if compiled else False,
+        'compile_usage': _usage_data(compile_res),
+        'run_usage': _usage_data(run_res) if compiled else None,
+    }
+
+
+def check_result_data(compile_res, diagnostics) -> dict:
+    """
+    Ответ API на проверку кода без сборки: итог, диагностики компилятора и его вывод целиком.
+    """
+    return {
+        'ok': bool(compile_res.compiled),
+        'diagnostics': [diagnostic.as_dict() for diagnostic in diagnostics],
+        'stderr': compile_res.stderr,
+        'exit_code': compile_res.exit_code,
+        'usage': _usage_data(compile_res),
+    }
+
+
+def stream_event_data(kind: str, payload) -> dict:
+    """
+    Данные события потокового запуска (SSE): чанк вывода, итог компиляции или итог запуска.
+    """
+    if kind in ('stdout', 'stderr'):
+        return {'data': payload}
+    if kind == 'compile':
+        return {
+            'compiled': bool(payload.compiled),
+            'stdout': payload.stdout,
+            'stderr': payload.stderr,
+            'exit_code': payload.exit_code,
+            'usage': _usage_data(payload),
+        }
+    if kind == 'exit':
+        return {
+            'ran': bool(payload.ran),
+            'stderr': payload.stderr,
+            'exit_code': payload.exit_code,
+            'output_limit_exceeded': payload.output_limit_exceeded,
+            'usage': _usage_data(payload),
+        }
+    return {}
+
+
+def batch_result_data(compile_res, case_results) -> dict:
+    """
+    Ответ API на пакетный запуск: одна компиляция и результат по каждому тесту.
+    """
+    cases = [
+        {
+            'index': i,
+            'status': case.status,
+            'passed': case.passed,
+            'stdout': case.stdout,
+            'stderr': case.stderr,
+            'exit_code': case.exit_code,
+            'wall_time_ms': case.wall_time_ms,
+            'cpu_time_ms': case.cpu_time_ms,
+            'max_rss_kb': case.max_rss_kb,
+        }
+        for i, case in enumerate(case_results)
+    ]
+    checked = [case for case in case_results if case.passed is not None]
+    return {
+        'compiled': bool(compile_res.compiled),
+        'compile_stderr': compile_res.stderr,
+        'compile_exit_code': compile_res.exit_code,
+        'cases': cases,
+        'summary': {
+            'total': len(cases),
+            'checked': len(checked),
+            'passed': sum(1 for case in checked if case.passed),
+        },
+    }
+
+
+def benchmark_result_data(compile_res, cases) -> dict:
+    """
+    Ответ API на бенчмарк: замеры по каждому входу и оценка сложности по входам с размером.
+    Сложность подбирается по медиане CPU-времени (меньше зависит от соседних процессов),
+    а если оно не измерялось — по медиане времени по часам.
+    """
+    sized = [case for case in cases if case.size is not None and case.status == 'ok']
+    metric = 'cpu_time_ms' if sized and all(case.cpu_time_ms for case in sized) else 'wall_time_ms'
+    fit = fit_complexity([(case.size, (getattr(case, metric) or {}).get('median')) for case in sized])
+    return {
+        'compiled': bool(compile_res.compiled),
+        'compile_stderr': compile_res.stderr,
+        'compile_exit_code': compile_res.exit_code,
+        'cases': [
+            {
+                'index': i,
+                'size': case.size,
+                'status': case.status,
+                'runs': case.runs,
+                'wall_time_ms': case.wall_time_ms,
+                'cpu_time_ms': case.cpu_time_ms,
+                'max_rss_kb': case.max_rss_kb,
+                'stderr': case.stderr,
+            }
+            for i, case in enumerate(cases)
+        ],
+        'complexity': {**fit, 'metric': metric} if fit is not None else None,
+    }
+
+
+def with_benchmarks(queryset):
+    """
+    Подгружает замеры алгоритмов одним запросом на страницу (поле benchmark без N+1).
+    """
+    return queryset.prefetch_related(
+        Prefetch(
+            'benchmarks',
+            queryset=AlgorithmBenchmark.objects.exclude(results__has_key='error').order_by('-created_at'),
+            to_attr='prefetched_benchmarks',
+        )
+    )
+
+
+def benchmark_record_data(record: AlgorithmBenchmark) -> dict:
+    """
+    Сохранённый бенчмарк версии алгоритма.
+    """
+    return {
+        'id': record.pk,
+        'code_hash': record.code_hash,
+        'language': record.language,
+        'compiler': record.compiler,
+        'compile_profile': record.compile_profile,
+        'trigger': record.trigger,
+        'repeat': record.repeat,
+        'complexity': record.results.get('complexity'),
+        'cases': record.results.get('cases', []),
+        'created_at': record.created_at,
+        'error': record.results.get('error'),
+    }
+
+
+class ExecutionJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExecutionJob
+        fields = ['id', 'status', 'algorithm', 'language', 'created_at', 'started_at', 'finished_at', 'result', 'error']
+        read_only_fields = fields
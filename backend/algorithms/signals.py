@@ -1,6 +1,7 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from . import benchmark_history
 from .models import Algorithm, AlgorithmPricePoint
 
 
@@ -16,3 +17,9 @@ def snapshot_paid_algorithm_price(sender, instance, **kwargs):
     )
     if latest is None or latest.price != instance.price:
         AlgorithmPricePoint.objects.create(algorithm=instance, price=instance.price)
+
+
+@receiver(post_save, sender=Algorithm)
+def benchmark_new_version(sender, instance, **kwargs):
+    """Ставит фоновый замер одобренной версии и правки одобренного алгоритма (benchmark_history.on_saved)."""
+    benchmark_history.on_saved(instance)
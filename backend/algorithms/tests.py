@@ -1,13 +1,42 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.management import call_command
 from django.contrib.auth.models import User, Group
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.urls import reverse
 from django.utils import timezone
-from .models import Algorithm
+from .models import COMPILE_PROFILE_CHOICES, Algorithm, AlgorithmBenchmark, ExecutionJob
 from .serializers import AlgorithmSerializer
 from .views import IsModerator
 from unittest.mock import patch
+from unittest import skipUnless
+import io
+import json
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+from . import compile_service
+from .artifact_cache import ArtifactCache, cache_key
+from .cgroups import CgroupLimiter
+from .compile_farm import CompileFarm, CompileFarmClient
+from .benchmark import compare_runs, complexity_grew, fit_complexity, generate_input, percentile, summarize
+from .compile_memo import CompileMemo
+from .diagnostics import parse_gcc, parse_javac
+from .executors import ExecutionDaemon, Executor, LocalExecutor, NamespaceExecutor, RemoteExecutor
+from .python_pool import PythonWorkerPool
+from .pch import PchManager, leading_headers
+from .jvm import ARCHIVE_NAME, JvmTuning, jdk_classlist
+from .workspace import WorkspacePool
+from .toolchains import ToolchainRegistry
+from .singleflight import SingleFlight
+from . import benchmark_history, jobs, prebuild
+from .admission import AdmissionController, AdmissionRejected
+import threading
+from datetime import timedelta
 
 # ========== МОДУЛЬНЫЕ ТЕСТЫ ==========
 
@@ -846,4 +875,2147 @@ class AlgorithmViewsTests(TestCase):
             data
         )
         
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+# ========== ТЕСТЫ СЕРВИСА КОМПИЛЯЦИИ ==========
+
+class ArtifactCacheTests(TestCase):
+    """Дисковый кэш артефактов сборки"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='algo_cache_test_')
+        self.src_dir = tempfile.mkdtemp(prefix='algo_cache_src_')
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.addCleanup(shutil.rmtree, self.src_dir, True)
+
+    def _artifact(self, name, size):
+        path = os.path.join(self.src_dir, name)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        return path
+
+    def test_cache_key_depends_on_all_parts(self):
+        self.assertEqual(cache_key('a', 'b'), cache_key('a', 'b'))
+        self.assertNotEqual(cache_key('ab', 'c'), cache_key('a', 'bc'))
+
+    def test_put_and_get_roundtrip(self):
+        cache = ArtifactCache(root=self.root, max_bytes=1024 * 1024)
+        entry = cache.put('cpp', 'k' * 64, files={'main': self._artifact('main', 10)}, meta={'stderr': 'warn'})
+        self.assertIsNotNone(entry)
+
+        hit = cache.get('cpp', 'k' * 64)
+        self.assertIsNotNone(hit)
+        path, meta = hit
+        self.assertTrue(os.path.isfile(os.path.join(path, 'main')))
+        self.assertEqual(meta['stderr'], 'warn')
+        self.assertIsNone(cache.get('cpp', 'z' * 64))
+
+    def test_evicts_least_recently_used(self):
+        cache = ArtifactCache(root=self.root, max_bytes=2500, min_age_s=0)
+        old = cache.put('cpp', 'a' * 64, files={'main': self._artifact('a', 1000)}, meta={})
+        past = time.time() - 100
+        os.utime(old, (past, past))
+        cache.put('cpp', 'b' * 64, files={'main': self._artifact('b', 1000)}, meta={})
+        cache.put('cpp', 'c' * 64, files={'main': self._artifact('c', 1000)}, meta={})
+
+        self.assertIsNone(cache.get('cpp', 'a' * 64))
+        self.assertIsNotNone(cache.get('cpp', 'c' * 64))
+
+    def test_evicts_entries_older_than_max_age(self):
+        cache = ArtifactCache(root=self.root, max_bytes=1024 * 1024, max_age_s=3600)
+        stale = cache.put('java', 'a' * 64, files={'Main.class': self._artifact('a', 10)}, meta={})
+        past = time.time() - 7200
+        os.utime(stale, (past, past))
+        cache.put('java', 'b' * 64, files={'Main.class': self._artifact('b', 10)}, meta={})
+        # Устаревшие записи put() убирает только плановым обходом (раз в EVICT_INTERVAL_S).
+        self.assertTrue(os.path.isdir(stale))
+        cache.evict()
+
+        self.assertIsNone(cache.get('java', 'a' * 64))
+        self.assertIsNotNone(cache.get('java', 'b' * 64))
+
+    def test_put_scans_cache_only_when_over_limit(self):
+        cache = ArtifactCache(root=self.root, max_bytes=2500, min_age_s=0)
+        with patch.object(cache, '_entries', wraps=cache._entries) as scans:
+            cache.put('cpp', 'a' * 64, files={'main': self._artifact('a', 1000)}, meta={})
+            cache.put('cpp', 'b' * 64, files={'main': self._artifact('b', 1000)}, meta={})
+            # Первый put узнаёт размер кэша обходом, второй укладывается в лимит по оценке.
+            self.assertEqual(scans.call_count, 1)
+            cache.put('cpp', 'c' * 64, files={'main': self._artifact('c', 1000)}, meta={})
+            self.assertEqual(scans.call_count, 2)
+
+    def test_tampered_entry_is_dropped(self):
+        cache = ArtifactCache(root=self.root, max_bytes=1024 * 1024, secret=b'key')
+        entry = cache.put('cpp', 'a' * 64, files={'main': self._artifact('a', 10)}, meta={})
+        self.assertIsNotNone(cache.get('cpp', 'a' * 64))
+
+        with open(os.path.join(entry, 'main'), 'wb') as f:
+            f.write(b'evil')
+        self.assertIsNone(cache.get('cpp', 'a' * 64))
+        self.assertFalse(os.path.exists(entry))
+
+    def test_planted_files_and_foreign_signature_rejected(self):
+        cache = ArtifactCache(root=self.root, max_bytes=1024 * 1024, secret=b'key')
+        entry = cache.put('java', 'a' * 64, files={'Main.class': self._artifact('a', 10)}, meta={})
+        with open(os.path.join(entry, 'Evil.class'), 'wb') as f:
+            f.write(b'evil')
+        self.assertIsNone(cache.get('java', 'a' * 64))
+
+        # Запись, подписанная другим ключом (или без подписи), не принимается.
+        ArtifactCache(root=self.root, max_bytes=1024 * 1024, secret=b'other').put(
+            'java', 'b' * 64, files={'Main.class': self._artifact('b', 10)}, meta={}
+        )
+        ArtifactCache(root=self.root, max_bytes=1024 * 1024).put(
+            'java', 'c' * 64, files={'Main.class': self._artifact('c', 10)}, meta={}
+        )
+        self.assertIsNone(cache.get('java', 'b' * 64))
+        self.assertIsNone(cache.get('java', 'c' * 64))
+
+    def test_disabled_cache(self):
+        cache = ArtifactCache(root=self.root, max_bytes=0)
+        self.assertIsNone(cache.put('cpp', 'a' * 64, files={'main': self._artifact('a', 1)}, meta={}))
+        self.assertIsNone(cache.get('cpp', 'a' * 64))
+
+
+class JavaClassCacheTests(TestCase):
+    """Кэш .class-файлов: повторная компиляция того же исходника не вызывает javac"""
+
+    def setUp(self):
+        root = tempfile.mkdtemp(prefix='algo_cache_test_')
+        self.addCleanup(shutil.rmtree, root, True)
+        patcher = patch.object(compile_service, '_ARTIFACT_CACHE', ArtifactCache(root=root, max_bytes=64 * 1024 * 1024))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.javac_calls = []
+
+    def _fake_javac(self, cmd, *args, **kwargs):
+        self.javac_calls.append(cmd)
+        for name in ('Main.class', 'Main$Node.class'):
+            with open(os.path.join(kwargs['cwd'], name), 'wb') as f:
+                f.write(b'\xca\xfe\xba\xbe')
+        return compile_service.ProcessOutcome('', '', 0, False, 1.0, 1.0, 1024)
+
+    def test_classes_reused_between_compilations(self):
+        code = 'public class Main { static class Node {} public static void main(String[] a) {} }'
+        with patch.object(compile_service, '_which_or_err', return_value=('/usr/bin/javac', None)), \
+                patch.object(compile_service, '_compiler_version', return_value='javac 17'), \
+                patch.object(compile_service, '_run_process', side_effect=self._fake_javac):
+            first = compile_service.compile_java(code)
+            second = compile_service.compile_java(code)
+
+        self.assertTrue(first.compiled)
+        self.assertTrue(second.compiled)
+        self.assertEqual(len(self.javac_calls), 1)
+        entry, _meta = compile_service._ARTIFACT_CACHE.get('java', cache_key('java', code, '/usr/bin/javac', 'javac 17'))
+        self.assertTrue(os.path.isfile(os.path.join(entry, 'Main$Node.class')))
+
+    def test_javac_runs_with_memory_limit(self):
+        code = 'public class Main { public static void main(String[] a) {} }'
+        with patch.object(compile_service, '_which_or_err', return_value=('/usr/bin/javac', None)), \
+                patch.object(compile_service, '_compiler_version', return_value='javac 17'), \
+                patch.object(compile_service, '_run_process', side_effect=self._fake_javac) as run:
+            self.assertTrue(compile_service.compile_java(code).compiled)
+        heap = JvmTuning.heap_mb(compile_service.JAVAC_MEMORY_MB)
+        self.assertIn(f'-J-Xmx{heap}m', self.javac_calls[0])
+        self.assertEqual(run.call_args.kwargs['memory_mb'], compile_service.JAVAC_MEMORY_MB)
+        # RLIMIT_AS ломает старт JVM: без cgroup память держит -Xmx.
+        self.assertFalse(run.call_args.kwargs['address_space'])
+
+    def test_run_uses_private_copy_of_classes(self):
+        code = 'public class Main { public static void main(String[] a) {} }'
+        compile_service._ARTIFACT_CACHE.secret = b'key'
+        workdir = tempfile.mkdtemp(prefix='algo_java_ws_')
+        self.addCleanup(shutil.rmtree, workdir, True)
+        with patch.object(compile_service, '_which_or_err', return_value=('/usr/bin/javac', None)), \
+                patch.object(compile_service, '_compiler_version', return_value='javac 17'), \
+                patch.object(compile_service, '_run_process', side_effect=self._fake_javac):
+            compile_service.compile_java(code)
+            cr, classpath = compile_service._build_java(code, timeout_s=10, workdir=workdir)
+            self.assertTrue(cr.compiled)
+            self.assertEqual(classpath, os.path.join(workdir, 'classes'))
+            self.assertTrue(os.path.isfile(os.path.join(classpath, 'Main.class')))
+
+            # Подброшенный в общую запись класс: копия не проходит проверку, классы собираются заново.
+            entry, _meta = compile_service._ARTIFACT_CACHE.get('java', cache_key('java', code, '/usr/bin/javac', 'javac 17'))
+            with open(os.path.join(entry, 'Evil.class'), 'wb') as f:
+                f.write(b'evil')
+            cr, classpath = compile_service._build_java(code, timeout_s=10, workdir=workdir)
+        self.assertTrue(cr.compiled)
+        self.assertEqual(len(self.javac_calls), 2)
+        self.assertFalse(os.path.exists(os.path.join(classpath, 'Evil.class')))
+
+
+@skipUnless(shutil.which('g++'), 'g++ не установлен')
+class CppArtifactCacheTests(TestCase):
+    """run_cpp переиспользует скомпилированный бинарник"""
+
+    CODE = '#include <iostream>\nint main(){int a,b;std::cin>>a>>b;std::cout<<a+b;return 0;}\n'
+
+    def setUp(self):
+        root = tempfile.mkdtemp(prefix='algo_cache_test_')
+        self.addCleanup(shutil.rmtree, root, True)
+        patcher = patch.object(compile_service, '_ARTIFACT_CACHE', ArtifactCache(root=root, max_bytes=64 * 1024 * 1024))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_second_run_skips_compilation(self):
+        cr, rr = compile_service.run_cpp(self.CODE, stdin='1 2')
+        self.assertTrue(cr.compiled)
+        self.assertEqual(rr.stdout, '3')
+
+        real_run = compile_service._iter_process
+        calls = []
+
+        def _spy(cmd, *args, **kwargs):
+            calls.append(cmd)
+            return real_run(cmd, *args, **kwargs)
+
+        # Через _iter_process идут и компилятор, и запуск программы драйвером local.
+        with patch.object(compile_service, '_iter_process', side_effect=_spy):
+            cr, rr = compile_service.run_cpp(self.CODE, stdin='40 2')
+
+        self.assertTrue(cr.compiled)
+        self.assertEqual(rr.stdout, '42')
+        self.assertEqual(len(calls), 1)  # только запуск, без g++
+
+    def test_cache_hit_runs_private_copy(self):
+        compile_service._ARTIFACT_CACHE.secret = b'key'
+        self.assertTrue(compile_service.run_cpp(self.CODE, stdin='1 2')[0].compiled)
+        workdir = tempfile.mkdtemp(prefix='algo_cpp_ws_')
+        self.addCleanup(shutil.rmtree, workdir, True)
+        with patch.object(compile_service, '_run_process', side_effect=AssertionError('повторная компиляция')):
+            cr, exe = compile_service._build_cpp(self.CODE, 'g++', timeout_s=10, memory_mb=512, workdir=workdir)
+        self.assertTrue(cr.compiled)
+        # Исполняется копия в рабочем каталоге: подмена общей записи после проверки её не затронет.
+        self.assertEqual(os.path.dirname(exe), os.path.join(workdir, 'bin'))
+        self.assertTrue(os.access(exe, os.X_OK))
+
+    def test_run_reports_resource_usage(self):
+        cr, rr = compile_service.run_cpp(
+            '#include <vector>\nint main(){std::vector<char> v(64 << 20, 1);return v[123] - 1;}\n',
+            stdin='',
+            memory_mb=512,
+        )
+        self.assertTrue(cr.compiled, cr.stderr)
+        self.assertIsNotNone(cr.wall_time_ms)
+        self.assertEqual(rr.exit_code, 0)
+        self.assertGreater(rr.wall_time_ms, 0)
+        self.assertIsNotNone(rr.cpu_time_ms)
+        # 64 МБ вектора видны в пиковом RSS.
+        self.assertGreater(rr.max_rss_kb, 60 * 1024)
+
+    def test_tampered_binary_is_rebuilt(self):
+        compile_service._ARTIFACT_CACHE.secret = b'key'
+        cr, rr = compile_service.run_cpp(self.CODE, stdin='1 2')
+        self.assertEqual(rr.stdout, '3')
+        key = cache_key(
+            'cpp', self.CODE, shutil.which('g++'), compile_service._compiler_version(shutil.which('g++')),
+            ' '.join(compile_service.CPP_FLAGS),
+        )
+        entry, _meta = compile_service._ARTIFACT_CACHE.get('cpp', key)
+        # Подмена бинарника в общем каталоге, как это могла бы сделать чужая программа.
+        exe = os.path.join(entry, 'main')
+        os.remove(exe)
+        with open(exe, 'w') as f:
+            f.write('#!/bin/sh\necho pwned\n')
+        os.chmod(exe, 0o755)
+
+        cr, rr = compile_service.run_cpp(self.CODE, stdin='40 2')
+        self.assertTrue(cr.compiled)
+        self.assertEqual(rr.stdout, '42')
+
+    def test_failed_compilation_is_not_cached(self):
+        cr, _rr = compile_service.run_cpp('int main( {', stdin='')
+        self.assertFalse(cr.compiled)
+        self.assertEqual(compile_service._ARTIFACT_CACHE.stats()['entries'], 0)
+
+
+class PrecompiledHeaderTests(TestCase):
+    """PCH для частых наборов заголовков C++"""
+
+    def setUp(self):
+        root = tempfile.mkdtemp(prefix='algo_pch_test_')
+        self.addCleanup(shutil.rmtree, root, True)
+        self.pch = PchManager(
+            cache=ArtifactCache(root=root, max_bytes=1024 * 1024 * 1024),
+            min_uses=2,
+            build_timeout_s=60,
+            build_memory_mb=1024,
+        )
+
+    def test_leading_headers(self):
+        code = '// решение\n/* автор */\n#include <vector>\n#include<iostream>\nusing namespace std;\n#include <map>\n'
+        self.assertEqual(leading_headers(code), ('iostream', 'vector'))
+        # Макросы до заголовков меняют их смысл — PCH не применяем.
+        self.assertIsNone(leading_headers('#define _GLIBCXX_DEBUG\n#include <vector>\n'))
+        self.assertIsNone(leading_headers('#include "local.h"\n'))
+        self.assertIsNone(leading_headers('#include <../etc/passwd>\n'))
+
+    def test_missing_pch_is_scheduled_after_min_uses(self):
+        code = '#include <vector>\nint main(){}\n'
+        with patch.object(self.pch, '_schedule') as schedule:
+            self.assertEqual(self.pch.flags_for(code, 'g++', '1', ['-O2'], env={}, preexec_factory=lambda m, c: None), [])
+            schedule.assert_not_called()
+            self.pch.flags_for(code, 'g++', '1', ['-O2'], env={}, preexec_factory=lambda m, c: None)
+            schedule.assert_called_once()
+
+    def _signed_pch(self, code):
+        self.pch.cache.secret = b'key'
+        src = tempfile.mkdtemp(prefix='algo_pch_src_')
+        self.addCleanup(shutil.rmtree, src, True)
+        files = {}
+        for name, data in (('pch.h', b'#include <vector>\n'), ('pch.h.gch', b'gch')):
+            files[name] = os.path.join(src, name)
+            with open(files[name], 'wb') as f:
+                f.write(data)
+        key = PchManager.key('g++', '1', ['-O2'], leading_headers(code))
+        entry = self.pch.cache.put(PchManager.NAMESPACE, key, files, {})
+        flags = self.pch.flags_for(code, 'g++', '1', ['-O2'], env={}, preexec_factory=lambda m, c: None)
+        self.assertEqual(flags, ['-include', os.path.join(entry, 'pch.h')])
+        return entry, flags
+
+    def test_planted_pch_is_not_used(self):
+        code = '#include <vector>\nint main(){}\n'
+        entry, _flags = self._signed_pch(code)
+        with open(os.path.join(entry, 'pch.h'), 'a') as f:
+            f.write('#define main evil\n')
+        with patch.object(self.pch, '_schedule'):
+            self.assertEqual(self.pch.flags_for(code, 'g++', '1', ['-O2'], env={}, preexec_factory=lambda m, c: None), [])
+        self.assertFalse(os.path.exists(entry))
+
+    def test_pch_changed_during_compile_is_discarded(self):
+        entry, flags = self._signed_pch('#include <vector>\nint main(){}\n')
+        calls = []
+
+        def _compile(cmd, **kwargs):
+            calls.append(cmd)
+            if len(calls) == 1:
+                with open(os.path.join(entry, 'pch.h.gch'), 'ab') as f:
+                    f.write(b'evil')
+            return compile_service.ProcessOutcome('', '', 0, False, 1.0, 1.0, 1024)
+
+        with patch.object(compile_service, '_PCH', self.pch), \
+                patch.object(compile_service, '_run_process', side_effect=_compile):
+            cmd, _outcome = compile_service._compile_with_pch(
+                lambda pch: ['g++', *pch, 'main.cpp'], flags, timeout_s=5, cwd=entry, memory_mb=256
+            )
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cmd, ['g++', 'main.cpp'])
+
+    @skipUnless(shutil.which('g++'), 'g++ не установлен')
+    def test_compile_uses_built_pch(self):
+        compiler_path = shutil.which('g++')
+        version = compile_service._compiler_version(compiler_path)
+        headers = ('iostream',)
+        key = PchManager.key(compiler_path, version, compile_service.CPP_FLAGS, headers)
+        built = self.pch.build(
+            key, compiler_path, compile_service.CPP_FLAGS, headers, {'PATH': os.environ.get('PATH', '')},
+            compile_service._pch_preexec,
+        )
+        self.assertTrue(built)
+
+        with patch.object(compile_service, '_PCH', self.pch), \
+                patch.object(compile_service, '_ARTIFACT_CACHE', ArtifactCache(root=tempfile.gettempdir(), max_bytes=0)):
+            cr, rr = compile_service.run_cpp('#include <iostream>\nint main(){int a;std::cin>>a;std::cout<<a*2;}\n', stdin='21')
+        self.assertTrue(cr.compiled, cr.stderr)
+        self.assertIn('-include', cr.command)
+        self.assertEqual(rr.stdout, '42')
+
+
+@skipUnless(os.name != 'nt' and shutil.which('python'), 'нужен Unix и python в PATH')
+class PythonWorkerPoolTests(TestCase):
+    """run_python через пул прогретых воркеров"""
+
+    def setUp(self):
+        self.pool = PythonWorkerPool(size=1, max_jobs=3)
+        self.addCleanup(self.pool.close)
+        for patcher in (
+            patch.object(compile_service, '_PY_POOL', self.pool),
+            patch.object(compile_service, '_CGROUPS', CgroupLimiter(root='', cpus=1, pids_max=16)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_pool_not_used_under_cgroup(self):
+        # Потомок воркера не попал бы в cgroup запуска — с cgroup код идёт обычным процессом.
+        root = tempfile.mkdtemp(prefix='algo_cg_test_')
+        self.addCleanup(shutil.rmtree, root, True)
+        with open(os.path.join(root, 'cgroup.controllers'), 'w') as f:
+            f.write('cpu memory pids\n')
+        with open(os.path.join(root, 'cgroup.subtree_control'), 'w') as f:
+            f.write('')
+        with patch.object(compile_service, '_CGROUPS', CgroupLimiter(root=root, cpus=1, pids_max=16)), \
+                patch.object(self.pool, 'run') as pooled:
+            self.assertIsNone(compile_service._run_python_pooled('print(1)', '', 5, 64))
+        pooled.assert_not_called()
+
+    def test_runs_code_with_stdin(self):
+        cr, rr = compile_service.run_python('print(input()[::-1])', stdin='abc\n')
+        self.assertTrue(cr.compiled)
+        self.assertTrue(rr.ran)
+        self.assertEqual(rr.stdout, 'cba\n')
+        self.assertEqual(rr.exit_code, 0)
+        self.assertIsNotNone(rr.cpu_time_ms)
+        self.assertGreater(rr.max_rss_kb, 0)
+
+    def test_syntax_error_reported_as_compile_failure(self):
+        cr, rr = compile_service.run_python('def f(:\n    pass\n')
+        self.assertFalse(cr.compiled)
+        self.assertIn('SyntaxError', cr.stderr)
+        self.assertFalse(rr.ran)
+
+    def test_exception_and_exit_code(self):
+        _cr, rr = compile_service.run_python('raise ValueError("boom")')
+        self.assertEqual(rr.exit_code, 1)
+        self.assertIn('ValueError: boom', rr.stderr)
+
+        _cr, rr = compile_service.run_python('import sys\nsys.exit(3)')
+        self.assertEqual(rr.exit_code, 3)
+
+    def test_code_runs_as_real_main_module(self):
+        code = (
+            'from __future__ import annotations\n'
+            'import __main__, dataclasses, pickle, typing\n'
+            'from multiprocessing import Pool\n'
+            '@dataclasses.dataclass\n'
+            'class Point:\n'
+            '    x: int\n'
+            '    count: typing.ClassVar[int] = 0\n'
+            'def square(n: int) -> int:\n'
+            '    return n * n\n'
+            'print(pickle.loads(pickle.dumps(Point(3))))\n'
+            'print(typing.get_type_hints(square)["n"].__name__)\n'
+            'print([f.name for f in dataclasses.fields(Point)])\n'
+            'print(__main__.square is square, __main__.__file__.endswith("main.py"))\n'
+            'with Pool(2) as pool:\n'
+            '    print(pool.map(square, [1, 2, 3]))\n'
+        )
+        cr, rr = compile_service.run_python(code, memory_mb=512, run_timeout_s=5)
+        self.assertTrue(cr.compiled)
+        self.assertEqual(rr.exit_code, 0, rr.stderr)
+        self.assertEqual(rr.stdout, "Point(x=3)\nint\n['x']\nTrue True\n[1, 4, 9]\n")
+        # Команда — реальный процесс воркера, а не выдуманный запуск main.py.
+        self.assertEqual(cr.command, ['compile', 'main.py'])
+        self.assertTrue(rr.command[-1].endswith('python_worker.py'))
+
+    def test_cpu_limit_leaves_headroom_over_timeout(self):
+        _cr, rr = compile_service.run_python(
+            'import resource\nprint(*resource.getrlimit(resource.RLIMIT_CPU))', run_timeout_s=1
+        )
+        self.assertEqual(rr.stdout.split(), ['2', '2'])
+
+    def test_sigxcpu_exit_is_timeout(self):
+        reply = {'stdout': '', 'stderr': '', 'exit_code': -signal.SIGXCPU, 'wall_ms': 990.0, 'cpu_ms': 990.0}
+        with patch.object(self.pool, 'run', return_value=reply):
+            _cr, rr = compile_service.run_python('while True:\n    pass\n', run_timeout_s=1)
+        self.assertFalse(rr.ran)
+        self.assertIn('лимит времени', rr.stderr)
+
+        outcome = compile_service.ProcessOutcome('', '', -signal.SIGXCPU, False, 990.0, 990.0, 1024)
+        rr = compile_service._run_result(outcome, ['main'], 1)
+        self.assertFalse(rr.ran)
+        self.assertIn('лимит времени', rr.stderr)
+
+    def test_worker_recycled_after_max_jobs(self):
+        pids = set()
+        for _ in range(4):
+            _cr, rr = compile_service.run_python('import os\nprint(os.getppid())')
+            pids.add(rr.stdout.strip())
+        self.assertEqual(len(pids), 2)
+
+    def test_timeout_recycles_worker(self):
+        _cr, first = compile_service.run_python('import os\nprint(os.getppid())')
+        _cr, rr = compile_service.run_python('while True:\n    pass\n', run_timeout_s=1)
+        self.assertFalse(rr.ran)
+        self.assertIn('лимит времени', rr.stderr)
+        # Дедлайн наступает раньше RLIMIT_CPU: процесс останавливает воркер, а не SIGXCPU.
+        self.assertLess(rr.cpu_time_ms, 2000)
+
+        _cr, after = compile_service.run_python('import os\nprint(os.getppid())')
+        self.assertNotEqual(first.stdout, after.stdout)
+
+
+class PythonSyntaxCheckTests(TestCase):
+    """compile_python проверяет синтаксис в процессе, без запуска интерпретатора"""
+
+    def test_valid_code_without_subprocess(self):
+        with patch('algorithms.compile_service.subprocess.run') as mock_run:
+            cr = compile_service.compile_python('print("ok")\n')
+        mock_run.assert_not_called()
+        self.assertTrue(cr.compiled)
+        self.assertEqual(cr.exit_code, 0)
+
+    def test_syntax_error_has_line_and_caret(self):
+        cr = compile_service.compile_code('python', 'x = 1\ndef f(:\n    pass\n')
+        self.assertFalse(cr.compiled)
+        self.assertIn('line 2', cr.stderr)
+        self.assertIn('^', cr.stderr)
+        self.assertIn('SyntaxError', cr.stderr)
+
+    def test_result_cached_by_source(self):
+        code = 'print("cached")  # test_result_cached_by_source\n'
+        first = compile_service.compile_python(code)
+        with patch.object(compile_service, '_python_syntax_error') as mock_check:
+            second = compile_service.compile_python(code)
+        mock_check.assert_not_called()
+        self.assertIs(first, second)
+
+    def test_oversized_source_rejected(self):
+        cr = compile_service.compile_python('#' * (compile_service.MAX_SOURCE_CHARS + 1))
+        self.assertFalse(cr.compiled)
+        self.assertIn('слишком большой', cr.stderr)
+
+    def test_pathological_source_rejected_before_compile(self):
+        nested = 'x = ' + '(' * 150 + '1' + ')' * 150 + '\n'
+        long_line = 'x = ' + '+'.join(['1'] * 6000) + '\n'
+        with patch.object(compile_service, '_python_syntax_error') as mock_check:
+            cr, diagnostics = compile_service.check_python(nested)
+            self.assertFalse(cr.compiled)
+            self.assertIn('вложенность', cr.stderr)
+            self.assertEqual(diagnostics[0].severity, 'error')
+            cr = compile_service.compile_python(long_line)
+            self.assertIn('слишком длинная', cr.stderr)
+        mock_check.assert_not_called()
+        # Скобки в строках и комментариях не считаются.
+        self.assertTrue(compile_service.compile_python('s = "' + '(' * 150 + '"  # ' + '[' * 150 + '\n').compiled)
+
+    def test_busy_syntax_workers_reject_instead_of_queueing(self):
+        release = threading.Event()
+
+        def _stuck(code):
+            release.wait(5)
+            return None
+
+        self.addCleanup(release.set)
+        with patch.object(compile_service, '_python_syntax_error', side_effect=_stuck):
+            for i in range(compile_service.SYNTAX_WORKERS):
+                cr = compile_service.compile_python(f'x = {i}  # test_busy_syntax_workers\n', timeout_s=0.05)
+                self.assertIn('превысила лимит', cr.stderr)
+            started = time.monotonic()
+            cr = compile_service.compile_python('x = -1  # test_busy_syntax_workers\n', timeout_s=5)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertFalse(cr.compiled)
+        self.assertIn('повторите позже', cr.stderr)
+        # Дожидаемся, пока зависшие проверки освободят потоки, чтобы не мешать следующим тестам.
+        release.set()
+        for _ in range(compile_service.SYNTAX_WORKERS):
+            self.assertTrue(compile_service._SYNTAX_SLOTS.acquire(timeout=5))
+        for _ in range(compile_service.SYNTAX_WORKERS):
+            compile_service._SYNTAX_SLOTS.release()
+
+
+class ExecutionJobTests(TestCase):
+    """Фоновые запуски: submit -> очередь -> исполнитель -> GET результата"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='job_user', password='pass12345')
+        self.other = User.objects.create_user(username='job_other', password='pass12345')
+        self.ok = (
+            compile_service.CompileResult(True, '', '', 0, ['g++']),
+            compile_service.RunResult(True, 'ok\n', '', 0, ['./main']),
+        )
+
+    def _submit(self, **extra):
+        data = {'language': 'C++', 'code': 'int main(){}', 'stdin': '', 'async': True}
+        data.update(extra)
+        with patch('algorithms.views.run_code') as sync_run:
+            resp = self.client.post(reverse('algorithm_run_snippet'), data=data, format='json')
+        sync_run.assert_not_called()
+        return resp
+
+    def test_submit_returns_job_id_immediately(self):
+        resp = self._submit()
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(resp.data['status'], ExecutionJob.STATUS_QUEUED)
+        self.assertTrue(ExecutionJob.objects.filter(pk=resp.data['id']).exists())
+
+    def test_drain_executes_and_result_is_polled(self):
+        job_id = self._submit().data['id']
+        with patch('algorithms.jobs.run_code', return_value=self.ok) as mock_run:
+            self.assertEqual(jobs.drain(), 1)
+        mock_run.assert_called_once()
+
+        resp = self.client.get(reverse('execution_job_detail', kwargs={'job_id': job_id}))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['status'], ExecutionJob.STATUS_DONE)
+        self.assertEqual(resp.data['result']['stdout'], 'ok\n')
+        self.assertTrue(resp.data['result']['compiled'])
+
+    def test_failed_execution_marks_job_failed(self):
+        job_id = self._submit().data['id']
+        with patch('algorithms.jobs.run_code', side_effect=RuntimeError('boom')):
+            jobs.drain()
+        job = ExecutionJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, ExecutionJob.STATUS_FAILED)
+        self.assertIn('boom', job.error)
+
+    def test_job_of_user_hidden_from_others(self):
+        self.client.force_authenticate(user=self.user)
+        job_id = self._submit().data['id']
+
+        self.client.force_authenticate(user=self.other)
+        resp = self.client.get(reverse('execution_job_detail', kwargs={'job_id': job_id}))
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stale_running_job_requeued(self):
+        job = ExecutionJob.objects.create(language='C++', code='int main(){}', status=ExecutionJob.STATUS_RUNNING)
+        ExecutionJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExecutionJob.STATUS_QUEUED)
+
+    def test_waiting_for_admission_refreshes_heartbeat(self):
+        job = ExecutionJob.objects.create(language='C++', code='int main(){}')
+        claimed = jobs.claim_next()
+        ExecutionJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        claimed.refresh_from_db()
+        attempts = []
+
+        def _busy(**kwargs):
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise AdmissionRejected('busy', retry_after=0)
+            # Пока задание ждало слот, оно не считается зависшим.
+            self.assertEqual(jobs.requeue_stale(), 0)
+            return self.ok
+
+        with patch('algorithms.jobs.run_code', side_effect=_busy):
+            jobs.execute(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExecutionJob.STATUS_DONE)
+        self.assertEqual(len(attempts), 3)
+
+    def test_admission_wait_is_bounded(self):
+        job = ExecutionJob.objects.create(language='C++', code='int main(){}')
+        claimed = jobs.claim_next()
+        with patch.object(jobs, 'ADMISSION_MAX_WAIT_S', 0), \
+                patch('algorithms.jobs.run_code', side_effect=AdmissionRejected('busy', retry_after=1)) as mock_run, \
+                patch('algorithms.jobs.time.sleep') as mock_sleep:
+            jobs.execute(claimed)
+        mock_run.assert_called_once()
+        mock_sleep.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExecutionJob.STATUS_FAILED)
+        self.assertIn('AdmissionRejected', job.error)
+
+    def test_drainer_requeues_jobs_of_dead_process(self):
+        job = ExecutionJob.objects.create(language='C++', code='int main(){}', status=ExecutionJob.STATUS_RUNNING)
+        ExecutionJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        with patch('algorithms.jobs.run_code', return_value=self.ok), \
+                patch('algorithms.jobs.close_old_connections'), \
+                patch('algorithms.jobs.connection.close'):
+            jobs._drainers += 1
+            jobs._drain_in_thread()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExecutionJob.STATUS_DONE)
+
+
+class AdmissionControlTests(TestCase):
+    """Ограничение одновременных компиляций/запусков"""
+
+    def _controller(self, **kwargs):
+        root = tempfile.mkdtemp(prefix='algo_admission_test_')
+        self.addCleanup(shutil.rmtree, root, True)
+        params = {'root': root, 'slots': {}, 'default_slots': 1, 'queue_size': 0, 'max_wait_s': 0.2}
+        params.update(kwargs)
+        return AdmissionController(**params)
+
+    def test_rejects_immediately_when_queue_full(self):
+        controller = self._controller()
+        with controller.slot('cpp'):
+            with self.assertRaises(AdmissionRejected) as ctx:
+                with controller.slot('cpp'):
+                    pass
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+        # слот освобождён
+        with controller.slot('cpp'):
+            pass
+
+    def test_languages_have_separate_slots(self):
+        controller = self._controller(slots={'java': 1})
+        with controller.slot('cpp'):
+            with controller.slot('java'):
+                pass
+
+    def test_waiting_request_gets_freed_slot(self):
+        controller = self._controller(queue_size=1, max_wait_s=5)
+        holding = threading.Event()
+        release = threading.Event()
+
+        def _hold():
+            with controller.slot('cpp'):
+                holding.set()
+                release.wait(5)
+
+        t = threading.Thread(target=_hold)
+        t.start()
+        holding.wait(5)
+        threading.Timer(0.1, release.set).start()
+        with controller.slot('cpp'):
+            pass
+        t.join(5)
+
+    def test_wait_times_out(self):
+        controller = self._controller(queue_size=1, max_wait_s=0.1)
+        with controller.slot('cpp'):
+            with self.assertRaises(AdmissionRejected):
+                with controller.slot('cpp'):
+                    pass
+
+    def test_extra_slots_take_only_free_ones(self):
+        controller = self._controller(default_slots=3)
+        with controller.slot('cpp'):
+            with controller.extra_slots('cpp', 5) as extra:
+                self.assertEqual(extra, 2)
+                with controller.extra_slots('cpp', 1) as none_left:
+                    self.assertEqual(none_left, 0)
+            with controller.extra_slots('cpp', 1) as again:
+                self.assertEqual(again, 1)
+        with self._controller(default_slots=0).extra_slots('cpp', 4) as unlimited:
+            self.assertEqual(unlimited, 4)
+
+    def test_run_endpoint_returns_503_with_retry_after(self):
+        client = APIClient()
+        with patch('algorithms.views.run_code', side_effect=AdmissionRejected('busy', 7)):
+            resp = client.post(
+                reverse('algorithm_run_snippet'),
+                data={'language': 'C++', 'code': 'int main(){}'},
+                format='json',
+            )
+        self.assertEqual(resp.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(resp['Retry-After'], '7')
+
+
+class BatchRunTests(TestCase):
+    """Пакетный запуск: одна компиляция, много тестов"""
+
+    def test_endpoint_validates_cases(self):
+        client = APIClient()
+        url = reverse('algorithm_run_snippet_batch')
+        resp = client.post(url, data={'language': 'Python', 'code': 'print(1)', 'cases': []}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        too_many = [{'stdin': ''}] * (compile_service.MAX_BATCH_CASES + 1)
+        resp = client.post(url, data={'language': 'Python', 'code': 'print(1)', 'cases': too_many}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_endpoint_returns_case_verdicts(self):
+        client = APIClient()
+        cases = [
+            compile_service.CaseResult('ok', True, '3\n', '', 0, 1.5, 1.0, 1024),
+            compile_service.CaseResult('wrong_answer', False, '4\n', '', 0, 1.5, 1.0, 1024),
+        ]
+        compiled = compile_service.CompileResult(True, '', '', 0, [])
+        with patch('algorithms.views.run_code_batch', return_value=(compiled, cases)) as mock_batch:
+            resp = client.post(
+                reverse('algorithm_run_snippet_batch'),
+                data={
+                    'language': 'C++',
+                    'code': 'int main(){}',
+                    'cases': [{'stdin': '1 2', 'expected': '3'}, {'stdin': '2 2', 'expected': '5'}],
+                },
+                format='json',
+            )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_batch.call_count, 1)
+        self.assertEqual([c['status'] for c in resp.data['cases']], ['ok', 'wrong_answer'])
+        self.assertEqual(resp.data['summary'], {'total': 2, 'checked': 2, 'passed': 1})
+
+    @skipUnless(shutil.which('g++'), 'g++ не установлен')
+    def test_cpp_compiles_once_for_all_cases(self):
+        root = tempfile.mkdtemp(prefix='algo_cache_test_')
+        self.addCleanup(shutil.rmtree, root, True)
+        code = '#include <iostream>\nint main(){int a,b;std::cin>>a>>b;std::cout<<a+b;return a<0?3:0;}\n'
+        with patch.object(compile_service, '_ARTIFACT_CACHE', ArtifactCache(root=root, max_bytes=64 * 1024 * 1024)):
+            cr, results = compile_service.run_code_batch(
+                'cpp',
+                code,
+                [
+                    {'stdin': '1 2', 'expected': '3'},
+                    {'stdin': '2 2', 'expected': '5'},
+                    {'stdin': '-1 0'},
+                ],
+            )
+            self.assertTrue(cr.compiled)
+            self.assertEqual(compile_service._ARTIFACT_CACHE.stats()['entries'], 1)
+        self.assertEqual([r.status for r in results], ['ok', 'wrong_answer', 'runtime_error'])
+        self.assertEqual([r.passed for r in results], [True, False, None])
+        self.assertEqual(results[2].exit_code, 3)
+
+    def test_parallel_cases_limited_by_admission_slots(self):
+        root = tempfile.mkdtemp(prefix='algo_admission_test_')
+        self.addCleanup(shutil.rmtree, root, True)
+        controller = AdmissionController(root=root, slots={}, default_slots=2, queue_size=0, max_wait_s=0.2)
+        lock = threading.Lock()
+        running, peak = [0], [0]
+
+        def _case(*args, **kwargs):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return compile_service.CaseResult('ok', None, '', '', 0, 1.0, 1.0, 1024)
+
+        compiled = compile_service.CompileResult(True, '', '', 0, [])
+        with patch.object(compile_service, '_ADMISSION', controller), \
+                patch.object(compile_service, 'BATCH_WORKERS', 8), \
+                patch.object(compile_service, '_prepare_runnable', return_value=(compiled, ['prog'])), \
+                patch.object(compile_service, '_run_case', side_effect=_case):
+            _cr, results = compile_service.run_code_batch('python', 'print(1)', [{'stdin': ''}] * 6)
+        self.assertEqual(len(results), 6)
+        self.assertEqual(peak[0], 2)
+
+    def test_output_comparison_ignores_trailing_whitespace(self):
+        self.assertTrue(compile_service._outputs_match('1 2 \n3\n\n', '1 2\n3'))
+        self.assertFalse(compile_service._outputs_match('1 2\n', '1  2'))
+
+
+class StreamingRunTests(TestCase):
+    """Потоковый запуск: вывод отдаётся событиями SSE по мере появления"""
+
+    def _events(self, resp):
+        body = b''.join(resp.streaming_content).decode('utf-8')
+        events = []
+        for block in body.strip().split('\n\n'):
+            kind, data = block.split('\n', 1)
+            events.append((kind[len('event: '):], json.loads(data[len('data: '):])))
+        return events
+
+    def test_output_streamed_as_events(self):
+        client = APIClient()
+        code = 'import sys\nprint("a", flush=True)\nsys.stderr.write("oops")\nprint("b")\nsys.exit(3)\n'
+        resp = client.post(
+            reverse('algorithm_run_snippet'),
+            data={'language': 'Python', 'code': code, 'stream': True},
+            format='json',
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertTrue(resp['Content-Type'].startswith('text/event-stream'))
+        events = self._events(resp)
+        kinds = [kind for kind, _data in events]
+        self.assertEqual(kinds[:2], ['start', 'compile'])
+        self.assertEqual(kinds[-1], 'exit')
+        self.assertTrue(events[1][1]['compiled'])
+        stdout = ''.join(data['data'] for kind, data in events if kind == 'stdout')
+        stderr = ''.join(data['data'] for kind, data in events if kind == 'stderr')
+        self.assertEqual(stdout, 'a\nb\n')
+        self.assertEqual(stderr, 'oops')
+        self.assertEqual(events[-1][1]['exit_code'], 3)
+
+    def test_output_capped_on_the_fly(self):
+        with patch.object(compile_service, 'MAX_OUTPUT_CHARS', 100):
+            events = list(compile_service.stream_code('python', 'for i in range(100000):\n    print(i)\n'))
+        stdout = ''.join(payload for kind, payload in events if kind == 'stdout')
+        self.assertLessEqual(len(stdout), 100 + len('\n...<truncated>...'))
+        self.assertTrue(stdout.endswith('...<truncated>...'))
+        self.assertTrue(events[-1][1].output_limit_exceeded)
+
+    def test_overload_rejected_before_stream_starts(self):
+        def _rejected(**kwargs):
+            raise AdmissionRejected('busy', 3)
+            yield  # генератор, как stream_code: исключение — на первом next()
+
+        client = APIClient()
+        with patch('algorithms.views.stream_code', _rejected):
+            resp = client.post(
+                reverse('algorithm_run_snippet'),
+                data={'language': 'Python', 'code': 'print(1)', 'stream': True},
+                format='json',
+            )
+        self.assertEqual(resp.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class OutputLimitTests(TestCase):
+    """Программа, печатающая без остановки, убивается сразу по превышении лимита вывода"""
+
+    FLOOD = 'while True:\n    print("x" * 100)\n'
+
+    def _assert_stopped_early(self, rr, started):
+        self.assertTrue(rr.output_limit_exceeded)
+        self.assertFalse(rr.ran)
+        self.assertIsNone(rr.exit_code)
+        self.assertTrue(rr.stdout.endswith('...<truncated>...'))
+        self.assertIn('Превышен лимит вывода', rr.stderr)
+        # Не ждём таймаута в 5 секунд.
+        self.assertLess(time.monotonic() - started, 3)
+
+    def test_subprocess_run_killed_on_overflow(self):
+        with patch.object(compile_service._PY_POOL, 'size', 0):
+            started = time.monotonic()
+            _cr, rr = compile_service.run_python(self.FLOOD, run_timeout_s=5)
+        self._assert_stopped_early(rr, started)
+
+    @skipUnless(os.name != 'nt', 'пул воркеров только на Unix')
+    def test_pooled_run_killed_on_overflow(self):
+        pool = PythonWorkerPool(size=1, max_jobs=10)
+        self.addCleanup(pool.close)
+        with patch.object(compile_service, '_PY_POOL', pool):
+            started = time.monotonic()
+            _cr, rr = compile_service.run_python(self.FLOOD, run_timeout_s=5)
+        self._assert_stopped_early(rr, started)
+
+    def test_batch_case_verdict(self):
+        _cr, results = compile_service.run_code_batch('python', self.FLOOD, [{'stdin': '', 'expected': 'x'}], run_timeout_s=5)
+        self.assertEqual(results[0].status, 'output_limit')
+        self.assertFalse(results[0].passed)
+
+
+class WorkspacePoolTests(TestCase):
+    """Пул рабочих каталогов: очистка, переиспользование, отбраковка"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='algo_ws_test_')
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def test_workspace_scrubbed_and_reused(self):
+        pool = WorkspacePool(root=self.root, size=1)
+        with pool.workspace() as first:
+            os.makedirs(os.path.join(first, 'a', 'b'))
+            with open(os.path.join(first, 'a', 'b', 'f.txt'), 'w') as f:
+                f.write('x')
+            # Программа могла снять права — очистка всё равно должна пройти.
+            os.chmod(os.path.join(first, 'a', 'b'), 0)
+            os.chmod(os.path.join(first, 'a'), 0o500)
+        with pool.workspace() as second:
+            self.assertEqual(first, second)
+            self.assertEqual(os.listdir(second), [])
+        self.assertEqual(pool.stats()['discarded'], 0)
+
+    def test_idle_count_capped(self):
+        pool = WorkspacePool(root=self.root, size=1)
+        with pool.workspace() as first, pool.workspace() as second:
+            self.assertNotEqual(first, second)
+        self.assertEqual(pool.stats()['idle'], 1)
+        self.assertEqual(len(os.listdir(self.root)), 1)
+
+    def test_broken_workspace_discarded(self):
+        pool = WorkspacePool(root=self.root, size=2)
+        with pool.workspace() as path:
+            os.rmdir(path)
+            with open(path, 'w') as f:
+                f.write('not a directory')
+        self.assertEqual(pool.stats()['discarded'], 1)
+        self.assertFalse(os.path.exists(path))
+
+    @skipUnless(os.name != 'nt', 'группы процессов только на Unix')
+    def test_descendants_do_not_outlive_run(self):
+        marker = os.path.join(self.root, 'marker')
+        code = (
+            'import os, sys, time\n'
+            'path = sys.stdin.readline().strip()\n'
+            'if os.fork() == 0:\n'
+            '    os.close(1); os.close(2)\n'
+            '    time.sleep(0.5)\n'
+            '    open(path, "w").close()\n'
+            '    os._exit(0)\n'
+            'print("done")\n'
+        )
+        with patch.object(compile_service._PY_POOL, 'size', 0):
+            _cr, rr = compile_service.run_python(code, stdin=marker + '\n')
+        self.assertEqual(rr.stdout, 'done\n')
+        time.sleep(1)
+        self.assertFalse(os.path.exists(marker))
+
+
+class ToolchainRegistryTests(TestCase):
+    """Реестр тулчейнов: однократный опрос, обновление, отказ для неизвестных имён"""
+
+    def _registry(self, refresh_s=0):
+        registry = ToolchainRegistry(refresh_s=refresh_s)
+        paths = {'g++': '/usr/bin/g++', 'python': '/usr/bin/python'}
+        which = patch.object(registry, '_which', side_effect=lambda name: paths.get(name))
+        version = patch.object(registry, '_version', return_value='v1')
+        caps = patch.object(registry, '_capabilities', return_value=('c++17',))
+        self.which = which.start()
+        version.start()
+        caps.start()
+        self.addCleanup(patch.stopall)
+        return registry
+
+    def test_probed_once(self):
+        registry = self._registry()
+        self.assertEqual(registry.get('g++').path, '/usr/bin/g++')
+        self.assertFalse(registry.get('javac').available)
+        registry.get('python')
+        self.assertEqual(registry.stats()['probes'], 1)
+        self.assertEqual(self.which.call_count, len(ToolchainRegistry.KNOWN))
+
+    def test_unknown_name_not_looked_up(self):
+        registry = self._registry()
+        self.assertIsNone(registry.get('/bin/sh'))
+        self.assertEqual(self.which.call_count, 0)
+
+    def test_invalidate_and_interval_refresh(self):
+        registry = self._registry(refresh_s=60)
+        registry.get('g++')
+        registry.invalidate()
+        registry.get('g++')
+        registry._refresh_thread.join(5)
+        self.assertEqual(registry.stats()['probes'], 2)
+        registry._probed_at -= 61
+        registry.get('g++')
+        registry._refresh_thread.join(5)
+        self.assertEqual(registry.stats()['probes'], 3)
+
+    def test_stale_registry_refreshed_in_background(self):
+        registry = self._registry(refresh_s=60)
+        registry.get('g++')
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self.which.side_effect = lambda name: release.wait(5) and None
+        registry.invalidate()
+
+        started = time.monotonic()
+        # Запрос не ждёт опроса и получает прежний путь; второй опрос параллельно не запускается.
+        self.assertEqual(registry.get('g++').path, '/usr/bin/g++')
+        self.assertEqual(registry.get('g++').path, '/usr/bin/g++')
+        self.assertLess(time.monotonic() - started, 1)
+        release.set()
+        registry._refresh_thread.join(5)
+        self.assertEqual(registry.stats()['probes'], 2)
+        self.assertFalse(registry.get('g++').available)
+
+    def test_compile_rejects_unregistered_compiler(self):
+        cr = compile_service.compile_cpp('int main(){}', compiler='/bin/sh')
+        self.assertFalse(cr.compiled)
+        self.assertIn('не поддерживается', cr.stderr)
+        cr = compile_service.compile_cpp('int main(){}', compiler='python')
+        self.assertFalse(cr.compiled)
+        self.assertIn('не поддерживается', cr.stderr)
+
+    def test_toolchains_endpoint(self):
+        resp = APIClient().get(reverse('toolchain_list'))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        names = {item['name'] for item in resp.data}
+        self.assertEqual(names, set(ToolchainRegistry.KNOWN))
+        self.assertTrue(all('path' not in item for item in resp.data))
+        python = next(item for item in resp.data if item['name'] == 'python')
+        self.assertEqual(python['available'], bool(shutil.which('python')))
+
+
+class CompileMemoTests(TestCase):
+    """Память неудачных компиляций: повторная попытка не запускает компилятор"""
+
+    def setUp(self):
+        patcher = patch.object(compile_service, '_COMPILE_MEMO', CompileMemo(ttl_s=60, max_entries=8))
+        self.memo = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_ttl_and_counters(self):
+        memo = CompileMemo(ttl_s=60, max_entries=1)
+        self.assertIsNone(memo.get('a'))
+        memo.put('a', 1)
+        self.assertEqual(memo.get('a'), 1)
+        memo.put('b', 2)
+        self.assertIsNone(memo.get('a'))
+        with patch('algorithms.compile_memo.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(memo.get('b'))
+        stats = memo.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 3, 0))
+
+    @skipUnless(shutil.which('g++'), 'g++ не установлен')
+    def test_failed_cpp_compilation_memoized(self):
+        first = compile_service.compile_cpp('int main( {')
+        self.assertFalse(first.compiled)
+        with patch.object(compile_service, '_run_process') as run:
+            second = compile_service.compile_cpp('int main( {')
+        run.assert_not_called()
+        self.assertEqual(second.stderr, first.stderr)
+        self.assertFalse(second.compiled)
+        self.assertIsNone(second.wall_time_ms)
+        self.assertEqual(self.memo.stats()['hits'], 1)
+
+    def test_timeout_not_memoized(self):
+        outcome = compile_service.ProcessOutcome('', '', None, True, 10000.0, None, None)
+        with patch.object(compile_service, '_run_process', return_value=outcome) as run, \
+                patch.object(compile_service, '_which_or_err', return_value=('/usr/bin/g++', None)), \
+                patch.object(compile_service, '_compiler_version', return_value='g++ 12'):
+            compile_service.compile_cpp('int main(){}', timeout_s=1)
+            compile_service.compile_cpp('int main(){}', timeout_s=1)
+        self.assertEqual(run.call_count, 2)
+        self.assertEqual(self.memo.stats()['stores'], 0)
+
+    def test_execution_stats_moderators_only(self):
+        client = APIClient()
+        url = reverse('execution_stats')
+        user = User.objects.create_user(username='stats_user', password='pass12345')
+        client.force_authenticate(user=user)
+        self.assertEqual(client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        user.is_staff = True
+        user.save()
+        resp = client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIn('hits', resp.data['compile_memo'])
+
+
+@override_settings(ALGO_RUN_CACHE_TTL_S=60)
+class RunResultCacheTests(TestCase):
+    """Кэш результатов запуска одобренных бесплатных алгоритмов"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.algo = Algorithm.objects.create(
+            name='Cached',
+            description='desc',
+            code='print(1)',
+            author_name='author',
+            language='Python',
+            compiler='python',
+            status=Algorithm.STATUS_APPROVED,
+        )
+        self.url = reverse('algorithm_run', kwargs={'pk': self.algo.pk})
+        patcher = patch('algorithms.views.run_code', side_effect=self._fake_run)
+        self.run_code = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _fake_run(**kwargs):
+        cr = compile_service.CompileResult(True, '', '', 0, ['compile'])
+        rr = compile_service.RunResult(True, kwargs['stdin'] or 'empty', '', 0, ['python'])
+        return cr, rr
+
+    def test_repeated_run_served_from_cache(self):
+        first = self.client.post(self.url, data={'stdin': ''}, format='json')
+        second = self.client.post(self.url, data={'stdin': ''}, format='json')
+        self.assertEqual(second.data['stdout'], first.data['stdout'])
+        self.assertTrue(second.data['cached'])
+        self.assertNotIn('cached', first.data)
+        self.assertEqual(self.run_code.call_count, 1)
+
+        self.client.post(self.url, data={'stdin': '5'}, format='json')
+        self.client.post(self.url, data={'stdin': '', 'run_timeout_s': 3}, format='json')
+        self.assertEqual(self.run_code.call_count, 3)
+
+    def test_custom_code_bypasses_cache(self):
+        self.client.post(self.url, data={'stdin': ''}, format='json')
+        resp = self.client.post(self.url, data={'stdin': '', 'code': 'print(1)'}, format='json')
+        self.assertNotIn('cached', resp.data)
+        self.assertEqual(self.run_code.call_count, 2)
+
+    def test_update_invalidates(self):
+        self.client.post(self.url, data={'stdin': ''}, format='json')
+        self.algo.description = 'changed'
+        self.algo.save()
+        self.client.post(self.url, data={'stdin': ''}, format='json')
+        self.assertEqual(self.run_code.call_count, 2)
+
+    def test_paid_and_failed_runs_not_cached(self):
+        self.run_code.side_effect = lambda **kw: (
+            compile_service.CompileResult(True, '', '', 0, []),
+            compile_service.RunResult(False, '', 'timeout', None, []),
+        )
+        self.client.post(self.url, data={'stdin': ''}, format='json')
+        self.client.post(self.url, data={'stdin': ''}, format='json')
+        self.assertEqual(self.run_code.call_count, 2)
+
+        self.run_code.side_effect = self._fake_run
+        self.algo.is_paid = True
+        self.algo.price = 10
+        self.algo.save()
+        with patch.object(Algorithm, 'can_view_code', return_value=True):
+            self.client.post(self.url, data={'stdin': ''}, format='json')
+            self.client.post(self.url, data={'stdin': ''}, format='json')
+        self.assertEqual(self.run_code.call_count, 4)
+
+
+@skipUnless(os.name != 'nt' and shutil.which('python'), 'нужен Unix и python в PATH')
+class ExecutorDriverTests(TestCase):
+    """Драйверы исполнения: local, namespace (unshare) и remote через Unix-сокет"""
+
+    CODE = 'import os, sys\nprint(sys.stdin.read().strip(), os.getpid())\n'
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='algo_exec_test_')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.src = os.path.join(self.tmp, 'main.py')
+        with open(self.src, 'w') as f:
+            f.write(self.CODE)
+        self.cmd = [shutil.which('python'), '-I', self.src]
+
+    def _local(self):
+        return LocalExecutor(compile_service._iter_limited)
+
+    def test_driver_without_iter_run_fails_on_construction(self):
+        incomplete = type('Incomplete', (Executor,), {'name': 'incomplete'})
+        with self.assertRaises(TypeError):
+            incomplete()
+
+    def test_local_driver(self):
+        outcome = self._local().run(self.cmd, 'hi', 5, self.tmp, 256)
+        self.assertEqual(outcome.returncode, 0)
+        self.assertTrue(outcome.stdout.startswith('hi '))
+
+    def test_namespace_driver_isolates_pids(self):
+        executor = NamespaceExecutor(compile_service._iter_limited, env_factory=compile_service._safe_env)
+        try:
+            outcome = executor.run(self.cmd, 'hi', 5, self.tmp, 256)
+        except OSError as e:
+            self.skipTest(f'user namespace недоступны: {e}')
+        self.assertEqual(outcome.returncode, 0, outcome.stderr)
+        # В своём PID namespace программа — первый процесс после init (unshare --fork).
+        self.assertEqual(outcome.stdout.split(), ['hi', '1'])
+
+    def test_remote_driver_via_daemon(self):
+        sock = os.path.join(self.tmp, 'exec.sock')
+        server = ExecutionDaemon(sock, self._local())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        remote = RemoteExecutor(sock)
+        outcome = remote.run(self.cmd, 'remote', 5, self.tmp, 256)
+        self.assertEqual(outcome.returncode, 0)
+        self.assertTrue(outcome.stdout.startswith('remote '))
+        self.assertIsNotNone(outcome.cpu_ms)
+
+        outcome = remote.run(['python', '-c', 'while True: print(1)'], '', 5, self.tmp, 256, max_chars=100, kill_on_overflow=True)
+        self.assertTrue(outcome.output_limit_exceeded)
+
+        with self.assertRaises(OSError):
+            remote.run(['/nonexistent/binary'], '', 5, self.tmp, 256)
+
+    def test_remote_driver_unreachable(self):
+        with patch.object(compile_service, '_EXECUTOR', RemoteExecutor(os.path.join(self.tmp, 'missing.sock'))), \
+                patch.object(compile_service._PY_POOL, 'size', 0):
+            cr, rr = compile_service.run_python('print(1)')
+        self.assertTrue(cr.compiled)
+        self.assertFalse(rr.ran)
+        self.assertIn('Не удалось запустить', rr.stderr)
+
+
+@skipUnless(os.name != 'nt' and shutil.which('python'), 'нужен Unix и python в PATH')
+class CgroupLimiterTests(TestCase):
+    """Лимиты через cgroup v2 и откат на rlimit-ы (cgroupfs имитируется обычным каталогом)"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='algo_cg_test_')
+        self.addCleanup(shutil.rmtree, self.root, True)
+        with open(os.path.join(self.root, 'cgroup.controllers'), 'w') as f:
+            f.write('cpuset cpu io memory pids\n')
+        with open(os.path.join(self.root, 'cgroup.subtree_control'), 'w') as f:
+            f.write('')
+
+    def test_unavailable_without_controllers(self):
+        with open(os.path.join(self.root, 'cgroup.controllers'), 'w') as f:
+            f.write('cpu io\n')
+        limiter = CgroupLimiter(root=self.root, cpus=1, pids_max=16)
+        with limiter.group(128) as cgroup:
+            self.assertIsNone(cgroup)
+        self.assertIn('memory', limiter.stats()['error'])
+        self.assertFalse(CgroupLimiter(root='', cpus=1, pids_max=16).available)
+
+    def test_group_limits_and_usage(self):
+        limiter = CgroupLimiter(root=self.root, cpus=0.5, pids_max=16)
+        with limiter.group(128) as cgroup:
+            self.assertIsNotNone(cgroup)
+            with open(os.path.join(cgroup.path, 'memory.max')) as f:
+                self.assertEqual(f.read(), str(128 * 1024 * 1024))
+            with open(os.path.join(cgroup.path, 'cpu.max')) as f:
+                self.assertEqual(f.read(), '50000 100000')
+            with open(os.path.join(cgroup.path, 'cpu.stat'), 'w') as f:
+                f.write('usage_usec 12500\nuser_usec 10000\n')
+            with open(os.path.join(cgroup.path, 'memory.peak'), 'w') as f:
+                f.write(str(3 * 1024 * 1024))
+            self.assertEqual(cgroup.usage(), {'cpu_ms': 12.5, 'max_rss_kb': 3072})
+        with open(os.path.join(self.root, 'cgroup.subtree_control')) as f:
+            self.assertEqual(f.read(), '+memory +cpu +pids')
+
+    def test_run_joins_cgroup_without_address_space_limit(self):
+        # Под cgroup RLIMIT_AS не ставится: 300 МБ адресного пространства при memory_mb=64
+        # (с rlimit-ами такой запуск падает с MemoryError).
+        code = 'import mmap, os\nm = mmap.mmap(-1, 300 << 20)\nprint(os.getpid())\n'
+        cmd = [shutil.which('python'), '-c', code]
+        with patch.object(compile_service, '_CGROUPS', CgroupLimiter(root=self.root, cpus=1, pids_max=16)):
+            outcome = compile_service._run_process(cmd, '', 5, self.root, memory_mb=64)
+        self.assertEqual(outcome.returncode, 0, outcome.stderr)
+        # В настоящей cgroupfs каталог удаляется; здесь rmdir не проходит, и видно, кто в неё вошёл.
+        run_dir = next(name for name in os.listdir(self.root) if name.startswith('run_'))
+        with open(os.path.join(self.root, run_dir, 'cgroup.procs')) as f:
+            self.assertEqual(f.read(), outcome.stdout.strip())
+
+        limited = compile_service._run_process(cmd, '', 5, self.root, memory_mb=64)
+        self.assertNotEqual(limited.returncode, 0)
+
+
+class JvmTuningTests(TestCase):
+    """Флаги JVM и CDS-архив классов JDK"""
+
+    def setUp(self):
+        root = tempfile.mkdtemp(prefix='algo_cds_test_')
+        self.addCleanup(shutil.rmtree, root, True)
+        self.cache = ArtifactCache(root=root, max_bytes=64 * 1024 * 1024)
+        self.jvm = JvmTuning(cache=self.cache, enabled=True)
+
+    def test_flags_schedule_archive_build_once(self):
+        with patch.object(self.jvm, 'build', return_value=False) as build:
+            flags = self.jvm.flags('/usr/bin/java', '/usr/bin/javac', 'openjdk 17', 256, env={})
+            for thread in threading.enumerate():
+                if thread.name == 'algo-jvm-cds':
+                    thread.join(5)
+            self.jvm.flags('/usr/bin/java', '/usr/bin/javac', 'openjdk 17', 256, env={})
+        self.assertIn('-XX:TieredStopAtLevel=1', flags)
+        self.assertIn('-XX:+UseSerialGC', flags)
+        self.assertIn('-Xmx128m', flags)
+        self.assertFalse(any(f.startswith('-XX:SharedArchiveFile') for f in flags))
+        # Неудачная сборка не повторяется.
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(self.jvm.stats()['failed'], 1)
+
+    def test_archive_used_when_cached(self):
+        archive = os.path.join(tempfile.mkdtemp(prefix='algo_cds_src_'), ARCHIVE_NAME)
+        self.addCleanup(shutil.rmtree, os.path.dirname(archive), True)
+        with open(archive, 'wb') as f:
+            f.write(b'jsa')
+        self.cache.put(JvmTuning.NAMESPACE, JvmTuning.key('/usr/bin/java', 'openjdk 17'), {ARCHIVE_NAME: archive}, {})
+        flags = self.jvm.flags('/usr/bin/java', None, 'openjdk 17', 64, env={})
+        shared = [f for f in flags if f.startswith('-XX:SharedArchiveFile=')]
+        self.assertEqual(len(shared), 1)
+        self.assertTrue(os.path.isfile(shared[0].split('=', 1)[1]))
+        self.assertIn('-Xmx32m', flags)
+        # Другая версия JDK — другой архив.
+        other = self.jvm.flags('/usr/bin/java', None, 'openjdk 21', 64, env={})
+        self.assertFalse(any(f.startswith('-XX:SharedArchiveFile') for f in other))
+
+    def test_classlist_drops_warmup_classes(self):
+        text = 'java/lang/Object id: 0\nAlgoCdsWarmup id: 1\n@lambda-proxy AlgoCdsWarmup run\njava/util/Scanner id: 2\n'
+        self.assertEqual(jdk_classlist(text), 'java/lang/Object id: 0\njava/util/Scanner id: 2\n')
+
+    def test_run_java_uses_tuned_flags(self):
+        code = 'public class Main { public static void main(String[] a) {} }'
+        commands = []
+
+        def _fake_run(cmd, *args, **kwargs):
+            commands.append(cmd)
+            return compile_service.ProcessOutcome('', '', 0, False, 1.0, 1.0, 1024)
+
+        jvm = JvmTuning(cache=self.cache, enabled=False)
+        with patch.object(compile_service, '_build_java', return_value=(compile_service.CompileResult(True, '', '', 0, []), '/cp')), \
+                patch.object(compile_service, '_which_or_err', return_value=('/usr/bin/java', None)), \
+                patch.object(compile_service, '_compiler_version', return_value='openjdk 17'), \
+                patch.object(compile_service, '_JVM', jvm), \
+                patch.object(compile_service, '_run_program', side_effect=_fake_run):
+            _cr, rr = compile_service.run_java(code, memory_mb=256)
+        self.assertTrue(rr.ran)
+        self.assertEqual(commands[0][0], '/usr/bin/java')
+        self.assertEqual(commands[0][-3:], ['-cp', '/cp', 'Main'])
+        self.assertIn('-XX:TieredStopAtLevel=1', commands[0])
+        self.assertIn('-Xmx128m', commands[0])
+
+
+class SingleFlightTests(TestCase):
+    """Склейка одинаковых одновременных вызовов"""
+
+    def test_concurrent_calls_share_one_result(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def _work():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'done'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('k', _work)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flight.do('k', _work))) for _ in range(3)]
+        for t in followers:
+            t.start()
+        while flight.stats()['shared'] < 3:
+            time.sleep(0.01)
+        release.set()
+        for t in [leader, *followers]:
+            t.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [('done', False), ('done', True), ('done', True), ('done', True)])
+        self.assertEqual(flight.stats()['in_flight'], 0)
+        # После завершения ключ свободен: следующий вызов выполняется заново.
+        self.assertEqual(flight.do('k', lambda: 'again'), ('again', False))
+
+    def test_error_is_shared_and_key_released(self):
+        flight = SingleFlight()
+        with self.assertRaises(RuntimeError):
+            flight.do('k', lambda: (_ for _ in ()).throw(RuntimeError('boom')))
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+
+@skipUnless(os.name != 'nt' and shutil.which('g++'), 'нужен Unix и g++ в PATH')
+class CompileFarmTests(TestCase):
+    """Ферма компиляции: задания через Unix-сокет, склейка одинаковых, откат на локальную сборку"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='algo_farm_test_')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        cache = ArtifactCache(root=os.path.join(self.tmp, 'cache'), max_bytes=64 * 1024 * 1024)
+        patcher = patch.object(compile_service, '_ARTIFACT_CACHE', cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        compile_service._COMPILE_MEMO.clear()
+        self.addCleanup(compile_service._COMPILE_MEMO.clear)
+        self.sock = os.path.join(self.tmp, 'farm.sock')
+
+    def _serve(self, build, workers=2):
+        server = CompileFarm(self.sock, build, workers=workers)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_run_cpp_uses_farm_artifact(self):
+        built = []
+
+        def _build(job):
+            built.append(job)
+            return compile_service.farm_compile(job)
+
+        self._serve(_build)
+        code = '#include <iostream>\nint main(){std::cout<<"farm";}\n'
+        compiled_in = []
+        real_run_process = compile_service._run_process
+
+        def _spy(*args, **kwargs):
+            compiled_in.append(threading.current_thread().name)
+            return real_run_process(*args, **kwargs)
+
+        with patch.object(compile_service, '_FARM', CompileFarmClient(self.sock)), \
+                patch.object(compile_service, '_run_process', side_effect=_spy):
+            cr, rr = compile_service.run_cpp(code)
+        self.assertTrue(cr.compiled, cr.stderr)
+        self.assertEqual(rr.stdout, 'farm')
+        self.assertEqual(len(built), 1)
+        self.assertEqual(built[0]['language'], 'cpp')
+        # Компилятор запускался только в потоке фермы, backend взял артефакт из кэша.
+        self.assertEqual(len(compiled_in), 1)
+        self.assertTrue(compiled_in[0].startswith('algo-farm'))
+
+    def test_farm_compile_error_is_returned(self):
+        self._serve(compile_service.farm_compile)
+        with patch.object(compile_service, '_FARM', CompileFarmClient(self.sock)):
+            cr = compile_service.compile_cpp('int main( {')
+        self.assertFalse(cr.compiled)
+        self.assertIn('error', cr.stderr)
+
+    def test_identical_jobs_are_compiled_once(self):
+        release = threading.Event()
+        calls = []
+
+        def _build(job):
+            calls.append(job)
+            release.wait(5)
+            return {'result': {'compiled': False, 'stdout': '', 'stderr': 'x', 'exit_code': 1, 'command': []}, 'artifact': None}
+
+        server = self._serve(_build)
+        client = CompileFarmClient(self.sock)
+        job = {'language': 'cpp', 'code': 'int main(){}', 'compiler': 'g++', 'timeout_s': 10, 'memory_mb': 512}
+        replies = []
+        threads = [threading.Thread(target=lambda: replies.append(client.compile(job))) for _ in range(4)]
+        for t in threads:
+            t.start()
+        deadline = time.monotonic() + 5
+        while server.flight.stats()['shared'] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(replies), 4)
+        self.assertEqual(sum(1 for r in replies if r['shared']), 3)
+
+    def test_bad_job_is_rejected(self):
+        self._serve(compile_service.farm_compile)
+        with self.assertRaises(OSError):
+            CompileFarmClient(self.sock).compile({'language': 'python', 'code': 'print(1)', 'timeout_s': 5})
+
+    def test_unreachable_farm_falls_back_to_local_compile(self):
+        client = CompileFarmClient(os.path.join(self.tmp, 'missing.sock'))
+        with patch.object(compile_service, '_FARM', client):
+            cr, rr = compile_service.run_cpp('#include <cstdio>\nint main(){puts("local");}\n')
+        self.assertTrue(cr.compiled, cr.stderr)
+        self.assertEqual(rr.stdout.strip(), 'local')
+        self.assertEqual(client.stats()['failures'], 1)
+
+
+@skipUnless(os.name != 'nt' and shutil.which('g++'), 'нужен Unix и g++ в PATH')
+class CompileSingleFlightTests(TestCase):
+    """Одновременные компиляции одного кода: компилятор запускается один раз"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='algo_flight_test_')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.cache = ArtifactCache(root=self.tmp, max_bytes=64 * 1024 * 1024)
+        patcher = patch.object(compile_service, '_ARTIFACT_CACHE', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        compile_service._COMPILE_MEMO.clear()
+        self.addCleanup(compile_service._COMPILE_MEMO.clear)
+
+    def _compile_concurrently(self, code, n=4):
+        real_run_process = compile_service._run_process
+        calls = []
+
+        def _slow(*args, **kwargs):
+            calls.append(1)
+            # Пока компилятор работает, остальные запросы успевают прийти.
+            time.sleep(0.3)
+            return real_run_process(*args, **kwargs)
+
+        results = []
+        with patch.object(compile_service, '_run_process', side_effect=_slow):
+            threads = [threading.Thread(target=lambda: results.append(compile_service.compile_cpp(code))) for _ in range(n)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(30)
+        return calls, results
+
+    def test_identical_compiles_share_one_compiler_run(self):
+        before = compile_service._COMPILE_FLIGHT.stats()['shared']
+        calls, results = self._compile_concurrently('int main(){return 0;}\n')
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(cr.compiled for cr in results))
+        self.assertEqual(compile_service._COMPILE_FLIGHT.stats()['shared'] - before, 3)
+
+    def test_compile_error_is_shared(self):
+        calls, results = self._compile_concurrently('int main( {\n')
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(not cr.compiled and 'error' in cr.stderr for cr in results))
+
+    def test_build_lock_is_exclusive_between_holders(self):
+        with self.cache.build_lock('cpp', 'abcdef', timeout_s=1) as first:
+            self.assertTrue(first)
+            acquired = []
+            t = threading.Thread(target=lambda: acquired.append(self.cache.build_lock('cpp', 'abcdef', timeout_s=0.1).__enter__()))
+            t.start()
+            t.join(5)
+            self.assertEqual(acquired, [False])
+        with self.cache.build_lock('cpp', 'abcdef', timeout_s=0.1) as again:
+            self.assertTrue(again)
+        # Каталог блокировок не считается записью кэша.
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_build_lock_is_per_key(self):
+        # Ключи с общим префиксом не делят блокировку: разный код собирается параллельно.
+        with self.cache.build_lock('cpp', 'abc111', timeout_s=1) as first, \
+                self.cache.build_lock('cpp', 'abc222', timeout_s=0.1) as second:
+            self.assertTrue(first)
+            self.assertTrue(second)
+        lock_dir = os.path.join(self.cache.root, ArtifactCache.LOCK_DIR)
+        stale = os.path.join(lock_dir, 'cpp_abc111.lock')
+        os.utime(stale, (time.time() - ArtifactCache.LOCK_TTL_S - 1,) * 2)
+        self.cache.evict()
+        self.assertEqual(sorted(os.listdir(lock_dir)), ['cpp_abc222.lock'])
+
+    def test_waiter_takes_artifact_built_by_other_process(self):
+        code = 'int main(){return 7;}\n'
+        compiler_path, _err = compile_service._which_or_err('g++', 'Компилятор', language='cpp')
+        key = cache_key('cpp', code, compiler_path, compile_service._compiler_version(compiler_path), ' '.join(compile_service.CPP_FLAGS))
+        src = os.path.join(self.tmp, 'other.cpp')
+        exe = os.path.join(self.tmp, 'other')
+        with open(src, 'w') as f:
+            f.write(code)
+        results = []
+        with patch.object(compile_service, '_run_process', side_effect=AssertionError('компиляция не дождалась блокировки')):
+            # «Другой процесс» держит блокировку записи и собирает код, пока run_cpp ждёт.
+            with self.cache.build_lock('cpp', key, timeout_s=1):
+                t = threading.Thread(target=lambda: results.append(compile_service.run_cpp(code)))
+                t.start()
+                time.sleep(0.2)
+                subprocess.run([compiler_path, src, '-o', exe], check=True)
+                self.cache.put('cpp', key, files={'main': exe}, meta={'exit_code': 0, 'command': ['other']})
+            t.join(30)
+        cr, rr = results[0]
+        self.assertEqual(cr.command, ['other'])
+        self.assertEqual(rr.exit_code, 7)
+
+
+@skipUnless(os.name != 'nt' and shutil.which('g++'), 'нужен Unix и g++ в PATH')
+# Фоновые замеры при одобрении проверяются отдельно (BenchmarkHistoryTests).
+@override_settings(ALGO_BENCHMARK_ON_APPROVAL=False)
+class PrebuildTests(TestCase):
+    """Предсборка артефактов при одобрении и команда rebuild_artifacts"""
+
+    CODE = '#include <cstdio>\nint main(){puts("warm");}\n'
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='algo_prebuild_test_')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        patcher = patch.object(compile_service, '_ARTIFACT_CACHE', ArtifactCache(root=self.tmp, max_bytes=64 * 1024 * 1024))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Фоновый поток заменяем синхронной сборкой.
+        patcher = patch.object(prebuild, '_submit', side_effect=prebuild._build_in_thread)
+        self.submit = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='prebuild_author', password='pass12345')
+        self.moderator = User.objects.create_user(username='prebuild_mod', password='pass12345', is_staff=True)
+        self.algorithm = Algorithm.objects.create(
+            name='Warm', description='d', code=self.CODE, author_name=self.author.username,
+            language='C++', compiler='g++', status=Algorithm.STATUS_PENDING,
+        )
+
+    def _moderate(self, new_status):
+        self.client.force_authenticate(user=self.moderator)
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(
+                reverse('moderate_algorithm', kwargs={'algorithm_id': self.algorithm.id}),
+                {'status': new_status, 'rejection_reason': 'нет'},
+            )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+    def test_approval_prebuilds_artifact(self):
+        self._moderate(Algorithm.STATUS_APPROVED)
+        self.assertEqual(self.submit.call_count, 1)
+        with patch.object(compile_service, '_run_process', side_effect=AssertionError('артефакт не собран заранее')):
+            cr, rr = compile_service.run_cpp(self.CODE)
+        self.assertTrue(cr.compiled)
+        self.assertEqual(rr.stdout.strip(), 'warm')
+
+    def test_rejection_does_not_prebuild(self):
+        self._moderate(Algorithm.STATUS_REJECTED)
+        self.submit.assert_not_called()
+
+    @override_settings(ALGO_PREBUILD_ON_APPROVAL=False)
+    def test_prebuild_can_be_disabled(self):
+        self._moderate(Algorithm.STATUS_APPROVED)
+        self.submit.assert_not_called()
+
+    def test_editing_approved_code_schedules_prebuild(self):
+        self.algorithm.status = Algorithm.STATUS_APPROVED
+        self.algorithm.save()
+        request = type('Req', (), {'user': self.author})()
+
+        serializer = AlgorithmSerializer(self.algorithm, data={'name': 'Warm 2'}, partial=True, context={'request': request})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.captureOnCommitCallbacks(execute=True):
+            serializer.save()
+        self.submit.assert_not_called()
+
+        self.algorithm.status = Algorithm.STATUS_APPROVED
+        self.algorithm.save()
+        new_code = self.CODE.replace('warm', 'warm2')
+        serializer = AlgorithmSerializer(self.algorithm, data={'code': new_code}, partial=True, context={'request': request})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.captureOnCommitCallbacks(execute=True):
+            algorithm = serializer.save()
+        self.assertEqual(algorithm.status, Algorithm.STATUS_PENDING)
+        self.assertEqual(self.submit.call_count, 1)
+        self.assertEqual(self.submit.call_args[0][0].code, algorithm.code)
+        self.assertIn('warm2', algorithm.code)
+
+    def test_prebuild_gives_up_under_sustained_load(self):
+        # Первый отказ укладывается в PREBUILD_MAX_WAIT_S, после второго ждать уже слишком долго.
+        rejections = [AdmissionRejected('busy', retry_after=1), AdmissionRejected('busy', retry_after=60)]
+        with patch.object(compile_service, 'PREBUILD_MAX_WAIT_S', 30), \
+                patch.object(compile_service, 'compile_code', side_effect=rejections) as busy, \
+                patch('algorithms.compile_service.time.sleep') as mock_sleep, \
+                self.assertLogs('algorithms.prebuild', level='WARNING') as logs:
+            self._moderate(Algorithm.STATUS_APPROVED)
+        self.assertEqual(busy.call_count, 2)
+        mock_sleep.assert_called_once_with(1)
+        self.assertIn('перегружен', logs.output[0])
+
+        out = io.StringIO()
+        with patch.object(compile_service, 'PREBUILD_MAX_WAIT_S', 0), \
+                patch.object(compile_service, 'compile_code', side_effect=AdmissionRejected('busy', retry_after=1)):
+            call_command('rebuild_artifacts', stdout=out)
+        self.assertIn('отложено: 1', out.getvalue())
+
+    def test_rebuild_artifacts_command(self):
+        self.algorithm.status = Algorithm.STATUS_APPROVED
+        self.algorithm.save()
+        Algorithm.objects.create(
+            name='Broken', description='d', code='int main( {', author_name=self.author.username,
+            language='C++', compiler='g++', status=Algorithm.STATUS_APPROVED,
+        )
+        Algorithm.objects.create(
+            name='Py', description='d', code='print(1)', author_name=self.author.username,
+            language='Python', compiler='python', status=Algorithm.STATUS_APPROVED,
+        )
+        Algorithm.objects.create(
+            name='Pending', description='d', code='int main(){}', author_name=self.author.username,
+            language='C++', compiler='g++', status=Algorithm.STATUS_PENDING,
+        )
+        out = io.StringIO()
+        call_command('rebuild_artifacts', stdout=out)
+        self.assertIn('Собрано: 1, с ошибкой: 1, без компиляции: 1', out.getvalue())
+        self.assertIn('Broken', out.getvalue())
+
+
+@skipUnless(os.name != 'nt' and shutil.which('g++'), 'нужен Unix и g++ в PATH')
+class CompileProfileTests(TestCase):
+    """Профили сборки C++: флаги, отдельные пространства кэша, санитайзеры, выбор в API"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='algo_profile_test_')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.cache = ArtifactCache(root=self.tmp, max_bytes=64 * 1024 * 1024)
+        patcher = patch.object(compile_service, '_ARTIFACT_CACHE', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_model_choices_match_profiles(self):
+        self.assertEqual([name for name, _label in COMPILE_PROFILE_CHOICES], list(compile_service.CPP_PROFILES))
+
+    def test_unknown_profile_is_rejected(self):
+        cr, rr = compile_service.run_code('cpp', 'int main(){}', profile='-O3 -fplugin=evil')
+        self.assertFalse(cr.compiled)
+        self.assertIn('Неизвестный профиль сборки', cr.stderr)
+        self.assertIsNone(compile_service.profile_error(None))
+        self.assertIsNotNone(compile_service.profile_error(['default']))
+
+    def test_profiles_use_own_flags_and_cache_namespace(self):
+        code = 'int main(){return 0;}\n'
+        fast = compile_service.compile_cpp(code, profile='fast-check')
+        default = compile_service.compile_cpp(code)
+        self.assertTrue(fast.compiled and default.compiled)
+        self.assertIn('-O0', fast.command)
+        self.assertIn('-O2', default.command)
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp, 'cpp-fast-check')))
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp, 'cpp')))
+        # Повтор с тем же профилем — из своего пространства кэша, без компиляции.
+        with patch.object(compile_service, '_run_process', side_effect=AssertionError('повторная компиляция')):
+            again = compile_service.compile_cpp(code, profile='fast-check')
+        self.assertEqual(again.command, fast.command)
+
+    def test_sanitizer_profile_reports_memory_errors(self):
+        code = '#include <cstdio>\nint main(){int*a=new int[2];a[2]=1;printf("%d",a[2]);}\n'
+        # С RLIMIT_AS программа с ASan не стартовала бы вовсе (резерв теневой памяти).
+        cr, rr = compile_service.run_cpp(code, profile='sanitizer', run_timeout_s=5, memory_mb=256)
+        self.assertTrue(cr.compiled, cr.stderr)
+        self.assertIn('-fsanitize=address,undefined', cr.command)
+        self.assertTrue(rr.ran)
+        self.assertNotEqual(rr.exit_code, 0)
+        # Выход за границу ловит UBSan (проверка размера объекта) или ASan — смотря кто раньше.
+        self.assertTrue('runtime error' in rr.stderr or 'AddressSanitizer' in rr.stderr, rr.stderr)
+
+    def test_api_uses_algorithm_profile_and_validates_request(self):
+        user = User.objects.create_user(username='profile_author', password='pass12345')
+        algorithm = Algorithm.objects.create(
+            name='Prof', description='d', code='int main(){}', author_name=user.username,
+            language='C++', compiler='g++', compile_profile='optimized', status=Algorithm.STATUS_APPROVED,
+        )
+        client = APIClient()
+        url = reverse('algorithm_run', kwargs={'pk': algorithm.pk})
+        ok = (compile_service.CompileResult(True, '', '', 0, []), compile_service.RunResult(True, '', '', 0, []))
+        with patch('algorithms.views.run_code', return_value=ok) as run:
+            resp = client.post(url, data={'stdin': ''}, format='json')
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertEqual(run.call_args.kwargs['profile'], 'optimized')
+            resp = client.post(url, data={'stdin': '', 'profile': 'fast-check'}, format='json')
+            self.assertEqual(run.call_args.kwargs['profile'], 'fast-check')
+            resp = client.post(url, data={'stdin': '', 'profile': 'turbo'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Неизвестный профиль сборки', resp.data['detail'])
+        self.assertEqual(run.call_count, 2)
+
+        resp = client.post(reverse('algorithm_run_snippet'), data={'language': 'cpp', 'code': 'int main(){}', 'profile': 'turbo'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DiagnosticsParserTests(TestCase):
+    """Разбор вывода компиляторов в структурированные диагностики"""
+
+    def test_gcc_output(self):
+        text = (
+            "main.cpp: In function 'int main()':\n"
+            "main.cpp:2:20: error: expected primary-expression before ';' token\n"
+            "    2 | int main(){int x = ; }\n"
+            "      |                    ^\n"
+            "main.cpp:3:5: warning: unused variable 'y' [-Wunused-variable]\n"
+            "main.cpp:1:10: fatal error: nope.h: No such file or directory\n"
+        )
+        diagnostics = parse_gcc(text)
+        self.assertEqual(
+            [(d.severity, d.line, d.column) for d in diagnostics],
+            [('error', 2, 20), ('warning', 3, 5), ('error', 1, 10)],
+        )
+        self.assertEqual(diagnostics[0].message, "expected primary-expression before ';' token")
+        self.assertEqual(diagnostics[0].file, 'main.cpp')
+
+    def test_javac_output(self):
+        text = (
+            "Main.java:3: error: cannot find symbol\n"
+            "        x = 1;\n"
+            "        ^\n"
+            "  symbol:   variable x\n"
+            "  location: class Main\n"
+            "Main.java:5: error: ';' expected\n"
+            "    int y = 2\n"
+            "             ^\n"
+            "warning: [options] bootstrap class path not set\n"
+            "2 errors\n"
+            "1 warning\n"
+        )
+        diagnostics = parse_javac(text)
+        self.assertEqual(
+            [(d.severity, d.line, d.column) for d in diagnostics],
+            [('error', 3, 9), ('error', 5, 14), ('warning', None, None)],
+        )
+        self.assertEqual(diagnostics[0].message, 'cannot find symbol\nsymbol:   variable x\nlocation: class Main')
+
+    def test_python_syntax_error(self):
+        cr, diagnostics = compile_service.check_python('x = 1\ndef f(:\n    pass\n')
+        self.assertFalse(cr.compiled)
+        self.assertEqual(len(diagnostics), 1)
+        self.assertEqual((diagnostics[0].severity, diagnostics[0].line), ('error', 2))
+        self.assertIsNotNone(diagnostics[0].column)
+        self.assertTrue(diagnostics[0].message.startswith('SyntaxError'))
+        # compile_python отдаёт тот же результат из общего кэша проверок.
+        self.assertIs(compile_service.compile_python('x = 1\ndef f(:\n    pass\n'), cr)
+
+
+class CompileEndpointTests(TestCase):
+    """POST /api/algorithms/compile/: проверка без сборки и запуска"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('algorithm_compile')
+
+    def test_python(self):
+        resp = self.client.post(self.url, data={'language': 'python', 'code': 'print(1'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertFalse(resp.data['ok'])
+        self.assertEqual(resp.data['diagnostics'][0]['line'], 1)
+
+        resp = self.client.post(self.url, data={'language': 'python', 'code': 'print(1)'}, format='json')
+        self.assertTrue(resp.data['ok'])
+        self.assertEqual(resp.data['diagnostics'], [])
+
+    def test_requires_code_and_language(self):
+        resp = self.client.post(self.url, data={'code': 'x'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_overload_returns_503(self):
+        with patch('algorithms.views.check_code', side_effect=AdmissionRejected('занято', retry_after=2)):
+            resp = self.client.post(self.url, data={'language': 'cpp', 'code': 'int main(){}'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(resp['Retry-After'], '2')
+
+    @skipUnless(os.name != 'nt' and shutil.which('g++'), 'нужен Unix и g++ в PATH')
+    def test_cpp_syntax_only(self):
+        code = 'int main(){\n    int x = ;\n    return 0;\n}\n'
+        resp = self.client.post(self.url, data={'language': 'cpp', 'code': code}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertFalse(resp.data['ok'])
+        first = resp.data['diagnostics'][0]
+        self.assertEqual((first['severity'], first['line'], first['column'], first['file']), ('error', 2, 13, 'main.cpp'))
+
+        # Повтор того же кода — из кэша проверок, без запуска компилятора.
+        with patch.object(compile_service, '_run_process', side_effect=AssertionError('повторная проверка')):
+            again = self.client.post(self.url, data={'language': 'cpp', 'code': code}, format='json')
+        self.assertEqual(again.data['diagnostics'], resp.data['diagnostics'])
+
+        ok = self.client.post(self.url, data={'language': 'cpp', 'code': 'int main(){return 0;}\n'}, format='json')
+        self.assertTrue(ok.data['ok'])
+        self.assertIn('-fsyntax-only', compile_service.CPP_SYNTAX_FLAGS)
+
+
+class BenchmarkStatsTests(TestCase):
+    """Статистика замеров и подбор сложности"""
+
+    def test_summary(self):
+        self.assertEqual(summarize([5.0, 1.0, None, 3.0]), {'min': 1.0, 'median': 3.0, 'p95': 4.8})
+        self.assertIsNone(summarize([None]))
+        self.assertEqual(percentile([7.0], 95), 7.0)
+
+    def test_fit_picks_growth_model(self):
+        sizes = [1000, 2000, 4000, 8000, 16000]
+        # Постоянная часть (запуск процесса) не мешает узнать рост.
+        self.assertEqual(fit_complexity([(n, 3 + 0.002 * n) for n in sizes])['complexity'], 'O(n)')
+        self.assertEqual(fit_complexity([(n, 3 + 1e-6 * n * n) for n in sizes])['complexity'], 'O(n^2)')
+        self.assertEqual(fit_complexity([(n, 5.0) for n in sizes])['complexity'], 'O(1)')
+        self.assertIsNone(fit_complexity([(1000, 1.0), (2000, 2.0)]))
+
+    def test_generated_input_is_deterministic(self):
+        text = generate_input(5)
+        self.assertEqual(text, generate_input(5))
+        first, numbers = text.splitlines()
+        self.assertEqual(first, '5')
+        self.assertEqual(len(numbers.split()), 5)
+
+
+class BenchmarkApiTests(TestCase):
+    """Режим бенчмарка в POST /api/algorithms/<id>/run/ и история замеров версии"""
+
+    CODE = 'n = int(input())\nprint(sum(map(int, input().split())))\n'
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='bench_author', password='pass12345')
+        self.algorithm = Algorithm.objects.create(
+            name='Sum', description='d', code=self.CODE, author_name=self.author.username,
+            language='Python', compiler='python', status=Algorithm.STATUS_APPROVED,
+        )
+        self.url = reverse('algorithm_run', kwargs={'pk': self.algorithm.pk})
+        self.client = APIClient()
+
+    def test_author_benchmark_is_stored_for_code_version(self):
+        self.client.force_authenticate(self.author)
+        resp = self.client.post(self.url, data={'benchmark': True, 'sizes': [10, 20, 40], 'repeat': 2}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK, resp.data)
+        self.assertTrue(resp.data['compiled'])
+        self.assertEqual([case['size'] for case in resp.data['cases']], [10, 20, 40])
+        for case in resp.data['cases']:
+            self.assertEqual((case['status'], case['runs']), ('ok', 2))
+            self.assertLessEqual(case['wall_time_ms']['min'], case['wall_time_ms']['p95'])
+        self.assertIsNotNone(resp.data['complexity'])
+
+        record = AlgorithmBenchmark.objects.get(pk=resp.data['benchmark_id'])
+        self.assertEqual(record.code_hash, self.algorithm.code_hash)
+        self.assertEqual(record.created_by, self.author)
+        card = self.client.get(reverse('algorithm_detail', kwargs={'pk': self.algorithm.pk}))
+        self.assertEqual(card.data['benchmark']['id'], record.pk)
+
+        # Новая версия кода — старые цифры на карточку не попадают.
+        self.algorithm.code = self.CODE + '# v2\n'
+        self.algorithm.save()
+        card = self.client.get(reverse('algorithm_detail', kwargs={'pk': self.algorithm.pk}))
+        self.assertIsNone(card.data['benchmark'])
+
+    def test_benchmark_only_for_author_and_moderators(self):
+        data = {'benchmark': True, 'stdin': '2\n1 2\n', 'repeat': 1}
+        with patch.object(compile_service, '_run_process', side_effect=AssertionError('замер без прав')):
+            resp = self.client.post(self.url, data=data, format='json')
+            self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+            self.client.force_authenticate(User.objects.create_user(username='bench_other', password='pass12345'))
+            resp = self.client.post(self.url, data=data, format='json')
+            self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(User.objects.create_user(username='bench_mod', password='pass12345', is_staff=True))
+        resp = self.client.post(self.url, data=data, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['cases'][0]['status'], 'ok')
+
+    def test_benchmark_of_other_code_is_not_stored(self):
+        self.client.force_authenticate(self.author)
+        resp = self.client.post(
+            self.url, data={'benchmark': True, 'code': 'print(1)\n', 'stdin': '', 'repeat': 1}, format='json'
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['cases'][0]['status'], 'ok')
+        self.assertIsNone(resp.data['benchmark_id'])
+        self.assertIsNone(resp.data['complexity'])
+        self.assertFalse(AlgorithmBenchmark.objects.exists())
+
+    def test_failing_input_stops_repeats(self):
+        self.client.force_authenticate(self.author)
+        resp = self.client.post(
+            self.url,
+            data={'benchmark': True, 'inputs': [{'stdin': 'oops', 'size': 1}], 'repeat': 3},
+            format='json',
+        )
+        case = resp.data['cases'][0]
+        self.assertEqual((case['status'], case['runs']), ('runtime_error', 0))
+        self.assertIn('ValueError', case['stderr'])
+
+    def test_limits(self):
+        self.client.force_authenticate(self.author)
+        resp = self.client.post(self.url, data={'benchmark': True, 'sizes': [0]}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        resp = self.client.post(self.url, data={'benchmark': True, 'sizes': list(range(1, 12))}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        with patch.object(compile_service, 'BENCHMARK_MAX_RUNS', 4):
+            resp = self.client.post(self.url, data={'benchmark': True, 'sizes': [1, 2, 3], 'repeat': 2}, format='json')
+        self.assertFalse(resp.data['compiled'])
+        self.assertIn('Слишком много запусков', resp.data['compile_stderr'])
+
+
+def _bench_case(size, median, status='ok'):
+    timing = {'min': median, 'median': median, 'p95': median} if status == 'ok' else None
+    return {'size': size, 'status': status, 'runs': 3, 'wall_time_ms': timing, 'cpu_time_ms': timing, 'max_rss_kb': 1000}
+
+
+class BenchmarkCompareTests(TestCase):
+    """Сравнение замеров двух версий"""
+
+    def test_ratio_threshold_and_noise_floor(self):
+        base = [_bench_case(1000, 10.0), _bench_case(10000, 100.0)]
+        head = [_bench_case(1000, 12.0), _bench_case(10000, 320.0)]
+        result = compare_runs(base, head, threshold=1.5, min_delta_ms=5)
+        self.assertTrue(result['regression'])
+        self.assertEqual([case['status'] for case in result['cases']], ['ok', 'regression'])
+        self.assertEqual(result['max_ratio'], 3.2)
+        self.assertFalse(compare_runs(base, head, threshold=4)['regression'])
+        # В 3 раза, но на 2 мс — шум запуска процесса, не регрессия.
+        self.assertFalse(compare_runs([_bench_case(1, 1.0)], [_bench_case(1, 3.0)], threshold=1.5, min_delta_ms=5)['regression'])
+
+    def test_failure_on_previously_passing_input_is_regression(self):
+        result = compare_runs([_bench_case(10, 5.0)], [_bench_case(10, 0, status='timeout')], threshold=2)
+        self.assertTrue(result['regression'])
+        self.assertEqual(result['cases'][0]['status'], 'failed')
+        result = compare_runs([_bench_case(10, 0, status='timeout')], [_bench_case(10, 5.0)], threshold=2)
+        self.assertFalse(result['regression'])
+
+    def test_complexity_order(self):
+        self.assertTrue(complexity_grew('O(n log n)', 'O(n^2)'))
+        self.assertFalse(complexity_grew('O(n)', 'O(n)'))
+        self.assertFalse(complexity_grew(None, 'O(n)'))
+
+
+@override_settings(ALGO_BENCHMARK_ON_APPROVAL=True, ALGO_BENCHMARK_SIZES=[10, 20, 40], ALGO_BENCHMARK_REPEAT=1)
+class BenchmarkHistoryTests(TestCase):
+    """Замеры версий при одобрении и правке, API истории и сравнения"""
+
+    CODE = 'n = int(input())\nprint(sum(map(int, input().split())))\n'
+
+    def setUp(self):
+        # Фоновый поток заменяем синхронным замером (без закрытия соединения с тестовой БД).
+        patcher = patch.object(benchmark_history, '_run_in_thread', side_effect=self._run_now)
+        self.submit = patcher.start()
+        self.addCleanup(patcher.stop)
+        inline = type('Inline', (), {'submit': staticmethod(lambda fn, *args: fn(*args))})()
+        patcher = patch.object(benchmark_history, '_executor', inline)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='history_author', password='pass12345')
+        self.moderator = User.objects.create_user(username='history_mod', password='pass12345', is_staff=True)
+        self.algorithm = Algorithm.objects.create(
+            name='Sum', description='d', code=self.CODE, author_name=self.author.username,
+            language='Python', compiler='python', status=Algorithm.STATUS_PENDING,
+        )
+
+    @staticmethod
+    def _run_now(algorithm, trigger, key):
+        try:
+            benchmark_history.run(algorithm, trigger)
+        finally:
+            benchmark_history._pending.discard(key)
+
+    def _approve(self):
+        self.client.force_authenticate(user=self.moderator)
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(
+                reverse('moderate_algorithm', kwargs={'algorithm_id': self.algorithm.id}), {'status': 'approved'}
+            )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.algorithm.refresh_from_db()
+
+    def test_list_loads_benchmarks_in_one_query(self):
+        latest = {}
+        for i in range(3):
+            algorithm = Algorithm.objects.create(
+                name=f'Listed {i}', description='d', code=f'print({i})\n', author_name=self.author.username,
+                language='Python', compiler='python', status=Algorithm.STATUS_APPROVED,
+            )
+            for code_hash in ('old-version', algorithm.code_hash):
+                record = AlgorithmBenchmark.objects.create(
+                    algorithm=algorithm, code_hash=code_hash, language='Python', repeat=1,
+                    results={'cases': [], 'complexity': None},
+                )
+            latest[algorithm.pk] = record.pk
+        # count для пагинации, страница алгоритмов и один запрос замеров — независимо от числа строк.
+        with self.assertNumQueries(3):
+            resp = self.client.get(reverse('algorithm_list'))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual({row['id']: row['benchmark']['id'] for row in resp.data['results']}, latest)
+
+    def test_benchmark_skipped_under_sustained_load(self):
+        with patch.object(benchmark_history, 'ADMISSION_MAX_WAIT_S', 0), \
+                patch.object(benchmark_history, 'benchmark_code', side_effect=AdmissionRejected('busy', retry_after=1)), \
+                patch('algorithms.benchmark_history.time.sleep') as mock_sleep, \
+                self.assertLogs('algorithms.benchmark_history', level='WARNING'):
+            self._approve()
+        mock_sleep.assert_not_called()
+        skipped = AlgorithmBenchmark.objects.get()
+        self.assertEqual(skipped.results['cases'], [])
+        self.assertIn('перегружен', skipped.results['error'])
+        # Пропущенный замер не эталон, не цифры на карточке и не повод пропустить следующий замер.
+        self.assertIsNone(benchmark_history.baseline(self.algorithm, 'other-version'))
+        card = self.client.get(reverse('algorithm_detail', kwargs={'pk': self.algorithm.pk}))
+        self.assertIsNone(card.data['benchmark'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.algorithm.save()
+        self.assertEqual(
+            benchmark_history.measured(AlgorithmBenchmark.objects.filter(trigger='approval')).count(), 1
+        )
+
+    def test_approval_and_edit_are_benchmarked_and_compared(self):
+        self.assertFalse(AlgorithmBenchmark.objects.exists())
+        self._approve()
+        baseline = AlgorithmBenchmark.objects.get()
+        self.assertEqual((baseline.trigger, baseline.code_hash), ('approval', self.algorithm.code_hash))
+        self.assertEqual([case['size'] for case in baseline.results['cases']], [10, 20, 40])
+
+        # Повторное сохранение той же версии второй замер не ставит.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.algorithm.save()
+        self.assertEqual(self.submit.call_count, 1)
+
+        self.client.force_authenticate(user=self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.patch(
+                reverse('algorithm_detail', kwargs={'pk': self.algorithm.pk}),
+                {'code': self.CODE + 'x = sorted(range(10))\n'},
+                format='json',
+            )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.algorithm.refresh_from_db()
+        self.assertEqual(self.algorithm.status, Algorithm.STATUS_PENDING)
+        edit = AlgorithmBenchmark.objects.get(trigger='edit')
+        self.assertEqual(edit.code_hash, self.algorithm.code_hash)
+
+        history = self.client.get(reverse('algorithm_benchmarks', kwargs={'pk': self.algorithm.pk}))
+        self.assertEqual([item['trigger'] for item in history.data], ['edit', 'approval'])
+
+        self.client.force_authenticate(user=self.moderator)
+        resp = self.client.get(reverse('algorithm_benchmark_compare', kwargs={'pk': self.algorithm.pk}))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual((resp.data['base_id'], resp.data['head_id']), (baseline.pk, edit.pk))
+        self.assertEqual(len(resp.data['cases']), 3)
+        self.assertIn('regression', resp.data)
+
+    def test_rejected_algorithm_is_not_benchmarked(self):
+        self.client.force_authenticate(user=self.moderator)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('moderate_algorithm', kwargs={'algorithm_id': self.algorithm.id}),
+                {'status': 'rejected', 'rejection_reason': 'нет'},
+            )
+        self.submit.assert_not_called()
+
+    @override_settings(ALGO_BENCHMARK_ON_APPROVAL=False)
+    def test_can_be_disabled(self):
+        self._approve()
+        self.submit.assert_not_called()
+
+    def test_compare_flags_slower_version(self):
+        base = benchmark_history.record(
+            self.algorithm,
+            {'cases': [_bench_case(1000, 10.0), _bench_case(10000, 100.0)], 'complexity': {'complexity': 'O(n)'}},
+            3,
+            AlgorithmBenchmark.TRIGGER_APPROVAL,
+        )
+        self.algorithm.code += '# медленнее\n'
+        head = benchmark_history.record(
+            self.algorithm,
+            {'cases': [_bench_case(1000, 30.0), _bench_case(10000, 900.0)], 'complexity': {'complexity': 'O(n^2)'}},
+            3,
+            AlgorithmBenchmark.TRIGGER_MANUAL,
+        )
+        url = reverse('algorithm_benchmark_compare', kwargs={'pk': self.algorithm.pk})
+        self.client.force_authenticate(user=self.moderator)
+        resp = self.client.get(url, {'base': base.pk, 'head': head.pk})
+        self.assertTrue(resp.data['regression'])
+        self.assertTrue(resp.data['complexity_grew'])
+        self.assertEqual(resp.data['max_ratio'], 9.0)
+        resp = self.client.get(url, {'base': base.pk, 'head': head.pk, 'threshold': 10})
+        self.assertFalse(resp.data['regression'])
+        resp = self.client.get(url, {'base': base.pk, 'head': head.pk, 'threshold': 'x'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        # Для сохранённого кода есть только его же эталон — сравнивать не с чем.
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class Toolchain:
+    name: str
+    language: str
+    kind: str  # compiler | interpreter | runtime
+    path: str | None
+    version: str = ""
+    capabilities: tuple[str, ...] = field(default_factory=tuple)
+
+    @property
+    def available(self) -> bool:
+        return self.path is not None
+
+    def as_dict(self) -> dict:
+        # Путь к бинарнику наружу не отдаём — клиенту достаточно имени и версии.
+        return {
+            "name": self.name,
+            "language": self.language,
+            "kind": self.kind,
+            "available": self.available,
+            "version": self.version,
+            "capabilities": list(self.capabilities),
+        }
+
+
+# Стандарты C++, поддержку которых проверяем у компиляторов.
+CPP_STANDARDS = ("c++17", "c++20")
+
+
+class ToolchainRegistry:
+    """
+    Реестр компиляторов и интерпретаторов, найденных на сервере.
+
+    Поиск в PATH и опрос версий выполняются один раз (при первом обращении или при старте
+    приложения) и повторяются не чаще refresh_s секунд, либо по сигналу (SIGHUP) —
+    после обновления тулчейна на хосте. Повторный опрос идёт в фоновом потоке: запрос,
+    заставший реестр устаревшим, получает прежние данные и не ждёт запуска компиляторов.
+    Запуски берут путь из реестра, а не ищут бинарник в PATH на каждый запрос; имена вне
+    KNOWN не принимаются вовсе.
+    """
+
+    # Имя -> (язык, роль). Для C++ принимаются те же имена, что предлагает фронтенд.
+    KNOWN: dict[str, tuple[str, str]] = {
+        "g++": ("cpp", "compiler"),
+        "gcc": ("cpp", "compiler"),
+        "clang++": ("cpp", "compiler"),
+        "clang": ("cpp", "compiler"),
+        "python": ("python", "interpreter"),
+        "javac": ("java", "compiler"),
+        "java": ("java", "runtime"),
+    }
+
+    PROBE_TIMEOUT_S = 5
+
+    def __init__(self, refresh_s: float, env_factory: Callable[[], dict[str, str]] | None = None):
+        self.refresh_s = refresh_s
+        self.env_factory = env_factory
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._tools: dict[str, Toolchain] = {}
+        self._probed_at: float | None = None
+        self._probes = 0
+        self._refresh_thread: threading.Thread | None = None
+
+    def _which(self, name: str) -> str | None:
+        return shutil.which(name) or shutil.which(f"{name}.exe")
+
+    def _run(self, cmd: list[str]) -> subprocess.CompletedProcess | None:
+        try:
+            return subprocess.run(
+                cmd,
+                input="",
+                capture_output=True,
+                text=True,
+                timeout=self.PROBE_TIMEOUT_S,
+                env=self.env_factory() if self.env_factory else None,
+            )
+        except (subprocess.TimeoutExpired, OSError):
+            return None
+
+    def _version(self, path: str, language: str) -> str:
+        # java/javac старых версий понимают только `-version` и печатают её в stderr.
+        flag = "-version" if language == "java" else "--version"
+        proc = self._run([path, flag])
+        if proc is None:
+            return ""
+        lines = (proc.stdout or proc.stderr or "").strip().splitlines()
+        return lines[0].strip() if lines else ""
+
+    def _capabilities(self, name: str, path: str, language: str) -> tuple[str, ...]:
+        if language != "cpp":
+            return ()
+        caps = []
+        for std in CPP_STANDARDS:
+            proc = self._run([path, "-x", "c++", f"-std={std}", "-fsyntax-only", "-"])
+            if proc is not None and proc.returncode == 0:
+                caps.append(std)
+        # .gch из PchManager понимает только GCC.
+        if name in ("g++", "gcc"):
+            caps.append("pch")
+        return tuple(caps)
+
+    def _probe_one(self, name: str) -> Toolchain:
+        language, kind = self.KNOWN[name]
+        path = self._which(name)
+        if path is None:
+            return Toolchain(name=name, language=language, kind=kind, path=None)
+        return Toolchain(
+            name=name,
+            language=language,
+            kind=kind,
+            path=path,
+            version=self._version(path, language),
+            capabilities=self._capabilities(name, path, language),
+        )
+
+    def refresh(self) -> list[Toolchain]:
+        """
+        Заново опрашивает все известные тулчейны и заменяет содержимое реестра.
+        """
+        tools = {name: self._probe_one(name) for name in self.KNOWN}
+        with self._lock:
+            self._tools = tools
+            self._probed_at = time.monotonic()
+            self._probes += 1
+        return list(tools.values())
+
+    def invalidate(self) -> None:
+        """
+        Помечает реестр устаревшим: следующее обращение запустит опрос тулчейнов в фоне.
+        Безопасно вызывать из обработчика сигнала — сама проверка туда не выносится.
+        """
+        self._probed_at = None
+
+    def _stale(self) -> bool:
+        probed_at = self._probed_at
+        return probed_at is None or (self.refresh_s > 0 and time.monotonic() - probed_at >= self.refresh_s)
+
+    def _refresh_in_background(self) -> None:
+        # Опрос уже идёт (в фоне или первый синхронный) — второй не запускаем.
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+
+        def _run() -> None:
+            try:
+                if self._stale():
+                    self.refresh()
+            finally:
+                self._refresh_lock.release()
+
+        self._refresh_thread = threading.Thread(target=_run, name="algo-toolchains", daemon=True)
+        self._refresh_thread.start()
+
+    def _fresh(self) -> dict[str, Toolchain]:
+        with self._lock:
+            tools = self._tools
+        if not tools:
+            # Первый опрос: данных ещё нет, поэтому ждём его. Опрашивает один поток,
+            # остальные ждут его результата, а не запускают свой.
+            with self._refresh_lock:
+                if not self._tools:
+                    self.refresh()
+        elif self._stale():
+            self._refresh_in_background()
+        with self._lock:
+            return self._tools
+
+    def all(self) -> list[Toolchain]:
+        return list(self._fresh().values())
+
+    def get(self, name: str) -> Toolchain | None:
+        """
+        Тулчейн по имени; None — имя не из KNOWN.
+        """
+        if name not in self.KNOWN:
+            return None
+        return self._fresh().get(name)
+
+    def install_signal_handler(self, signum: int | None = None) -> bool:
+        """
+        Обновление реестра по сигналу (по умолчанию SIGHUP). Ставится только из главного потока
+        и только если у сигнала нет своего обработчика (например, у сервера приложений).
+        """
+        if signum is None:
+            signum = getattr(signal, "SIGHUP", None)
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        try:
+            if signal.getsignal(signum) is not signal.SIG_DFL:
+                return False
+            signal.signal(signum, lambda _signum, _frame: self.invalidate())
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            available = sorted(name for name, tool in self._tools.items() if tool.available)
+            return {
+                "probes": self._probes,
+                "refresh_s": self.refresh_s,
+                "available": available,
+            }
@@ -4,9 +4,17 @@ from . import views
 urlpatterns = [
     path('', views.AlgorithmList.as_view(), name='algorithm_list'),
     path('run/', views.run_snippet, name='algorithm_run_snippet'),
+    path('compile/', views.compile_snippet, name='algorithm_compile'),
+    path('run-batch/', views.run_snippet_batch, name='algorithm_run_snippet_batch'),
+    path('toolchains/', views.toolchain_list, name='toolchain_list'),
+    path('execution-stats/', views.execution_stats_view, name='execution_stats'),
+    path('jobs/<uuid:job_id>/', views.execution_job_detail, name='execution_job_detail'),
     path('<int:pk>/purchase/', views.purchase_algorithm, name='algorithm_purchase'),
     path('<int:pk>/price-history/', views.algorithm_price_history, name='algorithm_price_history'),
     path('<int:pk>/run/', views.run_algorithm, name='algorithm_run'),
+    path('<int:pk>/benchmarks/', views.algorithm_benchmarks, name='algorithm_benchmarks'),
+    path('<int:pk>/benchmarks/compare/', views.algorithm_benchmark_compare, name='algorithm_benchmark_compare'),
+    path('<int:pk>/run-batch/', views.run_algorithm_batch, name='algorithm_run_batch'),
     path('<int:pk>/', views.AlgorithmDetail.as_view(), name='algorithm_detail'),
     path('moderation/', views.moderation_list, name='moderation_list'),
     path('moderation/<int:algorithm_id>/', views.moderate_algorithm, name='moderate_algorithm'),
@@ -1,16 +1,147 @@
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from .models import Algorithm, AlgorithmPurchase, AlgorithmPricePoint
-from .serializers import AlgorithmSerializer
-from .compile_service import run_code
+from . import benchmark_history, jobs, prebuild
+from .models import (
+    COMPILE_PROFILE_DEFAULT,
+    Algorithm,
+    AlgorithmBenchmark,
+    AlgorithmPurchase,
+    AlgorithmPricePoint,
+    ExecutionJob,
+)
+from .serializers import (
+    AlgorithmSerializer,
+    ExecutionJobSerializer,
+    batch_result_data,
+    benchmark_record_data,
+    benchmark_result_data,
+    check_result_data,
+    run_result_data,
+    stream_event_data,
+    with_benchmarks,
+)
+from .admission import AdmissionRejected
+from .artifact_cache import cache_key
+from .benchmark import generate_input
+from .compile_service import (
+    BENCHMARK_MAX_REPEAT,
+    MAX_BATCH_CASES,
+    benchmark_code,
+    check_code,
+    execution_stats,
+    profile_error,
+    run_code,
+    run_code_batch,
+    stream_code,
+    toolchains,
+)
 from users.services.roles import is_moderator
 
 MAX_REQUEST_CODE_CHARS = 50000
 MAX_REQUEST_STDIN_CHARS = 10000
+# Бенчмарк: сколько разных входов (или размеров) в одном запросе и наибольший размер генерируемого входа.
+MAX_BENCHMARK_INPUTS = 10
+MAX_BENCHMARK_SIZE = 100000
+MAX_BENCHMARK_HISTORY = 50
+
+
+def _flag(request, name: str) -> bool:
+    value = request.data.get(name)
+    if isinstance(value, str):
+        return value.strip().lower() in {'1', 'true', 'yes', 'on'}
+    return bool(value)
+
+
+def _wants_async(request) -> bool:
+    """
+    Фоновый запуск: {"async": true} в теле запроса — ответ 202 с id задания вместо результата.
+    """
+    return _flag(request, 'async')
+
+
+def _wants_stream(request) -> bool:
+    """
+    Потоковый запуск: {"stream": true} в теле запроса — ответ text/event-stream с выводом по мере появления.
+    """
+    return _flag(request, 'stream')
+
+
+def _request_user(request):
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+
+def _clamp_int(val, default, lo, hi):
+    try:
+        n = int(val)
+    except Exception:
+        n = default
+    return max(lo, min(hi, n))
+
+
+def _run_limits(request) -> tuple[int, int, int]:
+    """
+    (compile_timeout_s, run_timeout_s, memory_mb) из запроса.
+    Лимиты можно переопределять из запроса (для тестов/локальной отладки),
+    но держим жёсткие “потолки”, чтобы не дать выкрутить на бесконечность.
+    """
+    return (
+        _clamp_int(request.data.get('compile_timeout_s'), 10, 1, 30),
+        _clamp_int(request.data.get('run_timeout_s'), 2, 1, 5),
+        _clamp_int(request.data.get('memory_mb'), 256, 64, 1024),
+    )
+
+
+def _profile_error_response(profile):
+    """
+    400 для профиля сборки не из списка допустимых (None — профиль допустим или не задан).
+    """
+    error = profile_error(profile)
+    if error is None:
+        return None
+    return Response({'detail': error}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _run_cache_key(algorithm, language, compiler, profile, stdin, limits) -> str | None:
+    """
+    Ключ кэша результата запуска или None, если результат кэшировать нельзя: кэш выключен,
+    алгоритм не одобрен или платный. Изменение алгоритма меняет updated_at, а с ним и ключ.
+    """
+    if settings.ALGO_RUN_CACHE_TTL_S <= 0:
+        return None
+    if algorithm.status != Algorithm.STATUS_APPROVED or algorithm.is_paid:
+        return None
+    return 'algo_run:' + cache_key(
+        str(algorithm.pk),
+        algorithm.updated_at.isoformat(),
+        language or '',
+        compiler or '',
+        profile or '',
+        hashlib.sha256(stdin.encode('utf-8', errors='surrogatepass')).hexdigest(),
+        ','.join(str(n) for n in limits),
+    )
+
+
+def _overloaded_response(exc: AdmissionRejected) -> Response:
+    # Все слоты заняты и очередь полна — быстрый отказ вместо деградации всего хоста.
+    return Response(
+        {'detail': str(exc), 'retry_after': exc.retry_after},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(exc.retry_after)},
+    )
 
 
 class IsModerator(permissions.BasePermission):
@@ -49,7 +180,7 @@ class AlgorithmList(generics.ListCreateAPIView):
                 Q(author_name__icontains=query)
             )
 
-        return queryset.order_by('-created_at')
+        return with_benchmarks(queryset.order_by('-created_at'))
 
     def perform_create(self, serializer):
         serializer.save(status=Algorithm.STATUS_PENDING)
@@ -140,7 +271,7 @@ def moderation_list(request):
     """
     Список алгоритмов на модерации — доступен только модераторам.
     """
-    pending_algorithms = Algorithm.objects.filter(status=Algorithm.STATUS_PENDING).order_by('created_at')
+    pending_algorithms = with_benchmarks(Algorithm.objects.filter(status=Algorithm.STATUS_PENDING).order_by('created_at'))
     serializer = AlgorithmSerializer(pending_algorithms, many=True, context={'request': request})
     return Response(serializer.data)
 
@@ -166,6 +297,8 @@ def moderate_algorithm(request, algorithm_id):
     algorithm.moderated_by = request.user
     algorithm.moderated_at = timezone.now()
     algorithm.save()
+    if algorithm.is_approved:
+        prebuild.schedule(algorithm)
 
     serializer = AlgorithmSerializer(algorithm, context={'request': request})
     return Response(serializer.data)
@@ -198,40 +331,65 @@ def run_algorithm(request, pk):
         )
 
     compiler = request.data.get('compiler') or algorithm.compiler or None
+    profile = request.data.get('profile') or algorithm.compile_profile or None
+    profile_response = _profile_error_response(profile)
+    if profile_response is not None:
+        return profile_response
 
-    # лимиты можно переопределять из запроса (для тестов/локальной отладки),
-    # но держим жёсткие “потолки”, чтобы не дать выкрутить на бесконечность.
-    def _clamp_int(val, default, lo, hi):
-        try:
-            n = int(val)
-        except Exception:
-            n = default
-        return max(lo, min(hi, n))
+    compile_timeout_s, run_timeout_s, memory_mb = _run_limits(request)
 
-    compile_timeout_s = _clamp_int(request.data.get('compile_timeout_s'), 10, 1, 30)
-    run_timeout_s = _clamp_int(request.data.get('run_timeout_s'), 2, 1, 5)
-    memory_mb = _clamp_int(request.data.get('memory_mb'), 256, 64, 1024)
+    if _flag(request, 'benchmark'):
+        return _benchmark_response(
+            request, algorithm, language, code, compiler, profile, (compile_timeout_s, run_timeout_s, memory_mb)
+        )
 
-    compile_res, run_res = run_code(
-        language=language,
-        code=code,
-        stdin=stdin,
-        compiler=compiler,
-        compile_timeout_s=compile_timeout_s,
-        run_timeout_s=run_timeout_s,
-        memory_mb=memory_mb,
-    )
-    compiled = bool(compile_res.compiled)
-    return Response(
-        {
-            'compiled': compiled,
-            'ran': bool(run_res.ran) if compiled else False,
-            'stdout': run_res.stdout if compiled else '',
-            'stderr': run_res.stderr if compiled else compile_res.stderr,
-            'compile_exit_code': compile_res.exit_code,
-            'run_exit_code': run_res.exit_code if compiled else None,
-        }
-    )
+    if _wants_async(request):
+        job = jobs.submit(
+            user=_request_user(request),
+            algorithm=algorithm,
+            language=language,
+            compiler=compiler or '',
+            compile_profile=profile or COMPILE_PROFILE_DEFAULT,
+            code=code or '',
+            stdin=stdin,
+            compile_timeout_s=compile_timeout_s,
+            run_timeout_s=run_timeout_s,
+            memory_mb=memory_mb,
+        )
+        return Response(ExecutionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    if _wants_stream(request):
+        return _stream_response(language, code, stdin, compiler, profile, compile_timeout_s, run_timeout_s, memory_mb)
+
+    # Свой код в запросе — это уже не сохранённый алгоритм, его результат не кэшируем.
+    run_key = None
+    if request.data.get('code') is None:
+        run_key = _run_cache_key(
+            algorithm, language, compiler, profile, stdin, (compile_timeout_s, run_timeout_s, memory_mb)
+        )
+    if run_key is not None:
+        cached = cache.get(run_key)
+        if cached is not None:
+            return Response({**cached, 'cached': True})
+
+    try:
+        compile_res, run_res = run_code(
+            language=language,
+            code=code,
+            stdin=stdin,
+            compiler=compiler,
+            compile_timeout_s=compile_timeout_s,
+            run_timeout_s=run_timeout_s,
+            memory_mb=memory_mb,
+            profile=profile,
+        )
+    except AdmissionRejected as e:
+        return _overloaded_response(e)
+    data = run_result_data(compile_res, run_res)
+    # Таймаут и превышение лимита вывода зависят от нагрузки на сервер — такие запуски не кэшируем.
+    if run_key is not None and compile_res.compiled and run_res.ran:
+        cache.set(run_key, data, settings.ALGO_RUN_CACHE_TTL_S)
+    return Response(data)
 
 
 @api_view(['POST'])
@@ -250,6 +408,10 @@ def run_snippet(request):
         )
     stdin = request.data.get('stdin') or ""
     compiler = request.data.get('compiler') or None
+    profile = request.data.get('profile') or None
+    profile_response = _profile_error_response(profile)
+    if profile_response is not None:
+        return profile_response
 
     if len(code or "") > MAX_REQUEST_CODE_CHARS:
         return Response(
@@ -262,34 +424,355 @@ def run_snippet(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    def _clamp_int(val, default, lo, hi):
-        try:
-            n = int(val)
-        except Exception:
-            n = default
-        return max(lo, min(hi, n))
+    compile_timeout_s, run_timeout_s, memory_mb = _run_limits(request)
+
+    if _wants_async(request):
+        job = jobs.submit(
+            user=_request_user(request),
+            language=language,
+            compiler=compiler or '',
+            compile_profile=profile or COMPILE_PROFILE_DEFAULT,
+            code=code or '',
+            stdin=stdin,
+            compile_timeout_s=compile_timeout_s,
+            run_timeout_s=run_timeout_s,
+            memory_mb=memory_mb,
+        )
+        return Response(ExecutionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    if _wants_stream(request):
+        return _stream_response(language, code, stdin, compiler, profile, compile_timeout_s, run_timeout_s, memory_mb)
+
+    try:
+        compile_res, run_res = run_code(
+            language=language,
+            code=code,
+            stdin=stdin,
+            compiler=compiler,
+            compile_timeout_s=compile_timeout_s,
+            run_timeout_s=run_timeout_s,
+            memory_mb=memory_mb,
+            profile=profile,
+        )
+    except AdmissionRejected as e:
+        return _overloaded_response(e)
+    return Response(run_result_data(compile_res, run_res))
+
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def compile_snippet(request):
+    """
+    Проверка кода без сборки и запуска (C++ — `-fsyntax-only`, Python — разбор в процессе,
+    Java — javac без генерации классов): список ошибок и предупреждений со строкой и колонкой.
+    """
+    language = request.data.get('language') or ''
+    code = request.data.get('code')
+    if code is None or not language:
+        return Response(
+            {'detail': 'Поля "code" и "language" обязательны.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(code or "") > MAX_REQUEST_CODE_CHARS:
+        return Response(
+            {'detail': f'Код слишком большой. Максимум {MAX_REQUEST_CODE_CHARS} символов.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        compile_res, diagnostics = check_code(language, code, request.data.get('compiler') or None)
+    except AdmissionRejected as e:
+        return _overloaded_response(e)
+    return Response(check_result_data(compile_res, diagnostics))
+
+
+def _sse_events(first, events):
+    try:
+        for kind, payload in itertools.chain([first], events):
+            data = json.dumps(stream_event_data(kind, payload), ensure_ascii=False)
+            yield f'event: {kind}\ndata: {data}\n\n'
+    finally:
+        # Клиент отключился — закрываем генератор запуска: он убьёт процесс и освободит слот.
+        events.close()
 
-    compile_timeout_s = _clamp_int(request.data.get('compile_timeout_s'), 10, 1, 30)
-    run_timeout_s = _clamp_int(request.data.get('run_timeout_s'), 2, 1, 5)
-    memory_mb = _clamp_int(request.data.get('memory_mb'), 256, 64, 1024)
 
-    compile_res, run_res = run_code(
+def _stream_response(language, code, stdin, compiler, profile, compile_timeout_s, run_timeout_s, memory_mb):
+    events = stream_code(
         language=language,
         code=code,
         stdin=stdin,
         compiler=compiler,
+        profile=profile,
         compile_timeout_s=compile_timeout_s,
         run_timeout_s=run_timeout_s,
         memory_mb=memory_mb,
     )
-    compiled = bool(compile_res.compiled)
-    return Response(
-        {
-            'compiled': compiled,
-            'ran': bool(run_res.ran) if compiled else False,
-            'stdout': run_res.stdout if compiled else '',
-            'stderr': run_res.stderr if compiled else compile_res.stderr,
-            'compile_exit_code': compile_res.exit_code,
-            'run_exit_code': run_res.exit_code if compiled else None,
-        }
+    # Первое событие — после захвата слота: перегрузку ещё можно вернуть обычным 503.
+    try:
+        first = next(events)
+    except AdmissionRejected as e:
+        return _overloaded_response(e)
+    response = StreamingHttpResponse(
+        _sse_events(first, events),
+        content_type='text/event-stream; charset=utf-8',
     )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _parse_cases(raw):
+    """
+    Проверяет список тестов [{"stdin": str, "expected": str | null}, ...].
+    Возвращает (cases, None) или (None, текст ошибки).
+    """
+    if not isinstance(raw, list) or not raw:
+        return None, 'Поле "cases" должно быть непустым списком тестов.'
+    if len(raw) > MAX_BATCH_CASES:
+        return None, f'Слишком много тестов. Максимум {MAX_BATCH_CASES}.'
+    cases = []
+    for i, item in enumerate(raw):
+        if not isinstance(item, dict):
+            return None, f'Тест #{i}: ожидается объект с полями "stdin" и "expected".'
+        stdin = item.get('stdin') or ''
+        expected = item.get('expected')
+        if not isinstance(stdin, str) or (expected is not None and not isinstance(expected, str)):
+            return None, f'Тест #{i}: поля "stdin" и "expected" должны быть строками.'
+        if len(stdin) > MAX_REQUEST_STDIN_CHARS:
+            return None, f'Тест #{i}: слишком большой stdin. Максимум {MAX_REQUEST_STDIN_CHARS} символов.'
+        cases.append({'stdin': stdin, 'expected': expected})
+    return cases, None
+
+
+def _run_batch_response(request, language, code, compiler, profile) -> Response:
+    if len(code or "") > MAX_REQUEST_CODE_CHARS:
+        return Response(
+            {'detail': f'Код слишком большой. Максимум {MAX_REQUEST_CODE_CHARS} символов.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    profile_response = _profile_error_response(profile)
+    if profile_response is not None:
+        return profile_response
+    cases, error = _parse_cases(request.data.get('cases'))
+    if error:
+        return Response({'detail': error}, status=status.HTTP_400_BAD_REQUEST)
+
+    compile_timeout_s, run_timeout_s, memory_mb = _run_limits(request)
+    try:
+        compile_res, case_results = run_code_batch(
+            language=language,
+            code=code,
+            cases=cases,
+            compiler=compiler,
+            profile=profile,
+            compile_timeout_s=compile_timeout_s,
+            run_timeout_s=run_timeout_s,
+            memory_mb=memory_mb,
+        )
+    except AdmissionRejected as e:
+        return _overloaded_response(e)
+    return Response(batch_result_data(compile_res, case_results))
+
+
+def _parse_benchmark_inputs(request, stdin):
+    """
+    Входы бенчмарка: "sizes" — размеры, вход для каждого генерируется (benchmark.generate_input);
+    "inputs" — список {"stdin", "size"}; иначе — один вход из "stdin".
+    Возвращает (cases, None) или (None, текст ошибки).
+    """
+    sizes = request.data.get('sizes')
+    inputs = request.data.get('inputs')
+    if sizes is not None:
+        if not isinstance(sizes, list) or not sizes or len(sizes) > MAX_BENCHMARK_INPUTS:
+            return None, f'Поле "sizes" должно быть непустым списком, не длиннее {MAX_BENCHMARK_INPUTS}.'
+        if not all(isinstance(n, int) and not isinstance(n, bool) and 1 <= n <= MAX_BENCHMARK_SIZE for n in sizes):
+            return None, f'Размеры входа — целые от 1 до {MAX_BENCHMARK_SIZE}.'
+        return [{'stdin': generate_input(n), 'size': n} for n in sizes], None
+    if inputs is not None:
+        if not isinstance(inputs, list) or not inputs or len(inputs) > MAX_BENCHMARK_INPUTS:
+            return None, f'Поле "inputs" должно быть непустым списком, не длиннее {MAX_BENCHMARK_INPUTS}.'
+        cases = []
+        for i, item in enumerate(inputs):
+            size = item.get('size') if isinstance(item, dict) else None
+            if (
+                not isinstance(item, dict)
+                or not isinstance(item.get('stdin') or '', str)
+                or (size is not None and (not isinstance(size, int) or isinstance(size, bool) or size < 1))
+            ):
+                return None, f'Вход #{i}: ожидается объект {{"stdin": строка, "size": целое > 0 или null}}.'
+            cases.append({'stdin': item.get('stdin') or '', 'size': size})
+        return cases, None
+    return [{'stdin': stdin, 'size': None}], None
+
+
+def _benchmark_response(request, algorithm, language, code, compiler, profile, limits) -> Response:
+    """
+    Бенчмарк алгоритма: одна компиляция, repeat запусков на каждом входе.
+    Доступен только автору и модераторам: замер синхронно держит слот запуска на все прогоны.
+    Замер кода самого алгоритма (без "code"/"language" в запросе) сохраняется в историю
+    версии (AlgorithmBenchmark) и попадает на карточку.
+    """
+    user = _request_user(request)
+    if user is None or not (algorithm.can_edit(user) or is_moderator(user)):
+        return Response(
+            {'detail': 'Бенчмарк доступен только автору алгоритма и модераторам.'},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    cases, error = _parse_benchmark_inputs(request, request.data.get('stdin') or '')
+    if error:
+        return Response({'detail': error}, status=status.HTTP_400_BAD_REQUEST)
+    repeat = _clamp_int(request.data.get('repeat'), 5, 1, BENCHMARK_MAX_REPEAT)
+    compile_timeout_s, run_timeout_s, memory_mb = limits
+    try:
+        compile_res, results = benchmark_code(
+            language=language,
+            code=code,
+            cases=cases,
+            repeat=repeat,
+            compiler=compiler,
+            compile_timeout_s=compile_timeout_s,
+            run_timeout_s=run_timeout_s,
+            memory_mb=memory_mb,
+            profile=profile,
+        )
+    except AdmissionRejected as e:
+        return _overloaded_response(e)
+    data = {**benchmark_result_data(compile_res, results), 'repeat': repeat, 'benchmark_id': None}
+
+    own_code = request.data.get('code') is None and not request.data.get('language')
+    if own_code and compile_res.compiled and results:
+        record = benchmark_history.record(
+            algorithm,
+            data,
+            repeat,
+            AlgorithmBenchmark.TRIGGER_MANUAL,
+            user=user,
+            language=language,
+            compiler=compiler,
+            compile_profile=profile,
+        )
+        data['benchmark_id'] = record.pk
+    return Response(data)
+
+
+def _visible_algorithm(request, pk):
+    algorithm = get_object_or_404(Algorithm, pk=pk)
+    return algorithm if algorithm.can_view(request.user) else None
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def algorithm_benchmarks(request, pk):
+    """
+    История замеров алгоритма по версиям кода (новые первыми).
+    """
+    algorithm = _visible_algorithm(request, pk)
+    if algorithm is None:
+        return Response({'detail': 'Алгоритм не найден.'}, status=status.HTTP_404_NOT_FOUND)
+    records = algorithm.benchmarks.all()[:MAX_BENCHMARK_HISTORY]
+    return Response([benchmark_record_data(record) for record in records])
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def algorithm_benchmark_compare(request, pk):
+    """
+    Сравнение двух замеров алгоритма: ?base=<id>&head=<id>&threshold=<во сколько раз>.
+    По умолчанию head — последний замер текущего кода, base — эталон последней одобренной
+    версии с другим кодом; regression: true — новая версия медленнее порога.
+    """
+    algorithm = _visible_algorithm(request, pk)
+    if algorithm is None:
+        return Response({'detail': 'Алгоритм не найден.'}, status=status.HTTP_404_NOT_FOUND)
+
+    def _pick(name):
+        value = request.query_params.get(name)
+        if value is None:
+            return None
+        try:
+            return algorithm.benchmarks.filter(pk=int(value)).first()
+        except ValueError:
+            return None
+
+    head = _pick('head') if 'head' in request.query_params else benchmark_history.measured(
+        algorithm.benchmarks.filter(code_hash=algorithm.code_hash)
+    ).first()
+    if head is None:
+        return Response({'detail': 'Нет замера новой версии.'}, status=status.HTTP_404_NOT_FOUND)
+    base = _pick('base') if 'base' in request.query_params else benchmark_history.baseline(algorithm, head.code_hash)
+    if base is None:
+        return Response({'detail': 'Нет замера, с которым сравнивать.'}, status=status.HTTP_404_NOT_FOUND)
+
+    threshold = None
+    if request.query_params.get('threshold'):
+        try:
+            threshold = float(request.query_params['threshold'])
+        except ValueError:
+            threshold = 0.0
+        if not 1.0 <= threshold <= 100.0:
+            return Response({'detail': 'threshold — число от 1 до 100.'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(benchmark_history.compare(base, head, threshold))
+
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def run_algorithm_batch(request, pk):
+    """
+    Прогон алгоритма на наборе тестов: компиляция один раз, тесты — параллельно.
+    """
+    algorithm = get_object_or_404(Algorithm, pk=pk)
+    if not algorithm.can_view_code(request.user):
+        return Response({'detail': 'Код алгоритма недоступен.'}, status=status.HTTP_404_NOT_FOUND)
+
+    language = request.data.get('language') or algorithm.language or ''
+    code = request.data.get('code') if request.data.get('code') is not None else algorithm.code
+    compiler = request.data.get('compiler') or algorithm.compiler or None
+    profile = request.data.get('profile') or algorithm.compile_profile or None
+    return _run_batch_response(request, language, code, compiler, profile)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def run_snippet_batch(request):
+    """
+    Прогон “черновика” на наборе тестов без сохранения Algorithm.
+    """
+    language = request.data.get('language') or ''
+    code = request.data.get('code')
+    if code is None:
+        return Response(
+            {'detail': 'Поля "code" и "language" обязательны.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return _run_batch_response(
+        request, language, code, request.data.get('compiler') or None, request.data.get('profile') or None
+    )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def execution_job_detail(request, job_id):
+    """
+    Статус и результат фонового запуска (результат — в том же формате, что у синхронного /run/).
+    """
+    job = get_object_or_404(ExecutionJob, pk=job_id)
+    if not job.can_view(request.user):
+        return Response({'detail': 'Задание не найдено.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(ExecutionJobSerializer(job).data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def toolchain_list(request):
+    """
+    Компиляторы и интерпретаторы, найденные на сервере: фронтенд предлагает только доступные.
+    """
+    return Response([tool.as_dict() for tool in toolchains()])
+
+
+@api_view(['GET'])
+@permission_classes([IsModerator])
+def execution_stats_view(request):
+    """
+    Счётчики кэшей компиляции и пулов исполнения процесса, обработавшего запрос.
+    """
+    return Response(execution_stats())
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import shutil
+import stat
+import tempfile
+import threading
+
+
+# Меньше этого свободного места на tmpfs — не используем его (в Docker /dev/shm по умолчанию 64 МБ).
+MIN_TMPFS_FREE_MB = 512
+
+
+def _usable_tmpfs(path: str) -> bool:
+    if os.name == "nt" or not os.path.isdir(path) or not os.access(path, os.W_OK | os.X_OK):
+        return False
+    try:
+        st = os.statvfs(path)
+    except OSError:
+        return False
+    # Собранные бинарники запускаются прямо из рабочего каталога — noexec не подходит.
+    if st.f_flag & getattr(os, "ST_NOEXEC", 8):
+        return False
+    return st.f_bavail * st.f_frsize >= MIN_TMPFS_FREE_MB * 1024 * 1024
+
+
+def default_root() -> str:
+    """
+    Каталог для рабочих папок: tmpfs (/dev/shm), если он доступен на запись, без noexec и
+    достаточно большой, иначе системный temp. На tmpfs создание/удаление файлов не задевает
+    overlayfs контейнера.
+    """
+    shm = "/dev/shm"
+    if _usable_tmpfs(shm):
+        return os.path.join(shm, "algo_workspaces")
+    return os.path.join(tempfile.gettempdir(), "algo_workspaces")
+
+
+class WorkspacePool:
+    """
+    Пул заранее созданных рабочих каталогов для компиляции/запуска вместо TemporaryDirectory
+    на каждый вызов.
+
+    После использования каталог очищается и проходит проверку (существует, это каталог, а не
+    ссылка, принадлежит нам, пуст); только тогда он возвращается в пул, иначе удаляется.
+    В пуле хранится не больше size свободных каталогов; если все заняты, создаётся новый,
+    который после использования либо вернётся в пул, либо будет удалён.
+    """
+
+    def __init__(self, root: str, size: int):
+        self.root = root
+        self.size = size
+        self._idle: list[str] = []
+        self._lock = threading.Lock()
+        self._warmed = False
+        self._created = 0
+        self._reused = 0
+        self._discarded = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def _create(self) -> str:
+        os.makedirs(self.root, mode=0o700, exist_ok=True)
+        with self._lock:
+            self._created += 1
+        return tempfile.mkdtemp(prefix="ws_", dir=self.root)
+
+    def _acquire(self) -> str:
+        with self._lock:
+            warm = not self._warmed
+            self._warmed = True
+        if warm:
+            # Первое обращение: создаём весь пул сразу, дальше каталоги только переиспользуются.
+            spare = [self._create() for _ in range(self.size)]
+            with self._lock:
+                self._idle.extend(spare)
+        with self._lock:
+            while self._idle:
+                path = self._idle.pop()
+                if os.path.isdir(path):
+                    self._reused += 1
+                    return path
+        return self._create()
+
+    @staticmethod
+    def _scrub(path: str) -> None:
+        if os.path.islink(path):
+            raise OSError(f"рабочий каталог подменён ссылкой: {path}")
+        _unlock_tree(path)
+        for name in os.listdir(path):
+            full = os.path.join(path, name)
+            if os.path.isdir(full) and not os.path.islink(full):
+                shutil.rmtree(full, ignore_errors=True)
+            else:
+                os.unlink(full)
+
+    @staticmethod
+    def _healthy(path: str) -> bool:
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return False
+        if not stat.S_ISDIR(st.st_mode):
+            return False
+        if hasattr(os, "getuid") and st.st_uid != os.getuid():
+            return False
+        return not os.listdir(path)
+
+    def _release(self, path: str) -> None:
+        try:
+            self._scrub(path)
+            healthy = self._healthy(path)
+        except OSError:
+            healthy = False
+        with self._lock:
+            if healthy and len(self._idle) < self.size:
+                self._idle.append(path)
+                return
+            self._discarded += 1
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    @contextlib.contextmanager
+    def workspace(self, prefix: str = "algo_"):
+        """
+        Пустой рабочий каталог на время блока. Если пул выключен — обычный TemporaryDirectory.
+        """
+        if not self.enabled:
+            with tempfile.TemporaryDirectory(prefix=prefix) as tmp:
+                yield tmp
+            return
+        try:
+            path = self._acquire()
+        except OSError:
+            # tmpfs переполнен или недоступен — не роняем запуск из-за пула.
+            with tempfile.TemporaryDirectory(prefix=prefix) as tmp:
+                yield tmp
+            return
+        try:
+            yield path
+        finally:
+            self._release(path)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for path in idle:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "root": self.root,
+                "idle": len(self._idle),
+                "size": self.size,
+                "created": self._created,
+                "reused": self._reused,
+                "discarded": self._discarded,
+            }
+
+
+def _unlock_tree(path: str) -> None:
+    # Программа могла снять права с подкаталогов — возвращаем их сверху вниз, чтобы rmtree
+    # смог всё удалить. По символическим ссылкам не идём: chmod изменил бы права цели.
+    os.chmod(path, 0o700)
+    for dirpath, dirnames, _filenames in os.walk(path):
+        for name in dirnames:
+            sub = os.path.join(dirpath, name)
+            if not os.path.islink(sub):
+                try:
+                    os.chmod(sub, 0o700)
+                except OSError:
+                    pass